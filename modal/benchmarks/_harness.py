@@ -0,0 +1,172 @@
+"""
+Shared setup for the benchmark scripts: imports the app package from this
+checkout and provides a fake Gemini client, so everything runs on a laptop
+without Modal credentials or network access.
+"""
+
+import asyncio
+import importlib
+import os
+import pathlib
+import sys
+import time
+
+MODAL_DIR = pathlib.Path(__file__).resolve().parents[1]
+PACKAGE = "munshi-machine"
+
+# before any app module reads its configuration
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ.setdefault("GEMINI_RESPONSE_CACHE", "0")
+
+
+def load(module: str = ""):
+    """Import `lib.x.y` (or the package itself) from the checkout"""
+    if str(MODAL_DIR) not in sys.path:
+        sys.path.insert(0, str(MODAL_DIR))
+    return importlib.import_module(f"{PACKAGE}.{module}" if module else PACKAGE)
+
+
+def use_temporary_cache() -> pathlib.Path:
+    """
+    Point RAW_AUDIO_DIR and TRANSCRIPTIONS_DIR at a fresh temp directory.
+    Call before importing anything that binds them with `from ..config import`.
+    """
+    import tempfile
+
+    config = load("config")
+    cache_dir = pathlib.Path(tempfile.mkdtemp(prefix="munshi_bench_"))
+    config.RAW_AUDIO_DIR = cache_dir / "raw_audio"
+    config.TRANSCRIPTIONS_DIR = cache_dir / "transcriptions"
+    config.GEMINI_CACHE_DIR = config.TRANSCRIPTIONS_DIR / ".gemini_cache"
+    config.RAW_AUDIO_DIR.mkdir(parents=True)
+    config.TRANSCRIPTIONS_DIR.mkdir(parents=True)
+    return cache_dir
+
+
+class StubCall:
+    """A Modal method: callable, with an `.aio` variant; does nothing"""
+
+    def __init__(self):
+        self.aio = self._acall
+
+    def __call__(self, *args, **kwargs):
+        pass
+
+    async def _acall(self, *args, **kwargs):
+        pass
+
+
+def stub_volumes():
+    """Make volume commit/reload and the progress Dict no-ops"""
+    import types
+
+    volumes = load("volumes")
+    # the Volume objects stay, so Modal still accepts them as mounts
+    for volume in (volumes.transcriptions_vol, volumes.audio_storage_vol):
+        volume.commit = StubCall()
+        volume.reload = StubCall()
+    progress_dict = types.SimpleNamespace(put=StubCall(), get=StubCall())
+    load("lib.progress").get_progress_dict = lambda: progress_dict
+
+
+class FakeResponse:
+    def __init__(self, parsed=None, text=None):
+        self.parsed = parsed
+        self.text = text
+
+
+class FakeModels:
+    """`client.aio.models` answering every request after `delay` seconds"""
+
+    def __init__(self, delay: float, calls: list):
+        self.delay = delay
+        self.calls = calls
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def generate_content(self, model, contents, config):
+        self.calls.append((model, time.perf_counter()))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        schema = config.get("response_schema")
+        if schema is None:
+            return FakeResponse(text=f"summary of {len(contents[1])} chars")
+        if schema.__name__ == "GeminiResponse":
+            return FakeResponse(parsed=schema(cleaned_text=[contents[1]], corrections_applied=[]))
+        if schema.__name__ == "GeminiSpeakerResponse":
+            return FakeResponse(parsed=schema(
+                cleaned_transcript=[contents[1]], speaker_ids=["SPEAKER_00"], speaker_names=["Ann"]
+            ))
+        return FakeResponse(parsed=schema(speaker_ids=["SPEAKER_00", "SPEAKER_01"], speaker_names=["Ann", "Bob"]))
+
+
+class FakeGeminiClient:
+    """Stands in for `genai.Client`; only the async path is implemented"""
+
+    def __init__(self, delay: float = 0.2):
+        self.calls = []
+        self.aio = type("Aio", (), {})()
+        self.aio.models = FakeModels(delay, self.calls)
+
+
+def words(count: int, seed: int = 1) -> list[str]:
+    """`count` pseudo-English words, deterministic per seed"""
+    import random
+
+    rng = random.Random(seed)
+    vocabulary = (
+        "the a of and to in that we it was so like you know really think about "
+        "podcast episode guest question interesting people time going right "
+        "because actually research model data music story started years"
+    ).split()
+    return [rng.choice(vocabulary) for _ in range(count)]
+
+
+def sentences(word_count: int, seed: int = 1) -> str:
+    """Prose of about `word_count` words in sentences of 3-25 words"""
+    import random
+
+    rng = random.Random(seed)
+    pool = words(word_count, seed)
+    out = []
+    i = 0
+    while i < len(pool):
+        n = rng.randint(3, 25)
+        out.append(" ".join(pool[i:i + n]) + rng.choice(".!?"))
+        i += n
+    return " ".join(out)
+
+
+def use_available_tokenizer():
+    """
+    The cl100k encoder the app uses, or, when it cannot be downloaded (no
+    network), a small byte-level BPE patched into lib.gemini.chunking. Token
+    counts then differ from cl100k, but timings keep their shape.
+    """
+    import tiktoken
+
+    chunking = load("lib.gemini.chunking")
+    try:
+        return chunking.get_encoding()
+    except Exception as e:
+        print(f"cl100k_base unavailable ({type(e).__name__}); using a byte-level stand-in encoder")
+    ranks = {bytes([i]): i for i in range(256)}
+    for word in words(2000, seed=7):
+        for piece in (word.encode(), b" " + word.encode()):
+            for end in range(2, len(piece) + 1):
+                ranks.setdefault(piece[:end], len(ranks))
+    encoding = tiktoken.Encoding(
+        "byte-level",
+        pat_str=r"""'s|'t|'re|'ve|'m|'ll|'d| ?\p{L}+| ?\p{N}+| ?[^\s\p{L}\p{N}]+|\s+(?!\S)|\s+""",
+        mergeable_ranks=ranks,
+        special_tokens={},
+    )
+    if hasattr(chunking.get_encoding, "cache_clear"):
+        chunking.get_encoding.cache_clear()
+    chunking.get_encoding = lambda: encoding
+    tiktoken.get_encoding = lambda name: encoding
+    return encoding
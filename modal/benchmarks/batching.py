@@ -0,0 +1,70 @@
+"""
+Per-request decoding against cross-request batching on the stub model.
+
+CONCURRENCY jobs call the transcriber at once, as inputs do in one GPU
+container. StubWhisperModel cuts audio into 10s chunks and decodes a batch
+of up to BATCH_SIZE chunks in BATCH_LATENCY seconds however full it is, one
+batch at a time, like a GPU that is not compute-bound. Per request, each
+job's batches hold only its own chunks; BatchedTranscriber fills batches
+with chunks from all waiting jobs. Every job must get back exactly its own
+segments in order.
+
+    python modal/benchmarks/batching.py
+"""
+
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from _harness import load
+
+SAMPLE_RATE = 16000
+CONCURRENCY = 15
+BATCH_SIZE = 32
+BATCH_LATENCY = 0.05
+SEGMENT_SECONDS = 10.0
+
+stub = load("lib.asr.stub")
+batching = load("lib.asr.batching")
+
+
+def run(mode: str, durations: list) -> tuple[int, float, int]:
+    model = stub.StubWhisperModel(batch_latency=BATCH_LATENCY, segment_seconds=SEGMENT_SECONDS)
+    transcriber = batching.BatchedTranscriber(model, BATCH_SIZE) if mode == "batched" else model
+
+    def job(duration):
+        audio = np.zeros(int(duration * SAMPLE_RATE), dtype=np.float32)
+        return transcriber.transcribe(audio, batch_size=BATCH_SIZE)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(CONCURRENCY) as pool:
+        results = list(pool.map(job, durations))
+    elapsed = time.perf_counter() - start
+
+    for duration, result in zip(durations, results):
+        segments = result["segments"]
+        assert len(segments) == int(np.ceil(duration / SEGMENT_SECONDS)), (duration, len(segments))
+        # the stub's text names the chunk length, so a chunk from another job would show
+        for segment in segments:
+            assert abs(float(segment["text"].split()[2]) - (segment["end"] - segment["start"])) < 0.051, segment
+    batches = transcriber.scheduler.stats()["batches"] if mode == "batched" else model.batches
+    return sum(len(result["segments"]) for result in results), elapsed, batches
+
+
+def main():
+    rng = random.Random(1)
+    workloads = [
+        ("short clips 30-120s x60", [rng.uniform(30, 120) for _ in range(60)]),
+        ("mixed 30s-1h x45", [rng.choice([30, 60, 120, 600, 3600]) for _ in range(45)]),
+    ]
+    print(f"{'workload':24} {'mode':12} {'segments':>8} {'batches':>7} {'wall s':>7} {'seg/s':>7}")
+    for name, durations in workloads:
+        for mode in ("per-request", "batched"):
+            segments, elapsed, batches = run(mode, durations)
+            print(f"{name:24} {mode:12} {segments:8d} {batches:7d} {elapsed:7.2f} {segments / elapsed:7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Transcript chunking: the old per-sentence encoder against chunk_text.
+
+"old" is what the summary path used to do before chunking: encode the whole
+transcript in _needs_batch_processing, then re-encode every sentence in
+_smart_chunk_text (calling tiktoken.get_encoding each time). "new" encodes
+once and hands the tokens to chunk_text, which maps token offsets back to
+sentence boundaries. Both must produce the same chunk texts.
+
+    python modal/benchmarks/chunking.py
+"""
+
+import re
+import time
+
+from _harness import load, sentences, use_available_tokenizer
+
+SIZES = (50_000, 200_000, 1_000_000)
+MAX_TOKENS = 60_000  # TOKEN_LIMITS["cleaning_normal"]
+
+encoding = use_available_tokenizer()
+chunking = load("lib.gemini.chunking")
+
+
+def old_chunks(text: str, max_tokens: int) -> list[str]:
+    import tiktoken
+
+    # _needs_batch_processing
+    len(tiktoken.get_encoding("cl100k_base").encode(text))
+    # _smart_chunk_text
+    encoding = tiktoken.get_encoding("cl100k_base")
+    chunks = []
+    current_chunk = ""
+    current_tokens = 0
+    for sentence in re.split(r'(?<=[.!?])\s+', text):
+        sentence_tokens = len(encoding.encode(sentence))
+        if sentence_tokens > max_tokens:
+            if current_chunk:
+                chunks.append(current_chunk.strip())
+                current_chunk = ""
+                current_tokens = 0
+            tokens = encoding.encode(sentence)
+            for j in range(0, len(tokens), max_tokens):
+                chunks.append(encoding.decode(tokens[j:j + max_tokens]))
+            continue
+        if current_tokens + sentence_tokens > max_tokens:
+            if current_chunk:
+                chunks.append(current_chunk.strip())
+            current_chunk = sentence + " "
+            current_tokens = sentence_tokens
+        else:
+            current_chunk += sentence + " "
+            current_tokens += sentence_tokens
+    if current_chunk:
+        chunks.append(current_chunk.strip())
+    return chunks
+
+
+def new_chunks(text: str, max_tokens: int) -> list:
+    tokens = chunking.encode(text)
+    return chunking.chunk_text(text, max_tokens, tokens)
+
+
+def text_of(token_count: int) -> str:
+    words = token_count
+    while True:
+        text = sentences(words)
+        count = len(chunking.encode(text))
+        if count >= token_count:
+            return text
+        words = int(words * token_count / count) + 100
+
+
+def best_of(repeat: int, fn, *args):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    # the per-vocabulary byte-length table is built once per process
+    chunking.chunk_text("warm up.", MAX_TOKENS)
+    print(f"{'tokens':>9} {'chunks':>6} {'old s':>7} {'new s':>7} {'speedup':>7}")
+    for size in SIZES:
+        text = text_of(size)
+        old_time, old = best_of(3, old_chunks, text, MAX_TOKENS)
+        new_time, new = best_of(3, new_chunks, text, MAX_TOKENS)
+        assert old == [chunk.text for chunk in new], "chunk texts differ"
+        assert sum(chunk.tokens for chunk in new) == len(chunking.encode(text))
+        print(f"{size:9d} {len(new):6d} {old_time:7.3f} {new_time:7.3f} {old_time / new_time:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Real-time factor of the int8 CPU tier, to check the routing thresholds.
+
+Transcribes the given audio files with CPU_WHISPER_MODEL in int8 on
+CPU_TIER_CORES threads, the way WhisperXCPU does (through whisperx when it
+is installed, otherwise through faster-whisper, the engine underneath), and
+prints load time, transcription time and RTF per file. From the worst RTF
+it projects the transcription time at each CPU_TIER_* threshold; run it on
+the CPU tier's machine shape before setting CPU_TIER_ENABLED=1.
+
+    python modal/benchmarks/cpu_tier_rtf.py episode.mp3 [clip.wav ...]
+    python modal/benchmarks/cpu_tier_rtf.py --stub 120
+
+--stub SECONDS runs the same measurement on StubWhisperModel over that much
+silence. It checks the script without model weights; its RTF means nothing.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from _harness import load
+
+SAMPLE_RATE = 16000
+BATCH_SIZE = 8  # WhisperXCPU.batch_size
+
+config = load("config")
+
+
+def load_model(stub: bool):
+    """(transcribe(audio) -> segment count, engine name)"""
+    if stub:
+        model = load("lib.asr.stub").StubWhisperModel()
+        return lambda audio: len(model.transcribe(audio, batch_size=BATCH_SIZE)["segments"]), "stub"
+    try:
+        import whisperx
+    except ImportError:
+        whisperx = None
+    if whisperx is not None:
+        model = whisperx.load_model(
+            config.CPU_WHISPER_MODEL, device="cpu", compute_type="int8", threads=config.CPU_TIER_CORES
+        )
+        return lambda audio: len(model.transcribe(audio, batch_size=BATCH_SIZE)["segments"]), "whisperx"
+
+    from faster_whisper import BatchedInferencePipeline, WhisperModel
+
+    model = BatchedInferencePipeline(WhisperModel(
+        config.CPU_WHISPER_MODEL, device="cpu", compute_type="int8", cpu_threads=config.CPU_TIER_CORES
+    ))
+
+    def transcribe(audio):
+        segments, _ = model.transcribe(audio, batch_size=BATCH_SIZE)
+        return len(list(segments))
+
+    return transcribe, "faster-whisper"
+
+
+def decode(path: str) -> np.ndarray:
+    from faster_whisper import decode_audio
+
+    return decode_audio(path, sampling_rate=SAMPLE_RATE)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("audio", nargs="*", help="audio files to transcribe")
+    parser.add_argument("--stub", type=float, metavar="SECONDS", help="time the stub model instead")
+    args = parser.parse_args()
+    if not args.audio and args.stub is None:
+        parser.error("give audio files, or --stub SECONDS")
+
+    start = time.perf_counter()
+    transcribe, engine = load_model(args.stub is not None)
+    load_seconds = time.perf_counter() - start
+    print(f"{engine} {config.CPU_WHISPER_MODEL} int8, {config.CPU_TIER_CORES} threads; load {load_seconds:.1f}s")
+
+    inputs = [(f"stub {args.stub:g}s", np.zeros(int(args.stub * SAMPLE_RATE), dtype=np.float32))] if args.stub else []
+    inputs += [(path, decode(path)) for path in args.audio]
+
+    print(f"{'audio':40} {'audio s':>8} {'wall s':>7} {'RTF':>6} {'segments':>8}")
+    rtfs = []
+    for name, audio in inputs:
+        duration = len(audio) / SAMPLE_RATE
+        start = time.perf_counter()
+        segments = transcribe(audio)
+        elapsed = time.perf_counter() - start
+        rtfs.append(elapsed / duration)
+        print(f"{name[-40:]:40} {duration:8.1f} {elapsed:7.1f} {rtfs[-1]:6.3f} {segments:8d}")
+
+    worst = max(rtfs)
+    print(f"\nprojected transcription time at worst RTF {worst:.3f} (excludes alignment/diarization):")
+    for name in ("CPU_TIER_MAX_SECONDS", "CPU_TIER_MAX_DIARIZE_SECONDS", "CPU_TIER_LOW_PRIORITY_MAX_SECONDS"):
+        seconds = getattr(config, name)
+        print(f"  {name:34} {seconds:5d}s audio -> {seconds * worst:7.1f}s")
+
+
+if __name__ == "__main__":
+    main()
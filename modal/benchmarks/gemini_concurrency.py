@@ -0,0 +1,79 @@
+"""
+Wall-clock time of GeminiProcessor.get_cleaned_transcript against a fake
+client that takes DELAY seconds per request.
+
+With the async client path the time should follow
+ceil(chunks / limit) * DELAY, not chunks * DELAY. The "blocking" row calls
+a client that sleeps synchronously, the way the old
+`client.models.generate_content` call did, for comparison.
+
+    python modal/benchmarks/gemini_concurrency.py
+"""
+
+import asyncio
+import math
+import time
+
+from _harness import FakeGeminiClient, load, sentences, use_available_tokenizer
+
+DELAY = 0.2
+CHUNKS = 12
+LIMITS = (1, 2, 4, 8, 16)
+
+use_available_tokenizer()
+gemini_config = load("lib.gemini.config")
+processor_module = load("lib.gemini.processor")
+
+# small chunks, so the transcript splits into CHUNKS pieces quickly
+gemini_config.TOKEN_LIMITS["cleaning_normal"] = 400
+
+
+class BlockingModels:
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    async def generate_content(self, model, contents, config):
+        time.sleep(self.delay)
+        return await FakeGeminiClient(0).aio.models.generate_content(model, contents, config)
+
+
+def transcript_with_chunks(count: int) -> str:
+    processor = processor_module.GeminiProcessor(client=FakeGeminiClient())
+    words = 300
+    while True:
+        text = sentences(words)
+        chunks = processor._smart_chunk_text(text, gemini_config.TOKEN_LIMITS["cleaning_normal"])
+        if len(chunks) >= count:
+            return text
+        words = int(words * 1.3)
+
+
+async def run(client, limit: int, text: str) -> float:
+    processor = processor_module.GeminiProcessor(client=client, max_concurrency=limit)
+    start = time.perf_counter()
+    await processor.get_cleaned_transcript(text)
+    return time.perf_counter() - start
+
+
+def main():
+    text = transcript_with_chunks(CHUNKS)
+    chunks = len(processor_module.GeminiProcessor(client=FakeGeminiClient())._smart_chunk_text(
+        text, gemini_config.TOKEN_LIMITS["cleaning_normal"]
+    ))
+    rows = []
+    blocking = FakeGeminiClient()
+    blocking.aio.models = BlockingModels(DELAY)
+    rows.append(("blocking", 8, asyncio.run(run(blocking, 8, text)), chunks * DELAY, 1))
+    for limit in LIMITS:
+        client = FakeGeminiClient(DELAY)
+        elapsed = asyncio.run(run(client, limit, text))
+        rows.append(("async", limit, elapsed, math.ceil(chunks / limit) * DELAY, client.aio.models.max_in_flight))
+
+    print(f"\n{chunks} chunks, {DELAY}s per request")
+    print(f"{'client':9} {'limit':>5} {'wall s':>7} {'expected s':>10} {'max in flight':>13}")
+    for client, limit, elapsed, expected, in_flight in rows:
+        print(f"{client:9} {limit:5d} {elapsed:7.2f} {expected:10.2f} {in_flight:13d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Filesystem operations one job performs on its way through the state chain.
+
+Runs FetchingAudio -> NormalizingAudio -> Transcribing -> Summarizing ->
+Completed against a temporary cache directory, with WhisperX, ffmpeg,
+Gemini and the Modal volumes replaced by stubs, and counts every open(),
+os.stat() and os.replace() the chain makes, split at each checkpoint. The
+JobSession's own accounting (store reads/writes, reads/writes saved) is
+printed next to it. Exits 1 if any count exceeds its budget below, or the
+session saves fewer reads/writes than it did when the budgets were set.
+
+    python modal/benchmarks/job_io.py
+"""
+
+import asyncio
+import builtins
+import collections
+import os
+import shutil
+import sys
+import types
+
+from _harness import (
+    FakeGeminiClient, PACKAGE, load, sentences, stub_volumes, use_available_tokenizer, use_temporary_cache,
+)
+
+VID = "benchmark-job"
+SEGMENTS = 400
+
+KINDS = ("open(read)", "open(write)", "stat", "replace")
+# upper bounds per checkpoint, (open(read), open(write), stat, replace)
+BUDGETS = {
+    "NormalizingAudio": (3, 2, 12, 2),
+    "Transcribing": (1, 3, 8, 3),
+    "Summarizing": (5, 8, 25, 8),
+    "Completed": (1, 4, 9, 4),
+}
+TOTAL_BUDGET = (10, 17, 54, 17)
+# lower bounds
+SESSION_SAVED = {"reads_saved": 12, "writes_saved": 4}
+
+cache_dir = str(use_temporary_cache())
+stub_volumes()
+
+
+def fake_transcript(enable_speakers):
+    segments = [
+        {"start": i * 3.0, "end": i * 3.0 + 2.5, "text": sentences(12, seed=i), "speaker": f"SPEAKER_{i % 2:02d}"}
+        for i in range(SEGMENTS)
+    ]
+    output = {"text": " ".join(s["text"] for s in segments), "segments": segments, "language": "en"}
+    if enable_speakers:
+        output["speaker_transcript"] = "\n".join(f"{s['speaker']}: {s['text']}" for s in segments)
+    return output
+
+
+class StubWhisperX:
+    class transcribe_and_diarize:
+        @staticmethod
+        def remote(path, enable_speakers, num_speakers, speech_index=None):
+            return fake_transcript(enable_speakers), 1.0
+
+
+transcribe_stub = types.ModuleType(f"{PACKAGE}.functions.transcribe")
+transcribe_stub.WhisperX = transcribe_stub.WhisperXCPU = StubWhisperX
+load("functions")
+sys.modules[transcribe_stub.__name__] = transcribe_stub
+
+use_available_tokenizer()
+gemini_processor = load("lib.gemini.processor")
+gemini_processor.processor.client = FakeGeminiClient(0)
+
+normalize = load("lib.asr.normalize")
+
+
+def fake_normalize(source, destination):
+    destination.write_bytes(b"\0" * 1024)
+    return {"duration": SEGMENTS * 3.0, "source_bytes": 4096, "normalized_bytes": 1024}
+
+
+normalize.normalize_audio = fake_normalize
+
+states = load("lib.ProcessingStates.fetching_audio")
+load("lib.ProcessingStates.normalizing_audio").SPEECH_INDEX_ENABLED = False
+transcribing = load("lib.ProcessingStates.transcribing")
+transcribing.STREAMING_TRANSCRIPTION = False
+transcribing.SHARDING_ENABLED = False
+job_session = load("lib.job_session")
+utils = load("lib.utils")
+
+
+class Counter:
+    """Counts filesystem calls under the cache directory"""
+
+    def __init__(self):
+        self.counts = collections.Counter()
+        self.originals = (builtins.open, os.stat, os.replace)
+
+    def _ours(self, path) -> bool:
+        return str(path).startswith(cache_dir)
+
+    def __enter__(self):
+        real_open, real_stat, real_replace = self.originals
+
+        def counting_open(file, mode="r", *args, **kwargs):
+            if self._ours(file):
+                self.counts["open(write)" if any(c in mode for c in "wax+") else "open(read)"] += 1
+            return real_open(file, mode, *args, **kwargs)
+
+        def counting_stat(path, *args, **kwargs):
+            if self._ours(path):
+                self.counts["stat"] += 1
+            return real_stat(path, *args, **kwargs)
+
+        def counting_replace(src, dst, *args, **kwargs):
+            if self._ours(dst):
+                self.counts["replace"] += 1
+            return real_replace(src, dst, *args, **kwargs)
+
+        builtins.open, os.stat, os.replace = counting_open, counting_stat, counting_replace
+        return self
+
+    def __exit__(self, *exc):
+        builtins.open, os.stat, os.replace = self.originals
+
+
+async def run_job() -> tuple[list, dict]:
+    # an uploaded job: speaker settings and title stored, audio on the volume
+    utils.store_speaker_settings(VID, True, 2)
+    handler = utils.output_handler(VID)
+    handler.update_field("status", "FetchingAudio")
+    handler.update_field("title", "benchmark")
+    handler.write_transcription_data()
+    utils.audio_path(VID).write_bytes(b"\0" * 4096)
+
+    per_state = []
+    stats = {}
+    checkpoint = job_session.JobSession.checkpoint
+    stats_of = job_session.JobSession.stats
+
+    with Counter() as counter:
+        def counted_checkpoint(session, label=""):
+            before = session.checkpoints
+            checkpoint(session, label)
+            if session.checkpoints != before:
+                per_state.append((label, dict(counter.counts)))
+
+        def recorded_stats(session):
+            stats.update(stats_of(session))
+            return stats
+
+        job_session.JobSession.checkpoint = counted_checkpoint
+        job_session.JobSession.stats = recorded_stats
+        try:
+            await states.FetchingAudioProcessingState().run_job(VID)
+        finally:
+            job_session.JobSession.checkpoint = checkpoint
+            job_session.JobSession.stats = stats_of
+    return per_state, stats
+
+
+def check(rows: list, total: dict, stats: dict) -> list[str]:
+    failures = []
+    labels = [label for label, _ in rows]
+    if labels != list(BUDGETS):
+        failures.append(f"checkpoints {labels}, expected {list(BUDGETS)}")
+    for label, counts in rows + [("total", total)]:
+        budget = TOTAL_BUDGET if label == "total" else BUDGETS.get(label)
+        if budget is None:
+            continue
+        for kind, limit in zip(KINDS, budget):
+            if counts.get(kind, 0) > limit:
+                failures.append(f"{label}: {counts.get(kind, 0)} {kind}, budget {limit}")
+    for key, minimum in SESSION_SAVED.items():
+        if stats.get(key, 0) < minimum:
+            failures.append(f"session {key} {stats.get(key, 0)}, expected at least {minimum}")
+    return failures
+
+
+def main():
+    try:
+        per_state, stats = asyncio.run(run_job())
+    finally:
+        shutil.rmtree(cache_dir)
+    print(f"\n{SEGMENTS} segments, speakers on; filesystem calls per checkpoint")
+    print(f"{'checkpoint':18}" + "".join(f"{kind:>12}" for kind in KINDS))
+    rows = []
+    previous = {}
+    for label, counts in per_state:
+        rows.append((label, {k: counts.get(k, 0) - previous.get(k, 0) for k in KINDS}))
+        print(f"{label:18}" + "".join(f"{rows[-1][1][k]:12d}" for k in KINDS))
+        previous = counts
+    print(f"{'total':18}" + "".join(f"{previous.get(k, 0):12d}" for k in KINDS))
+    print(f"\nsession: {stats}")
+
+    failures = check(rows, previous, stats)
+    for failure in failures:
+        print(failure)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
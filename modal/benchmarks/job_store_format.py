@@ -0,0 +1,90 @@
+"""
+Stored size and read/write time of a job's `data` for 1-3 hour episodes,
+per JOB_STORE_FORMAT, against the legacy single indent=4 JSON document.
+
+The documents are synthetic (150 words a minute, a speaker transcript, a
+summary), so ratios are more meaningful than absolute sizes.
+
+    python modal/benchmarks/job_store_format.py
+"""
+
+import json
+import random
+import shutil
+import tempfile
+import time
+
+from _harness import load
+
+HOURS = (1, 2, 3)
+READS = 5
+
+job_store = load("lib.job_store")
+
+
+def vocabulary(rng: random.Random, size: int = 5000) -> tuple[list[str], list[float]]:
+    """Made-up words with Zipf frequencies, roughly how English compresses"""
+    syllables = [c + v for c in "bcdfghklmnprstvwz" for v in "aeiou"]
+    pool = sorted({"".join(rng.choices(syllables, k=rng.randint(1, 3))) for _ in range(size)}, key=lambda word: (len(word), word))
+    return pool, [1 / rank for rank in range(1, len(pool) + 1)]
+
+
+def document(hours: int) -> dict:
+    rng = random.Random(hours)
+    count = 150 * 60 * hours
+    pool, weights = vocabulary(rng)
+    text = " ".join(rng.choices(pool, weights, k=count))
+    speaker_transcript = "\n\n".join(
+        f"SPEAKER_0{i % 2}: " + " ".join(rng.choices(pool, weights, k=60))
+        for i in range(count // 60)
+    )
+    return {
+        "text": text,
+        "speaker_transcript": speaker_transcript,
+        "summary_gemini": text[:6000],
+        "processing_time": 321.5,
+        "speaker_mappings": {"SPEAKER_00": "Ann", "SPEAKER_01": "Bob"},
+    }
+
+
+def measure(suffix: str, data: dict) -> tuple[int, float, float]:
+    root = job_store.pathlib.Path(tempfile.mkdtemp(prefix="job_store_"))
+    try:
+        job_store.DATA_SUFFIX = suffix
+        start = time.perf_counter()
+        job_store.JobStore("bench", root=root).replace_data(data)
+        write = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(READS):
+            assert job_store.JobStore("bench", root=root).read_data() == data
+        read = (time.perf_counter() - start) / READS
+
+        size = sum(path.stat().st_size for path in (root / "bench" / job_store.DATA_DIR).iterdir())
+        return size, write, read
+    finally:
+        shutil.rmtree(root)
+
+
+def main():
+    formats = dict(job_store.FORMAT_SUFFIXES)
+    if job_store._zstd() is None:
+        print("zstandard not installed; skipping zstd")
+        formats.pop("zstd")
+
+    print(f"{'hours':>5} {'format':7} {'KB':>8} {'vs legacy':>9} {'write ms':>9} {'read ms':>8}")
+    for hours in HOURS:
+        data = document(hours)
+        legacy = json.dumps({"status": "Completed", "data": data}, indent=4, ensure_ascii=False).encode()
+        start = time.perf_counter()
+        for _ in range(READS):
+            json.loads(legacy)
+        legacy_read = (time.perf_counter() - start) / READS
+        print(f"{hours:5d} {'legacy':7} {len(legacy) / 1024:8.0f} {1:9.2f} {'':>9} {legacy_read * 1000:8.1f}")
+        for name, suffix in formats.items():
+            size, write, read = measure(suffix, data)
+            print(f"{hours:5d} {name:7} {size / 1024:8.0f} {size / len(legacy):9.2f} {write * 1000:9.1f} {read * 1000:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
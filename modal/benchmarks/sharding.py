@@ -0,0 +1,146 @@
+"""
+Split, per-shard transcription and stitching of a long recording on the CPU.
+
+Synthesizes AUDIO_SECONDS of "conversation": VOICES speakers, each a tone
+of its own pitch, taking turns of 8-40 s separated by short pauses over a
+faint noise floor. plan_waveform_shards cuts it into SHARD_SECONDS shards,
+LocalShardWorker transcribes and diarizes each one (StubWhisperModel and
+StubDiarizer, which labels speakers per shard in order of appearance) on a
+thread pool, and stitch_shards puts them back together. Exits 1 unless:
+
+- stitched segments start in order and tile the input from 0 to its end;
+- every voice carries one global label in every shard, and no two voices
+  share one, although the shards' own labels disagree.
+
+    python modal/benchmarks/sharding.py
+"""
+
+import sys
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from _harness import load
+
+SAMPLE_RATE = 16000
+AUDIO_SECONDS = 1800
+SHARD_SECONDS = 300
+VOICES = (200.0, 700.0, 1300.0)  # Hz
+SEGMENT_SECONDS = 2.0
+# a stitched segment is checked when this share of it is one voice
+DOMINANT_SHARE = 0.9
+TOLERANCE = 0.01
+
+stub = load("lib.asr.stub")
+sharding = load("lib.asr.sharding")
+
+
+def conversation(rng) -> tuple[np.ndarray, list[tuple[float, float, int]]]:
+    """(audio, [(start, end, voice)]) with the voices taking turns"""
+    t = np.arange(AUDIO_SECONDS * SAMPLE_RATE) / SAMPLE_RATE
+    audio = (rng.standard_normal(len(t)) * 1e-4).astype(np.float32)
+    turns = []
+    position = 0.0
+    voice = 0
+    while position < AUDIO_SECONDS - 1:
+        end = min(position + rng.uniform(8, 40), AUDIO_SECONDS)
+        lo, hi = int(position * SAMPLE_RATE), int(end * SAMPLE_RATE)
+        audio[lo:hi] += 0.3 * np.sin(2 * np.pi * VOICES[voice] * t[lo:hi]).astype(np.float32)
+        turns.append((position, end, voice))
+        voice = (voice + int(rng.integers(1, len(VOICES)))) % len(VOICES)
+        position = end + rng.uniform(0.3, 1.5)
+    return audio, turns
+
+
+def dominant_voice(turns, start: float, end: float):
+    """The voice covering DOMINANT_SHARE of [start, end), or None"""
+    for turn_start, turn_end, voice in turns:
+        overlap = min(turn_end, end) - max(turn_start, start)
+        if overlap >= DOMINANT_SHARE * (end - start):
+            return voice
+    return None
+
+
+def check_timeline(segments: list[dict]) -> list[str]:
+    failures = []
+    if abs(segments[0]["start"]) > TOLERANCE:
+        failures.append(f"first segment starts at {segments[0]['start']}")
+    if abs(segments[-1]["end"] - AUDIO_SECONDS) > TOLERANCE:
+        failures.append(f"last segment ends at {segments[-1]['end']}, audio is {AUDIO_SECONDS}s")
+    for previous, segment in zip(segments, segments[1:]):
+        if not segment["start"] >= previous["start"] or segment["end"] < segment["start"]:
+            failures.append(f"segment {segment['start']}-{segment['end']} out of order")
+        elif abs(segment["start"] - previous["end"]) > TOLERANCE:
+            failures.append(f"gap or overlap between {previous['end']} and {segment['start']}")
+    return failures
+
+
+def check_speakers(segments: list[dict], turns) -> tuple[list[str], dict]:
+    labels = defaultdict(set)  # voice -> global labels
+    for segment in segments:
+        voice = dominant_voice(turns, segment["start"], segment["end"])
+        if voice is not None:
+            labels[voice].add(segment.get("speaker"))
+    failures = [
+        f"voice {voice} ({VOICES[voice]:g} Hz) carries labels {sorted(map(str, found))}"
+        for voice, found in sorted(labels.items()) if len(found) != 1
+    ]
+    if len(labels) != len(VOICES):
+        failures.append(f"only voices {sorted(labels)} were found")
+    owners = defaultdict(list)
+    for voice, found in labels.items():
+        for label in found:
+            owners[label].append(voice)
+    failures += [f"{label} is shared by voices {voices}" for label, voices in owners.items() if len(voices) > 1]
+    return failures, {voice: min(map(str, found)) for voice, found in labels.items()}
+
+
+def main():
+    rng = np.random.default_rng(5)
+    audio, turns = conversation(rng)
+
+    start = time.perf_counter()
+    shards = sharding.plan_waveform_shards(audio, SHARD_SECONDS)
+    planned = time.perf_counter() - start
+
+    worker = sharding.LocalShardWorker(
+        audio, stub.StubWhisperModel(batch_latency=0.01, segment_seconds=SEGMENT_SECONDS), stub.StubDiarizer()
+    )
+    start = time.perf_counter()
+    results = sharding.run_shards_locally(worker, "synthetic", shards, num_speakers=len(VOICES))
+    transcribed = time.perf_counter() - start
+    start = time.perf_counter()
+    stitched = sharding.stitch_shards(results, max_speakers=len(VOICES))
+    stitched_in = time.perf_counter() - start
+
+    # shards whose first voice is not the first voice of the recording name it
+    # SPEAKER_00 locally, so the stitch has to remap it
+    relabelled = sum(
+        1 for shard in results
+        if any(
+            segment.get("speaker") == "SPEAKER_00"
+            and dominant_voice(turns, shard["start"] + segment["start"], shard["start"] + segment["end"]) not in (0, None)
+            for segment in shard["segments"]
+        )
+    )
+
+    segments = stitched["segments"]
+    failures = check_timeline(segments)
+    speaker_failures, names = check_speakers(segments, turns)
+    failures += speaker_failures
+
+    print(f"\n{AUDIO_SECONDS}s, {len(turns)} turns of {len(VOICES)} voices, {len(shards)} shards of ~{SHARD_SECONDS}s")
+    print(f"shard lengths s: {[round(shard['end'] - shard['start'], 1) for shard in shards]}")
+    print(f"plan {planned * 1000:.0f} ms, transcribe+diarize {transcribed:.2f} s, stitch {stitched_in * 1000:.0f} ms")
+    print(f"{len(segments)} stitched segments; {relabelled} shards used SPEAKER_00 for another voice")
+    print("global labels: " + ", ".join(f"{VOICES[voice]:g} Hz -> {label}" for voice, label in sorted(names.items())))
+    for failure in failures[:20]:
+        print(failure)
+    if failures:
+        sys.exit(1)
+    print("timeline and speaker labels consistent")
+
+
+if __name__ == "__main__":
+    main()
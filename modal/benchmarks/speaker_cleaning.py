@@ -0,0 +1,64 @@
+"""
+End-to-end latency of get_cleaned_speaker_transcript on a 6-chunk speaker
+transcript, sequential mode against parallel mode (speaker-ID pass, then
+all chunks at once), with a fake client taking DELAY seconds per request.
+
+    python modal/benchmarks/speaker_cleaning.py
+"""
+
+import asyncio
+import random
+import time
+
+from _harness import FakeGeminiClient, load, sentences, use_available_tokenizer
+
+DELAY = 0.3
+CHUNKS = 6
+
+use_available_tokenizer()
+gemini_config = load("lib.gemini.config")
+processor_module = load("lib.gemini.processor")
+
+# small chunks, so the transcript splits into CHUNKS pieces quickly
+gemini_config.TOKEN_LIMITS["cleaning_speaker"] = 600
+
+
+def speaker_transcript(turns: int) -> str:
+    rng = random.Random(3)
+    return "\n".join(
+        f"SPEAKER_{rng.randrange(3):02d}: {sentences(rng.randint(20, 60), seed=i)}"
+        for i in range(turns)
+    )
+
+
+def transcript_with_chunks(count: int) -> str:
+    processor = processor_module.GeminiProcessor(client=FakeGeminiClient())
+    turns = 10
+    while True:
+        text = speaker_transcript(turns)
+        chunks = processor._smart_chunk_text(text, gemini_config.TOKEN_LIMITS["cleaning_speaker"])
+        if len(chunks) == count:
+            return text
+        turns += 1
+
+
+async def run(mode: str, text: str) -> tuple[float, int, dict]:
+    processor_module.SPEAKER_CLEANING_MODE = mode
+    client = FakeGeminiClient(DELAY)
+    processor = processor_module.GeminiProcessor(client=client)
+    start = time.perf_counter()
+    result = await processor.get_cleaned_speaker_transcript(text)
+    return time.perf_counter() - start, len(client.calls), result["speaker_mappings"]
+
+
+def main():
+    text = transcript_with_chunks(CHUNKS)
+    rows = [(mode, *asyncio.run(run(mode, text))) for mode in ("sequential", "parallel")]
+    print(f"\n{CHUNKS} chunks, {DELAY}s per request")
+    print(f"{'mode':10} {'wall s':>7} {'requests':>8}  mappings")
+    for mode, elapsed, requests, mappings in rows:
+        print(f"{mode:10} {elapsed:7.2f} {requests:8d}  {mappings}")
+
+
+if __name__ == "__main__":
+    main()
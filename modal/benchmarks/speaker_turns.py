@@ -0,0 +1,168 @@
+"""
+Speaker transcript of a 20k-segment result: the old string-building pass
+of `_format_result` against SpeakerTurns.
+
+The old pass rendered a "SPEAKER: text" string per word run, split every
+one again to merge consecutive runs, and joined the result; SpeakerTurns
+records turns as (speaker, start, end) offsets into one text buffer and
+renders once. Both must give the same transcript, on random results with
+missing words, speakers and timings as well as on the benchmark inputs.
+Reports peak traced memory (tracemalloc) and time.
+
+    python modal/benchmarks/speaker_turns.py
+"""
+
+import gc
+import random
+import timeit
+import tracemalloc
+
+from _harness import load
+
+SEGMENTS = 20_000
+VOCABULARY = ["the", "a", "time:", "we", "said", "ratio 3: 1", "x", "", "  ", "hello,", "world."]
+
+turns = load("lib.asr.turns")
+
+
+def old_speaker_transcript(segments: list[dict]) -> str:
+    """The speaker transcript as WhisperXWorker._format_result built it before SpeakerTurns"""
+    speaker_parts = []
+    for segment in segments:
+        text = segment.get("text", "").strip()
+        if not text:
+            continue
+
+        words = segment.get("words", [])
+        if words and any(word.get("speaker") for word in words):
+            current_speaker = None
+            word_buffer = []
+            for word in words:
+                speaker = word.get("speaker", "UNKNOWN")
+                word_text = word.get("word", "").strip()
+                if speaker != current_speaker:
+                    if current_speaker and word_buffer:
+                        clean_text = " ".join(word_buffer).strip()
+                        if clean_text:
+                            speaker_parts.append(f"{current_speaker}: {clean_text}")
+                    current_speaker = speaker
+                    word_buffer = [word_text] if word_text else []
+                else:
+                    if word_text:
+                        word_buffer.append(word_text)
+            if current_speaker and word_buffer:
+                clean_text = " ".join(word_buffer).strip()
+                if clean_text:
+                    speaker_parts.append(f"{current_speaker}: {clean_text}")
+        else:
+            speaker = segment.get("speaker", "UNKNOWN")
+            speaker_parts.append(f"{speaker}: {text}")
+
+    merged_parts = []
+    current_speaker_id = None
+    current_text_parts = []
+    for part in speaker_parts:
+        if ": " in part:
+            speaker_id, text = part.split(": ", 1)
+            if speaker_id == current_speaker_id:
+                current_text_parts.append(text)
+            else:
+                if current_speaker_id and current_text_parts:
+                    merged_parts.append(f"{current_speaker_id}: {' '.join(current_text_parts)}")
+                current_speaker_id = speaker_id
+                current_text_parts = [text]
+    if current_speaker_id and current_text_parts:
+        merged_parts.append(f"{current_speaker_id}: {' '.join(current_text_parts)}")
+    return "\n".join(merged_parts)
+
+
+def new_speaker_transcript(segments: list[dict]) -> str:
+    return turns.SpeakerTurns.from_segments(segments).transcript
+
+
+def adversarial(rng: random.Random, count: int, with_words: bool = True) -> list[dict]:
+    """Frequent speaker switches, empty words and texts, missing speakers and timings"""
+    segments = []
+    t = 0.0
+    for _ in range(count):
+        words = []
+        speaker = f"SPEAKER_{rng.randrange(4):02d}"
+        for _ in range(rng.randrange(0, 14)):
+            word = {"word": rng.choice(VOCABULARY)}
+            if rng.random() > 0.1:
+                word.update(start=t, end=t + 0.3)
+            r = rng.random()
+            if r < 0.05:
+                pass
+            elif r < 0.07:
+                word["speaker"] = None
+            else:
+                if rng.random() < 0.15:
+                    speaker = f"SPEAKER_{rng.randrange(4):02d}"
+                word["speaker"] = speaker
+            t += 0.4
+            words.append(word)
+        segment = {"start": t - 4, "end": t, "text": " ".join(w["word"] for w in words) if rng.random() > 0.05 else "  "}
+        r = rng.random()
+        if r < 0.1:
+            segment["speaker"] = None
+        elif r < 0.9:
+            segment["speaker"] = speaker
+        if with_words and rng.random() > 0.2:
+            segment["words"] = words
+        segments.append(segment)
+    return segments
+
+
+def realistic(rng: random.Random, count: int) -> list[dict]:
+    """Long turns, a few untimed words, every word diarized"""
+    segments = []
+    t = 0.0
+    speaker = "SPEAKER_00"
+    for _ in range(count):
+        words = []
+        for _ in range(rng.randrange(3, 14)):
+            if rng.random() < 0.02:
+                speaker = f"SPEAKER_{rng.randrange(4):02d}"
+            word = {"word": rng.choice(["the", "a", "time:", "we", "said", "hello,", "world."])}
+            if rng.random() > 0.03:
+                word.update(start=t, end=t + 0.3, speaker=speaker)
+            t += 0.4
+            words.append(word)
+        segments.append({
+            "start": words[0].get("start", t),
+            "end": t,
+            "text": " ".join(w["word"] for w in words),
+            "speaker": speaker,
+            "words": words,
+        })
+    return segments
+
+
+def main():
+    rng = random.Random(0)
+    for _ in range(500):
+        segments = adversarial(rng, rng.randrange(0, 60), with_words=rng.random() > 0.2)
+        assert old_speaker_transcript(segments) == new_speaker_transcript(segments)
+    print("500 random results: identical transcripts")
+
+    print(f"\n{'input':12} {'impl':4} {'peak MB':>8} {'ms':>6}")
+    for name, segments in (
+        ("realistic", realistic(random.Random(2), SEGMENTS)),
+        ("adversarial", adversarial(random.Random(1), SEGMENTS)),
+    ):
+        assert old_speaker_transcript(segments) == new_speaker_transcript(segments)
+        for impl, fn in (("old", old_speaker_transcript), ("new", new_speaker_transcript)):
+            gc.collect()
+            tracemalloc.start()
+            fn(segments)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            seconds = min(timeit.repeat(lambda: fn(segments), number=1, repeat=5))
+            print(f"{name:12} {impl:4} {peak / 1e6:8.2f} {seconds * 1000:6.0f}")
+        speaker_turns = turns.SpeakerTurns.from_segments(segments)
+        print(f"{'':12} {len(speaker_turns)} turns in a {speaker_turns.turns.nbytes} byte array")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+assign_word_speakers time on hour-long transcripts, against whisperx.
+
+A synthetic diarization with a turn about every 4 s and a transcript of
+10 s segments with a word every 0.4 s. whisperx's pandas implementation is
+only timed on the 1 hour case (it is quadratic); its output must match.
+
+    python modal/benchmarks/speakers.py
+"""
+
+import copy
+import time
+
+import numpy as np
+import pandas as pd
+
+from _harness import load
+from speakers_equivalence import whisperx_assign_word_speakers
+
+CASES = ((1, 8), (3, 8))  # (hours, speakers)
+REFERENCE_MAX_HOURS = 1
+
+speakers = load("lib.asr.speakers")
+
+
+def build(hours: int, n_speakers: int, rng) -> tuple[pd.DataFrame, dict]:
+    duration = hours * 3600
+    n_turns = int(duration / 4)
+    starts = np.sort(rng.uniform(0, duration, n_turns))
+    turns = pd.DataFrame({
+        "start": starts,
+        "end": starts + rng.uniform(0.5, 6, n_turns),
+        "speaker": [f"SPEAKER_{i:02d}" for i in rng.integers(n_speakers, size=n_turns)],
+    })
+    segments = [
+        {
+            "start": float(start),
+            "end": float(start + 10),
+            "words": [{"word": "w", "start": float(w), "end": float(w + 0.3)} for w in np.arange(start, start + 10, 0.4)],
+        }
+        for start in np.arange(0, duration, 10.0)
+    ]
+    return turns, {"segments": segments}
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main():
+    rng = np.random.default_rng(1)
+    print(f"{'hours':>5} {'turns':>6} {'words':>6} {'mode':14} {'ours ms':>8} {'whisperx s':>10}")
+    for hours, n_speakers in CASES:
+        turns, transcript = build(hours, n_speakers, rng)
+        words = sum(len(segment["words"]) for segment in transcript["segments"])
+        for fill_nearest, mode in ((True, "fill_nearest"), (False, "overlap only")):
+            ours, result = timed(
+                speakers.assign_word_speakers, turns.copy(), copy.deepcopy(transcript), fill_nearest=fill_nearest
+            )
+            reference = "not run"
+            if hours <= REFERENCE_MAX_HOURS:
+                seconds, expected = timed(
+                    whisperx_assign_word_speakers, turns.copy(), copy.deepcopy(transcript), fill_nearest=fill_nearest
+                )
+                assert expected == result, "assignments differ from whisperx"
+                reference = f"{seconds:.1f}"
+            print(f"{hours:5d} {len(turns):6d} {words:6d} {mode:14} {ours * 1000:8.0f} {reference:>10}")
+
+
+if __name__ == "__main__":
+    main()
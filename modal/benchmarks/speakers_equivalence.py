@@ -0,0 +1,183 @@
+"""
+assign_word_speakers against whisperx's own implementation, word for word.
+
+Generates random diarizations and transcripts (continuous times, 0.5 s and
+20 ms frame grids, overlapping and zero-length turns, words without
+timings) and requires lib.asr.speakers to assign exactly the speakers
+whisperx 3.4.0 does, in both modes. A second family of short clips with a
+few turns on 10 ms and 100 ms grids makes totals that tie in exact
+arithmetic but differ in the last bits (-3.3399999999999994 against -3.34)
+common, which is where summation order decides the result.
+
+    python modal/benchmarks/speakers_equivalence.py [trials]
+"""
+
+import copy
+import sys
+
+import numpy as np
+import pandas as pd
+
+from _harness import load
+
+TRIALS = 2000
+
+speakers = load("lib.asr.speakers")
+
+
+def whisperx_assign_word_speakers(diarize_df, transcript_result, speaker_embeddings=None, fill_nearest=False):
+    # whisperx 3.4.0, whisperx/diarize.py, copied unchanged
+    # (BSD 2-Clause License, Copyright (c) 2024, Max Bain)
+    transcript_segments = transcript_result["segments"]
+    for seg in transcript_segments:
+        # assign speaker to segment (if any)
+        diarize_df['intersection'] = np.minimum(diarize_df['end'], seg['end']) - np.maximum(diarize_df['start'], seg['start'])
+        diarize_df['union'] = np.maximum(diarize_df['end'], seg['end']) - np.minimum(diarize_df['start'], seg['start'])
+        # remove no hit, otherwise we look for closest (even negative intersection...)
+        if not fill_nearest:
+            dia_tmp = diarize_df[diarize_df['intersection'] > 0]
+        else:
+            dia_tmp = diarize_df
+        if len(dia_tmp) > 0:
+            # sum over speakers
+            speaker = dia_tmp.groupby("speaker")["intersection"].sum().sort_values(ascending=False).index[0]
+            seg["speaker"] = speaker
+
+        # assign speaker to words
+        if 'words' in seg:
+            for word in seg['words']:
+                if 'start' in word:
+                    diarize_df['intersection'] = np.minimum(diarize_df['end'], word['end']) - np.maximum(diarize_df['start'], word['start'])
+                    diarize_df['union'] = np.maximum(diarize_df['end'], word['end']) - np.minimum(diarize_df['start'], word['start'])
+                    # remove no hit
+                    if not fill_nearest:
+                        dia_tmp = diarize_df[diarize_df['intersection'] > 0]
+                    else:
+                        dia_tmp = diarize_df
+                    if len(dia_tmp) > 0:
+                        # sum over speakers
+                        speaker = dia_tmp.groupby("speaker")["intersection"].sum().sort_values(ascending=False).index[0]
+                        word["speaker"] = speaker
+
+    # Add speaker embeddings to the result if provided
+    if speaker_embeddings is not None:
+        transcript_result["speaker_embeddings"] = speaker_embeddings
+
+    return transcript_result
+
+
+def make_case(rng, duration, n_turns, n_speakers, n_segments, grid=None, overlap=False, zero=False):
+    """(diarization DataFrame in shuffled row order, transcript result)"""
+    def snap(x):
+        return round(x / grid) * grid if grid else x
+
+    turns = []
+    position = 0.0
+    for _ in range(n_turns):
+        start = position if not overlap else max(position - rng.uniform(0, 2), 0)
+        length = rng.uniform(0.5, max(duration / n_turns * 1.5, 0.6))
+        if zero and rng.random() < 0.05:
+            length = 0
+        turns.append({
+            "start": snap(start),
+            "end": snap(start + length),
+            "speaker": f"SPEAKER_{rng.integers(n_speakers):02d}",
+        })
+        position = start + length + rng.uniform(0, 1.0)
+    rng.shuffle(turns)
+
+    segments = []
+    position = 0.0
+    for _ in range(n_segments):
+        start = snap(position + rng.uniform(0, 2))
+        end = snap(start + rng.uniform(0.5, 20))
+        words = []
+        word_start = start
+        while word_start < end:
+            word_end = snap(min(word_start + rng.uniform(0.1, 0.8), end))
+            # some words come back from alignment without timings
+            words.append({"word": "x", "start": word_start, "end": word_end} if rng.random() > 0.1 else {"word": "1"})
+            word_start = snap(word_end + rng.uniform(0, 0.3))
+        segment = {"start": start, "end": end, "text": "x"}
+        if rng.random() > 0.05:
+            segment["words"] = words
+        segments.append(segment)
+        position = end
+    return pd.DataFrame(turns), {"segments": segments}
+
+
+def assigned(result: dict) -> list:
+    return [
+        (item.get("start"), item.get("end"), item.get("speaker"))
+        for segment in result["segments"]
+        for item in [segment] + segment.get("words", [])
+    ]
+
+
+def check_edge_cases():
+    empty = pd.DataFrame(columns=["start", "end", "speaker"])
+    for fill_nearest in (False, True):
+        transcript = {"segments": [{"start": 0, "end": 1, "words": [{"start": 0, "end": 1}, {"word": "a"}]}]}
+        expected = whisperx_assign_word_speakers(empty.copy(), copy.deepcopy(transcript), fill_nearest=fill_nearest)
+        actual = speakers.assign_word_speakers(empty.copy(), copy.deepcopy(transcript), fill_nearest=fill_nearest)
+        assert expected == actual
+        result = speakers.assign_word_speakers(empty.copy(), {"segments": []}, {"S": [1]}, fill_nearest)
+        assert result == {"segments": [], "speaker_embeddings": {"S": [1]}}
+
+
+def broad_case(rng, trial: int) -> dict:
+    return dict(
+        duration=rng.uniform(10, 600),
+        n_turns=int(rng.integers(1, 60)),
+        n_speakers=int(rng.integers(1, 12)),
+        n_segments=int(rng.integers(1, 25)),
+        grid=[None, 0.5, 0.02][trial % 3],
+        overlap=bool(trial % 2),
+        zero=trial % 5 == 0,
+    )
+
+
+def near_tie_case(rng, trial: int) -> dict:
+    """Few turns on a fine grid: distance totals of different speakers often tie"""
+    return dict(
+        duration=rng.uniform(5, 30),
+        n_turns=int(rng.integers(2, 7)),
+        n_speakers=int(rng.integers(2, 4)),
+        n_segments=int(rng.integers(1, 4)),
+        grid=[0.01, 0.1][trial % 2],
+        overlap=trial % 3 == 0,
+    )
+
+
+def main():
+    trials = int(sys.argv[1]) if len(sys.argv) > 1 else TRIALS
+    check_edge_cases()
+    rng = np.random.default_rng(7)
+    queries = 0
+    mismatches = {False: [], True: []}
+    for trial in range(2 * trials):
+        family = broad_case if trial < trials else near_tie_case
+        diarization, transcript = make_case(rng, **family(rng, trial))
+        for fill_nearest in (False, True):
+            expected = assigned(whisperx_assign_word_speakers(
+                diarization.copy(), copy.deepcopy(transcript), fill_nearest=fill_nearest
+            ))
+            actual = assigned(speakers.assign_word_speakers(
+                diarization.copy(), copy.deepcopy(transcript), fill_nearest=fill_nearest
+            ))
+            queries += len(expected)
+            if expected != actual:
+                first = next(i for i, (a, b) in enumerate(zip(expected, actual)) if a != b)
+                mismatches[fill_nearest].append((trial, expected[first], actual[first][2]))
+
+    print(f"{trials} broad and {trials} near-tie cases per mode, {queries} segment/word assignments compared")
+    for fill_nearest, failed in mismatches.items():
+        print(f"fill_nearest={fill_nearest}: {len(failed)} mismatching cases")
+        for trial, (start, end, expected), actual in failed[:5]:
+            print(f"  trial {trial}: {start}-{end} whisperx {expected}, ours {actual}")
+    if any(mismatches.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
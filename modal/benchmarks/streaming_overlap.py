@@ -0,0 +1,114 @@
+"""
+Streaming transcription with cleaning overlapped, against transcribe then
+clean, on the stub model.
+
+StubWhisperModel decodes AUDIO_SECONDS of audio in windows of
+WINDOW_SECONDS (BATCH_LATENCY per batch of BATCH_SIZE 10s chunks, each
+chunk coming back as a sentence of prose), and FakeGeminiClient answers
+every cleaning request after DELAY seconds, CONCURRENCY at a time, so
+cleaning an hour takes a few rounds of requests. The streaming run feeds
+transcribe_stream_local into TranscribingProcessingState.
+transcribe_and_clean_stream, as run_job does with WhisperX.transcribe_stream;
+the baseline decodes the whole file and then runs clean_text. The first
+cleaning request must go out before decoding finishes, and the streaming
+run must finish first.
+
+    python modal/benchmarks/streaming_overlap.py
+"""
+
+import asyncio
+import sys
+import time
+
+import numpy as np
+
+from _harness import FakeGeminiClient, load, sentences, stub_volumes, use_available_tokenizer, use_temporary_cache
+
+AUDIO_SECONDS = 3600
+WINDOW_SECONDS = 600
+BATCH_SIZE = 16
+BATCH_LATENCY = 0.25
+DELAY = 1.0
+CONCURRENCY = 2
+CLEANING_TOKENS = 1000
+
+use_temporary_cache()
+stub_volumes()
+use_available_tokenizer()
+stub = load("lib.asr.stub")
+streaming = load("lib.asr.streaming")
+gemini_config = load("lib.gemini.config")
+gemini_processor = load("lib.gemini.processor")
+transcribing = load("lib.ProcessingStates.transcribing")
+
+# several cleaning chunks per hour of stub prose
+gemini_config.TOKEN_LIMITS["cleaning_normal"] = CLEANING_TOKENS
+
+
+class ProseStubModel(stub.StubWhisperModel):
+    """StubWhisperModel whose chunks decode to prose, timestamped when done"""
+
+    def __init__(self):
+        super().__init__(batch_latency=BATCH_LATENCY)
+        self.decoded = 0
+        self.last_batch_at = None
+
+    def decode_batch(self, chunks: list, language: str) -> list[str]:
+        super().decode_batch(chunks, language)
+        self.last_batch_at = time.perf_counter()
+        texts = [sentences(25, seed=self.decoded + i) for i in range(len(chunks))]
+        self.decoded += len(chunks)
+        return texts
+
+
+async def run(mode: str) -> dict:
+    model = ProseStubModel()
+    client = FakeGeminiClient(DELAY)
+    gemini_processor.processor.client = client
+    gemini_processor.processor.max_concurrency = CONCURRENCY
+    state = transcribing.TranscribingProcessingState()
+    audio = np.zeros(AUDIO_SECONDS * streaming.SAMPLE_RATE, dtype=np.float32)
+
+    start = time.perf_counter()
+    if mode == "streaming":
+        stream = streaming.transcribe_stream_local(model, audio, BATCH_SIZE, WINDOW_SECONDS)
+        output_data, _, cleaned_text = await state.transcribe_and_clean_stream(stream)
+        output_data["text"] = cleaned_text
+    else:
+        result = await asyncio.to_thread(model.transcribe, audio, batch_size=BATCH_SIZE)
+        output_data = {"text": " ".join(segment["text"].strip() for segment in result["segments"])}
+        await state.clean_text(output_data)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "wall": elapsed,
+        "decoded": model.last_batch_at - start,
+        "first_request": client.calls[0][1] - start,
+        "requests": len(client.calls),
+        "chars": len(output_data["text"]),
+    }
+
+
+def main():
+    rows = {mode: asyncio.run(run(mode)) for mode in ("transcribe-then-clean", "streaming")}
+    print(f"\n{AUDIO_SECONDS}s of audio in {WINDOW_SECONDS}s windows, "
+          f"{DELAY}s per cleaning request, {CONCURRENCY} at a time")
+    print(f"{'mode':22} {'decoded s':>9} {'1st request s':>13} {'requests':>8} {'wall s':>7} {'chars':>7}")
+    for mode, row in rows.items():
+        print(f"{mode:22} {row['decoded']:9.2f} {row['first_request']:13.2f} "
+              f"{row['requests']:8d} {row['wall']:7.2f} {row['chars']:7d}")
+
+    streamed, baseline = rows["streaming"], rows["transcribe-then-clean"]
+    failures = []
+    if not streamed["first_request"] < streamed["decoded"]:
+        failures.append("streaming: first cleaning request only went out after decoding finished")
+    if not streamed["wall"] < baseline["wall"]:
+        failures.append("streaming was not faster than transcribe-then-clean")
+    for failure in failures:
+        print(failure)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
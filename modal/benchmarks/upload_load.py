@@ -0,0 +1,180 @@
+"""
+/fetch_data latency while /upload_file requests are being received.
+
+Drives the FastAPI app in-process (httpx ASGI transport, temp cache
+directory, stubbed volumes): POLLERS clients poll /fetch_data for a
+completed job while UPLOADS uploads of UPLOAD_MB each arrive at once. The
+"inline" rows replace the upload copy with the old loop that read 64KB
+chunks and wrote and hashed them on the event loop; "threaded" is the
+current copy_and_hash on worker threads.
+
+The temp directory is on local disk, where writes hit the page cache. The
+rows with a write latency add a sleep to every write() of an upload file,
+standing in for the network volume's per-write round trip.
+
+    python modal/benchmarks/upload_load.py
+"""
+
+import asyncio
+import hashlib
+import os
+import shutil
+import statistics
+import time
+
+import httpx
+
+from _harness import load, stub_volumes, use_temporary_cache
+
+UPLOADS = 4
+UPLOAD_MB = 100
+POLLERS = 8
+ROUNDS = 2
+WRITE_LATENCIES_MS = (0, 1)
+
+cache_dir = use_temporary_cache()
+stub_volumes()
+api = load("functions.api")
+upload_utils = load("lib.upload_utils")
+utils = load("lib.utils")
+
+threaded_stream_upload = api.stream_upload
+write_latency = 0.0
+
+
+class SlowWrites:
+    """File wrapper sleeping `write_latency` seconds in every write()"""
+
+    def __init__(self, file):
+        self.file = file
+
+    def write(self, data):
+        if write_latency:
+            time.sleep(write_latency)
+        return self.file.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+    def __enter__(self):
+        self.file.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self.file.__exit__(*exc)
+
+
+def upload_open(file, mode="r", *args, **kwargs):
+    handle = open(file, mode, *args, **kwargs)
+    return SlowWrites(handle) if "w" in mode else handle
+
+
+# copy_and_hash looks `open` up in its module globals first
+upload_utils.open = upload_open
+
+
+async def inline_stream_upload(file, fileName, upload_token=None):
+    """The pre-thread copy: 64KB reads, written and hashed on the loop"""
+    temp_file_path = os.path.join(upload_utils.RAW_AUDIO_DIR, f"{upload_utils.generate_upload_id()}.uploading")
+    hasher = hashlib.sha256()
+    total_bytes = 0
+    with upload_open(temp_file_path, "wb") as temp_file:
+        while True:
+            chunk = await file.read(65536)
+            if not chunk:
+                break
+            temp_file.write(chunk)
+            hasher.update(chunk)
+            total_bytes += len(chunk)
+    return await upload_utils.store_uploaded_file(temp_file_path, fileName, total_bytes, hasher.hexdigest())
+
+
+def seed_job(vid: str):
+    oh = utils.output_handler(vid)
+    oh.update_field("status", "Completed")
+    oh.update_field("data", {"text": "word " * 50_000, "summary_gemini": "summary"})
+    oh.write_transcription_data()
+
+
+def percentile(values: list, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+async def run(label: str, stream_upload, uploads: int, latency_ms: float = 0) -> dict:
+    global write_latency
+    write_latency = latency_ms / 1000
+    api.stream_upload = stream_upload
+    # bound to the previous run's event loop
+    upload_utils._copy_semaphore = None
+    latencies = []
+    done = asyncio.Event()
+    transport = httpx.ASGITransport(app=api.web_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+
+        async def poll():
+            while not done.is_set():
+                start = time.perf_counter()
+                response = await client.post("/fetch_data", json={"vid": "poll-job"})
+                latencies.append(time.perf_counter() - start)
+                assert response.status_code == 200, response.text
+                await asyncio.sleep(0.005)
+
+        async def upload(i: int, round_: int):
+            body = os.urandom(1 << 20) * UPLOAD_MB
+            response = await client.post(
+                "/upload_file",
+                files={"file": (f"u{round_}_{i}.mp3", body, "audio/mpeg")},
+                data={"fileName": f"u{round_}_{i}.mp3"},
+            )
+            assert response.status_code == 200, response.text
+
+        pollers = [asyncio.create_task(poll()) for _ in range(POLLERS)]
+        start = time.perf_counter()
+        if uploads:
+            for round_ in range(ROUNDS):
+                await asyncio.gather(*(upload(i, round_) for i in range(uploads)))
+        else:
+            await asyncio.sleep(2)
+        elapsed = time.perf_counter() - start
+        done.set()
+        await asyncio.gather(*pollers)
+
+    for path in upload_utils.RAW_AUDIO_DIR.iterdir():
+        path.unlink()
+    return {
+        "label": label,
+        "latency": latency_ms,
+        "elapsed": elapsed,
+        "mb_per_s": uploads * ROUNDS * UPLOAD_MB / elapsed,
+        "requests": len(latencies),
+        "p50": statistics.median(latencies) * 1000,
+        "p99": percentile(latencies, 0.99) * 1000,
+        "max": max(latencies) * 1000,
+    }
+
+
+def main():
+    try:
+        seed_job("poll-job")
+        rows = [asyncio.run(run("idle", threaded_stream_upload, 0))]
+        for latency_ms in WRITE_LATENCIES_MS:
+            rows.append(asyncio.run(run("inline", inline_stream_upload, UPLOADS, latency_ms)))
+            rows.append(asyncio.run(run("threaded", threaded_stream_upload, UPLOADS, latency_ms)))
+    finally:
+        shutil.rmtree(cache_dir)
+
+    print(f"\n{POLLERS} pollers; {ROUNDS} rounds of {UPLOADS} concurrent {UPLOAD_MB}MB uploads")
+    print(
+        f"{'uploads':9} {'write ms':>8} {'wall s':>7} {'MB/s':>6} "
+        f"{'fetches':>7} {'p50 ms':>7} {'p99 ms':>7} {'max ms':>7}"
+    )
+    for row in rows:
+        print(
+            f"{row['label']:9} {row['latency']:8g} {row['elapsed']:7.2f} {row['mb_per_s']:6.0f} "
+            f"{row['requests']:7d} {row['p50']:7.1f} {row['p99']:7.1f} {row['max']:7.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
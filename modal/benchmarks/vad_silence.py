@@ -0,0 +1,74 @@
+"""
+How much audio the speech index cuts from the GPU stages, by silence ratio.
+
+Synthesises an hour of 16 kHz audio: blocks of syllable-modulated noise
+around -20 dBFS ("speech") separated by gaps of -65 dBFS noise, in the
+proportion given by the silence ratio. For each ratio it reports the speech
+actually present, what the index keeps, the share skipped (transcription,
+alignment and diarization time scale roughly with it), speech the index
+missed, and the detection time on the CPU side.
+
+    python modal/benchmarks/vad_silence.py
+"""
+
+import time
+
+import numpy as np
+
+from _harness import load
+
+SAMPLE_RATE = 16000
+SECONDS = 3600
+RATIOS = (0.0, 0.1, 0.3, 0.5, 0.7, 0.9)
+
+vad = load("lib.asr.vad")
+
+
+def synthesize(silence_ratio: float, seed: int = 0) -> tuple[np.ndarray, list]:
+    rng = np.random.default_rng(seed)
+    audio = (rng.standard_normal(SECONDS * SAMPLE_RATE) * 10 ** (-65 / 20)).astype(np.float32)
+    speech = []
+    t = 0.0
+    while t < SECONDS:
+        length = rng.uniform(5, 60)
+        gap = length * silence_ratio / (1 - silence_ratio)
+        start, end = t, min(t + length, SECONDS)
+        n = int((end - start) * SAMPLE_RATE)
+        envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 4 * np.arange(n) / SAMPLE_RATE)
+        offset = int(start * SAMPLE_RATE)
+        audio[offset:offset + n] += (rng.standard_normal(n) * 0.1 * envelope).astype(np.float32)
+        speech.append((start, end))
+        t = end + gap
+    return audio, speech
+
+
+def missed_seconds(regions: list, speech: list) -> float:
+    """Speech not covered by any indexed region, at 10 ms resolution"""
+    covered = np.zeros(SECONDS * 100 + 1, dtype=bool)
+    for start, end in regions:
+        covered[int(start * 100):int(end * 100)] = True
+    return sum((~covered[int(start * 100):int(end * 100)]).sum() for start, end in speech) / 100
+
+
+def main():
+    print(f"{'silence':>7} {'speech s':>8} {'kept s':>7} {'skipped':>7} {'missed s':>8} {'used':>5} {'detect s':>8}")
+    for ratio in RATIOS:
+        audio, speech = synthesize(ratio)
+        start = time.perf_counter()
+        regions = vad.detect_speech(vad.frame_energies(audio), SECONDS)
+        detect = time.perf_counter() - start
+
+        field = {"version": vad.INDEX_VERSION, "duration": SECONDS, "regions": regions}
+        index = vad.SpeechIndex(regions)
+        # compact timestamps must map back onto the original timeline
+        assert all(abs(index.to_original(c) - r[0]) < 1e-3 for c, r in zip(index.compact_starts, index.regions))
+        used = vad.SpeechIndex.from_field(field) is not None
+        skipped = index.skipped_seconds(SECONDS) if used else 0.0
+        print(
+            f"{ratio:7.0%} {sum(e - s for s, e in speech):8.0f} {SECONDS - skipped:7.0f} "
+            f"{skipped / SECONDS:7.1%} {missed_seconds(regions, speech):8.2f} {str(used):>5} {detect:8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import logging
+import os
 import pathlib
 
 
@@ -23,6 +24,42 @@ RAW_AUDIO_DIR = pathlib.Path(CACHE_DIR, "raw_audio")
 # files structured as '{guid_hash}-{model_slug}.json'.
 TRANSCRIPTIONS_DIR = pathlib.Path(CACHE_DIR, "transcriptions")
 
+# Content-addressed Gemini responses, kept on the transcriptions volume so
+# re-runs of a job in a fresh container can reuse them.
+GEMINI_CACHE_DIR = pathlib.Path(TRANSCRIPTIONS_DIR, ".gemini_cache")
+
+# Stream transcribed segments out of the GPU worker in windows of this many
+# seconds, so Gemini cleaning can start before the whole file is decoded.
+STREAMING_TRANSCRIPTION = os.environ.get("STREAMING_TRANSCRIPTION", "1") != "0"
+STREAM_WINDOW_SECONDS = 600
+
+# Audio with more than this many seconds of speech is cut at pauses into
+# shards of about SHARD_SECONDS, transcribed on parallel GPU containers
+SHARDING_ENABLED = os.environ.get("SHARDING_ENABLED", "1") != "0"
+SHARDING_MIN_SECONDS = 2400
+SHARD_SECONDS = 1200
+
+# Concurrent inputs of the WhisperX worker fill decoder batches together
+CROSS_REQUEST_BATCHING = os.environ.get("CROSS_REQUEST_BATCHING", "1") != "0"
+
+# Short clips (and low-priority jobs) are transcribed by an int8 CPU tier
+# instead of loading large-v3 on a GPU. Durations are speech seconds.
+# Opt-in until the thresholds below are checked against real-time factors
+# measured on the CPU containers (benchmarks/cpu_tier_rtf.py).
+CPU_TIER_ENABLED = os.environ.get("CPU_TIER_ENABLED", "0") == "1"
+CPU_WHISPER_MODEL = os.environ.get("CPU_WHISPER_MODEL", "small")
+CPU_TIER_CORES = 8
+CPU_TIER_MAX_SECONDS = 180
+CPU_TIER_MAX_DIARIZE_SECONDS = 90
+CPU_TIER_LOW_PRIORITY_MAX_SECONDS = 1800
+
+# Detect speech regions on the CPU and send only those through the GPU stages
+SPEECH_INDEX_ENABLED = os.environ.get("SPEECH_INDEX_ENABLED", "1") != "0"
+
+# Web containers reload the transcriptions volume at most once per this many
+# seconds, however many pollers hit them in between.
+VOLUME_RELOAD_INTERVAL = float(os.environ.get("VOLUME_RELOAD_INTERVAL", "2"))
+
 # python dependencies
 BASE_PYTHON_PACKAGES = [
     "google-genai==1.25.0",
@@ -33,13 +70,13 @@ BASE_PYTHON_PACKAGES = [
     "ffmpeg-python",
     "mutagen",
     "python-multipart",
+    "numpy==2.0.2",
 ]
 
 ML_PYTHON_PACKAGES = [
     # Core PyTorch - using newer versions but keeping compatibility
     "torch==2.7.1",
     "torchaudio==2.7.1",
-    "numpy==2.0.2",
     
     # WhisperX and dependencies
     "git+https://github.com/m-bain/whisperx.git@v3.4.0",
@@ -53,6 +90,19 @@ ML_PYTHON_PACKAGES = [
 
 PYTHON_PACKAGES = BASE_PYTHON_PACKAGES + ML_PYTHON_PACKAGES
 
+# The CPU tier installs torch from the CPU-only index first, so the rest of
+# the stack resolves against it instead of pulling the CUDA wheels
+TORCH_CPU_INDEX_URL = "https://download.pytorch.org/whl/cpu"
+CPU_TORCH_PACKAGES = [
+    "torch==2.7.1",
+    "torchaudio==2.7.1",
+]
+CPU_ML_PYTHON_PACKAGES = [
+    "git+https://github.com/m-bain/whisperx.git@v3.4.0",
+    "ctranslate2==4.4.0",
+    "pyannote.audio==3.3.2",
+]
+
 
 APT_PACKAGES = [
     "git",
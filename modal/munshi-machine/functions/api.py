@@ -1,13 +1,17 @@
 from __future__ import unicode_literals
+import asyncio
+
 from fastapi import Request, FastAPI, responses
 
-from ..volumes import transcriptions_vol
+from ..volumes import transcriptions_vol, audio_storage_vol
 from .. import config
 
 # import modal functions and classes into this namespace for modal
 from .transcribe import WhisperX
 from .functions import init_transcription
-from ..lib.utils import output_handler
+from ..lib.volume_reload import ThrottledReloader
+from ..lib.progress import ProgressHub
+from ..lib.document_cache import DocumentCache
 
 from .middleware import add_cors
 
@@ -21,6 +25,14 @@ add_cors(web_app)
 
 WhisperXCls = WhisperX
 
+# shared by every poller hitting this container
+transcriptions_reloader = ThrottledReloader(transcriptions_vol)
+audio_reloader = ThrottledReloader(audio_storage_vol)
+# one progress poller per job for all of this container's SSE viewers
+progress_hub = ProgressHub()
+# parsed and serialized /fetch_data documents, validated per request
+document_cache = DocumentCache()
+
 from fastapi import (
     FastAPI,
     UploadFile,
@@ -45,6 +57,7 @@ async def valid_content_length(content_length: int = Header(None)):
 async def upload_file(
     file: UploadFile = File(...),
     fileName: str = Form(...),
+    uploadToken: str = Form(None),
 ):
     """
     Streaming upload endpoint that replaces the previous chunked upload system.
@@ -54,32 +67,10 @@ async def upload_file(
         logger.info(f"Upload request received - fileName: {fileName}, file size: {file.size if hasattr(file, 'size') else 'unknown'}")
         logger.info(f"File content type: {file.content_type}")
         
-        result = await stream_upload(file, fileName)
-        uploaded, fileId, is_existing = result[:3]
-
-        if uploaded:
-            if is_existing:
-                # File already exists, return special status to redirect
-                logger.info(f"Existing transcript found for file: {fileId}")
-                return responses.JSONResponse(
-                    content={
-                        "status": "transcript_exists", 
-                        "id": fileId,
-                        "message": "Transcript already exists for this file"
-                    }, 
-                    status_code=200
-                )
-            else:
-                # New file uploaded successfully
-                logger.info(f"New file uploaded successfully: {fileId}")
-                return responses.JSONResponse(
-                    content={"status": "file uploaded", "id": fileId}, status_code=200
-                )
-        else:
+        result = await stream_upload(file, fileName, upload_token=uploadToken)
+        if not result[0]:
             logger.error("Upload failed - stream_upload returned False")
-            return responses.JSONResponse(
-                content={"status": "file not uploaded"}, status_code=403
-            )
+        return _upload_result_response(result)
     except HTTPException as e:
         logger.error(f"HTTP Exception in upload: {e.status_code} - {e.detail}")
         raise e
@@ -87,9 +78,230 @@ async def upload_file(
         logger.error(f"Unexpected upload error: {e}", exc_info=True)
         raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=f"Upload failed: {str(e)}")
 
+def _upload_result_response(result):
+    """JSON response shared by /upload_file and resumable uploads"""
+    uploaded, fileId, is_existing = result[:3]
+    if not uploaded:
+        return responses.JSONResponse(
+            content={"status": "file not uploaded"}, status_code=403
+        )
+    if is_existing:
+        logger.info(f"Existing transcript found for file: {fileId}")
+        return responses.JSONResponse(
+            content={
+                "status": "transcript_exists",
+                "id": fileId,
+                "message": "Transcript already exists for this file"
+            },
+            status_code=200
+        )
+    logger.info(f"New file uploaded successfully: {fileId}")
+    return responses.JSONResponse(
+        content={"status": "file uploaded", "id": fileId}, status_code=200
+    )
+
+
+def _upload_session_error(error):
+    from ..lib.resumable_upload import UploadSessionNotFound
+
+    status_code = 404 if isinstance(error, UploadSessionNotFound) else 400
+    return responses.JSONResponse(content={"error": str(error)}, status_code=status_code)
+
+
+@web_app.post("/uploads")
+async def create_upload(request: Request):
+    """
+    Start a resumable upload: {"fileName", "size", "chunkSize"?, "uploadToken"?}.
+    Send chunks with PUT /uploads/{upload_id}?offset=N, check progress with
+    HEAD or GET /uploads/{upload_id}, then POST /uploads/{upload_id}/complete.
+    """
+    from ..lib.resumable_upload import UploadSession
+
+    payload = await request.json()
+    try:
+        session = await asyncio.to_thread(
+            UploadSession.create,
+            payload.get("fileName"),
+            payload.get("size"),
+            chunk_size=payload.get("chunkSize"),
+            upload_token=payload.get("uploadToken"),
+        )
+    except ValueError as error:
+        return _upload_session_error(error)
+    await audio_storage_vol.commit.aio()
+
+    return responses.JSONResponse(
+        content={
+            "upload_id": session.upload_id,
+            "chunk_size": session.info["chunk_size"],
+            "parts": session.part_count,
+        },
+        status_code=201,
+    )
+
+
+@web_app.put("/uploads/{upload_id}")
+async def upload_chunk(upload_id: str, offset: int, request: Request):
+    from ..lib.resumable_upload import UploadSession, UploadSessionNotFound, MAX_CHUNK_SIZE
+
+    content_length = request.headers.get("content-length")
+    if content_length is not None and int(content_length) > MAX_CHUNK_SIZE:
+        return responses.JSONResponse(content={"error": "Chunk too large"}, status_code=413)
+
+    data = await request.body()
+    try:
+        session = UploadSession(upload_id)
+        try:
+            await asyncio.to_thread(session.write_part, offset, data)
+        except UploadSessionNotFound:
+            # created on another container; pick up its commit and retry
+            await audio_reloader.reload(force=True)
+            session = UploadSession(upload_id)
+            await asyncio.to_thread(session.write_part, offset, data)
+    except ValueError as error:
+        return _upload_session_error(error)
+    # parts may be assembled by another container
+    await audio_storage_vol.commit.aio()
+
+    return responses.JSONResponse(
+        content={"upload_id": upload_id, "offset": offset, "length": len(data)},
+        status_code=200,
+    )
+
+
+async def _upload_status(upload_id: str) -> dict:
+    from ..lib.resumable_upload import UploadSession
+
+    await audio_reloader.reload()
+    return await asyncio.to_thread(UploadSession(upload_id).status)
+
+
+@web_app.head("/uploads/{upload_id}")
+async def upload_status_head(upload_id: str):
+    try:
+        status = await _upload_status(upload_id)
+    except ValueError as error:
+        return responses.Response(status_code=_upload_session_error(error).status_code)
+    return responses.Response(
+        status_code=200,
+        headers={
+            "Upload-Size": str(status["size"]),
+            "Upload-Chunk-Size": str(status["chunk_size"]),
+            "Upload-Received": str(status["received_bytes"]),
+            "Upload-Missing": ",".join(str(offset) for offset in status["missing_offsets"]),
+            "Cache-Control": "no-store",
+        },
+    )
+
+
+@web_app.get("/uploads/{upload_id}")
+async def upload_status(upload_id: str):
+    try:
+        status = await _upload_status(upload_id)
+    except ValueError as error:
+        return _upload_session_error(error)
+    return responses.JSONResponse(content=status, status_code=200)
+
+
+@web_app.post("/uploads/{upload_id}/complete")
+async def complete_upload(upload_id: str):
+    """Assemble and hash the parts, then dedup like /upload_file"""
+    import os
+    import uuid
+    from ..lib.resumable_upload import UploadSession
+    from ..lib.upload_utils import store_uploaded_file
+
+    await audio_reloader.reload(force=True)
+    session = UploadSession(upload_id)
+    temp_file_path = os.path.join(config.RAW_AUDIO_DIR, f"{upload_id}.{uuid.uuid4().hex[:8]}.uploading")
+    try:
+        info = await asyncio.to_thread(lambda: session.info)
+        total_bytes, content_hash = await asyncio.to_thread(session.assemble, temp_file_path)
+        result = await store_uploaded_file(
+            temp_file_path, info["fileName"], total_bytes, content_hash, info.get("claims")
+        )
+    except ValueError as error:
+        if os.path.exists(temp_file_path):
+            os.remove(temp_file_path)
+        return _upload_session_error(error)
+
+    await asyncio.to_thread(session.delete)
+    await audio_storage_vol.commit.aio()
+    return _upload_result_response(result)
+
+
+@web_app.post("/upload/negotiate")
+async def negotiate_upload(request: Request):
+    """
+    Pre-upload dedup. The client sends {"size", "sha256"} or
+    {"size", "fingerprint"} (see lib.upload_negotiation). If a completed
+    transcript exists for that content it is returned at once; otherwise
+    the client gets an upload token to pass to /upload_file as uploadToken.
+    """
+    from ..lib.upload_negotiation import (
+        is_sha256,
+        issue_upload_token,
+        lookup_fingerprint,
+    )
+    from ..lib.upload_utils import (
+        UPLOAD_MAX_BYTES,
+        check_existing_transcript,
+        generate_file_id_from_hash,
+    )
+
+    payload = await request.json()
+    size = payload.get("size")
+    sha256 = payload.get("sha256")
+    fingerprint = payload.get("fingerprint")
+    sha256 = sha256.lower() if isinstance(sha256, str) else sha256
+    fingerprint = fingerprint.lower() if isinstance(fingerprint, str) else fingerprint
+
+    if not isinstance(size, int) or size <= 0:
+        return responses.JSONResponse(content={"error": "size missing"}, status_code=400)
+    if size > UPLOAD_MAX_BYTES:
+        return responses.JSONResponse(content={"error": "File too large (max 500MB)"}, status_code=413)
+    if not is_sha256(sha256) and not is_sha256(fingerprint):
+        return responses.JSONResponse(
+            content={"error": "sha256 or fingerprint (64 hex chars) required"}, status_code=400
+        )
+
+    claimed_sha256 = sha256 if is_sha256(sha256) else None
+    claimed_fingerprint = fingerprint if is_sha256(fingerprint) else None
+
+    await transcriptions_reloader.reload()
+
+    known_sha256 = claimed_sha256
+    if known_sha256 is None:
+        entry = lookup_fingerprint(claimed_fingerprint, size)
+        if entry is not None:
+            known_sha256 = entry["sha256"]
+
+    if known_sha256:
+        file_id = generate_file_id_from_hash(known_sha256)
+        if check_existing_transcript(file_id):
+            logger.info(f"Negotiated upload matches existing transcript {file_id}")
+            return responses.JSONResponse(
+                content={
+                    "status": "transcript_exists",
+                    "id": file_id,
+                    "message": "Transcript already exists for this file"
+                },
+                status_code=200
+            )
+
+    token, expires_at = issue_upload_token(
+        size, sha256=claimed_sha256, fingerprint=claimed_fingerprint
+    )
+    return responses.JSONResponse(
+        content={"status": "upload_required", "upload_token": token, "expires_at": expires_at},
+        status_code=200
+    )
+
+
 @web_app.post("/transcribe_local")
 async def transcribe_local(request: Request):
     from ..lib.ProcessingStates.init_job import InitProcessingState
+    from ..lib.asr.routing import PRIORITIES
 
     logger.info(f"Received a request {request.client}")
 
@@ -98,12 +310,15 @@ async def transcribe_local(request: Request):
         vid = payload.get("vid")
         enable_speakers = payload.get("enable_speakers", True)  # Default to True
         num_speakers = payload.get("num_speakers", 2)          # Default to 2
+        priority = payload.get("priority", "normal")
         
         # Validate speaker settings
         if not isinstance(enable_speakers, bool):
             enable_speakers = True
         if not isinstance(num_speakers, int) or num_speakers < 1 or num_speakers > 10:
             num_speakers = 2
+        if priority not in PRIORITIES:
+            priority = "normal"
             
         logger.info(f"Processing transcription for {vid} - Speaker detection: {enable_speakers}, Expected speakers: {num_speakers}")
         
@@ -114,11 +329,16 @@ async def transcribe_local(request: Request):
 
     try:
         # Initialize the transcription job first (creates proper JSON with status)
-        await InitProcessingState().run_job(vid, chained=False)
+        from ..lib.job_session import JobSession
+        session = JobSession(vid)
+        await InitProcessingState().run_job(vid, chained=False, session=session)
         
         # Then store speaker settings in the properly initialized file
-        from ..lib.utils import store_speaker_settings
-        store_speaker_settings(vid, enable_speakers, num_speakers)
+        session.update(speaker_settings={
+            "enable_speakers": enable_speakers,
+            "num_speakers": num_speakers
+        }, priority=priority)
+        session.checkpoint("speaker_settings")
         
         call = init_transcription.spawn(vid)
         return responses.JSONResponse(
@@ -143,10 +363,8 @@ async def fetch_output(request: Request):
             content="bad request. vid missing", status_code=400
         )
     try:
-        transcriptions_vol.reload()
-        oh = output_handler(vid)
-        status, data, metadata = oh.status, oh.data, oh.get_metadata()
-        pass
+        await transcriptions_reloader.reload()
+        cached = document_cache.get(vid)
     except RuntimeError as Error:
         return responses.JSONResponse(
             content={
@@ -154,8 +372,109 @@ async def fetch_output(request: Request):
             },
             status_code=406,
         )
+    body, content_encoding = cached.encoded(request.headers.get("accept-encoding"))
+    headers = {"Vary": "Accept-Encoding"}
+    if content_encoding:
+        headers["Content-Encoding"] = content_encoding
+    return responses.Response(
+        content=body, media_type="application/json", status_code=200, headers=headers
+    )
+
+
+@web_app.get("/cache_stats")
+async def cache_stats():
+    return {
+        "documents": document_cache.stats(),
+        "volume_reloads": {
+            "reloads": transcriptions_reloader.reloads,
+            "skipped": transcriptions_reloader.skipped,
+        },
+    }
+
+
+@web_app.get("/job_status/{vid}")
+async def job_status(vid: str, request: Request):
+    """
+    Status, stage timings and progress of a job without its transcript.
+    Supports conditional requests (If-None-Match / If-Modified-Since).
+    """
+    from ..lib.job_status import get_job_status, etag_for, http_date, is_not_modified
+
+    await transcriptions_reloader.reload()
+    document, last_modified = get_job_status(vid)
+    if document is None:
+        return responses.JSONResponse(
+            content={"error": "Job not found"}, status_code=404
+        )
+
+    etag = etag_for(document)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(last_modified),
+        "Cache-Control": "no-cache",
+    }
+    if is_not_modified(request.headers, etag, last_modified):
+        return responses.Response(status_code=304, headers=headers)
+
+    return responses.JSONResponse(content=document, status_code=200, headers=headers)
+
+
+@web_app.get("/job_events/{vid}")
+async def job_events(vid: str, request: Request):
+    """
+    Server-Sent Events stream of a job's state transitions and Gemini chunk
+    progress. Starts with a `snapshot` of the current status; reconnecting
+    clients resume after their Last-Event-ID.
+    """
+    from ..lib.job_status import get_job_status
+    from ..lib.progress import TERMINAL_STATES, format_sse
+
+    try:
+        last_id = int(request.headers.get("last-event-id") or 0)
+    except ValueError:
+        last_id = 0
+
+    await transcriptions_reloader.reload()
+    document, _ = get_job_status(vid)
+    if document is None:
+        return responses.JSONResponse(
+            content={"error": "Job not found"}, status_code=404
+        )
+
+    async def event_stream():
+        yield format_sse(document, name="snapshot")
+        if document["status"] in TERMINAL_STATES:
+            return
+        async for event in progress_hub.subscribe(vid, last_id=last_id):
+            if await request.is_disconnected():
+                return
+            yield format_sse(event)
+
+    return responses.StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@web_app.get("/words/{vid}")
+async def words(vid: str, start: float = None, end: float = None):
+    """
+    Word timings of a transcript (words starting in [start, end) seconds,
+    all by default), for seeking the audio and subtitle export. Only jobs
+    transcribed with speakers are aligned word by word.
+    """
+    from ..lib.job_store import JobStore
+
+    await transcriptions_reloader.reload()
+    timings = JobStore(vid).read_words()
+    if timings is None:
+        return responses.JSONResponse(
+            content={"error": "No word timings for this job"}, status_code=404
+        )
     return responses.JSONResponse(
-        content={"status": status, "data": data, "metadata": metadata}, status_code=200
+        content={"count": len(timings), "words": timings.words(start, end)},
+        status_code=200,
     )
 
 
@@ -175,16 +494,18 @@ async def update_speakers(request: Request):
         )
 
     try:
-        oh = output_handler(vid)
-        
-        # Update speaker mappings in the data
-        if not hasattr(oh, 'data') or oh.data is None:
-            oh.data = {}
-        oh.data["speaker_mappings"] = speaker_mappings
-        
-        # Save the updated data
-        oh.write_transcription_data()
+        from ..lib.job_store import JobStore
+
+        store = JobStore(vid)
+        if not store.exists():
+            return responses.JSONResponse(
+                content={"error": "Job not found"}, status_code=404
+            )
+
+        # Only the mappings file is rewritten; the transcript is never read
+        store.write_data_key("speaker_mappings", speaker_mappings)
         transcriptions_vol.commit()
+        document_cache.invalidate(vid)
         
         logger.info(f"Updated speaker mappings for {vid}: {speaker_mappings}")
         
@@ -20,21 +20,27 @@ logger = config.get_logger(__name__)
     timeout=2000,
 )
 async def init_transcription(vid: str = None):
-    from ..lib.utils import output_handler
+    from ..lib.job_session import JobSession
+    from ..lib.progress import current_publisher
 
     transcriptions_vol.reload()
     audio_storage_vol.reload()
 
     logger.info("Running init_transcription function")
-    # refresh volumes
-    oh = output_handler(vid)
+    # one in-memory job document for the whole state chain
+    session = JobSession(vid)
+    # Gemini chunk counts anywhere below this call report to this job
+    current_publisher.set(session.progress)
     try:
-        if oh.get_output() == -1:
-            await InitProcessingState().run_job(vid)
+        # missing or corrupt document: start over from Init, as get_output() == -1 did
+        if not session.handler.loaded:
+            await InitProcessingState().run_job(vid, session=session)
         else:
-            await processingStateFactory(oh.status).run_job(vid)
+            await processingStateFactory(session.status).run_job(vid, session=session)
 
     except Exception as E:
         logger.info(f"Unknown error occurred: {E}")
         return "Unknown Error"
+    finally:
+        await session.progress.close()
 
@@ -16,7 +16,17 @@ def add_cors(app: FastAPI):
         CORSMiddleware,
         allow_origins=origins,
         allow_credentials=True,
-        allow_methods=["POST", "GET", "OPTIONS", "DELETE"],
+        allow_methods=["POST", "GET", "OPTIONS", "DELETE", "PUT", "HEAD"],
         allow_headers=["*"],
+        # let browser pollers send conditional requests for /job_status,
+        # and resumable uploads read their status from HEAD /uploads/{id}
+        expose_headers=[
+            "ETag",
+            "Last-Modified",
+            "Upload-Size",
+            "Upload-Chunk-Size",
+            "Upload-Received",
+            "Upload-Missing",
+        ],
     )
     return app
@@ -3,42 +3,57 @@ import modal
 import os
 
 from ..app import app
-from ..images import cuda_image
-from ..config import MODEL_DIR, RAW_AUDIO_DIR, TRANSCRIPTIONS_DIR, get_logger
+from ..images import cuda_image, cpu_inference_image
+from ..config import (
+    MODEL_DIR, RAW_AUDIO_DIR, TRANSCRIPTIONS_DIR, STREAM_WINDOW_SECONDS, CROSS_REQUEST_BATCHING,
+    CPU_WHISPER_MODEL, CPU_TIER_CORES, get_logger,
+)
 from ..volumes import audio_storage_vol, transcriptions_vol
+from ..lib.asr.streaming import stream_segments
+from ..lib.asr.profiling import StageProfiler
+from ..lib.asr.vad import SpeechIndex
+from ..lib.asr.batching import BatchedTranscriber, FasterWhisperBackend
+from ..lib.asr.sharding import load_audio_range, shard_speech_index
+from ..lib.asr.speakers import assign_word_speakers
+from ..lib.asr.turns import SpeakerTurns
+from ..lib.asr.words import WordTimings
 
 logger = get_logger(__name__)
 
 
-@app.cls(
-    image=cuda_image,
-    gpu="A10G",
-    volumes={
-        str(RAW_AUDIO_DIR): audio_storage_vol,
-        str(TRANSCRIPTIONS_DIR): transcriptions_vol,
-    },
-    scaledown_window=40,
-    timeout=3600,
-)
-@modal.concurrent(max_inputs=15)
-class WhisperX:
+class WhisperXWorker:
+    """
+    Transcription pipeline shared by the GPU and CPU tiers; subclasses pick
+    the model, its CTranslate2 compute type and the batch size
+    """
+
+    model_name = "large-v3"
+    compute_type = "float16"
+    batch_size = 32
+    cpu_threads = 4
+
     @enter()
     def setup(self):
         import whisperx
         import torch
         
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        self.batch_size = 32
-        self.compute_type = "float16"
         
         # Load WhisperX model
         self.model = whisperx.load_model(
-            "large-v3", 
+            self.model_name, 
             self.device, 
             compute_type=self.compute_type,
-            download_root=str(MODEL_DIR)
+            download_root=str(MODEL_DIR),
+            threads=self.cpu_threads,
         )
         
+        # Concurrent inputs share decoder batches instead of each running its own
+        if CROSS_REQUEST_BATCHING:
+            self.transcriber = BatchedTranscriber(FasterWhisperBackend(self.model), batch_size=self.batch_size)
+        else:
+            self.transcriber = self.model
+
         # Load alignment model
         self.model_a, self.metadata = whisperx.load_align_model(
             language_code="en", 
@@ -52,30 +67,153 @@ class WhisperX:
             device=self.device
         )
         
-        logger.info("✅ WhisperX setup complete")
+        logger.info(f"✅ WhisperX setup complete ({self.model_name}, {self.compute_type} on {self.device})")
 
     @method()
-    def transcribe_and_diarize(self, audio_file_path: str, enable_speakers: bool = True, num_speakers: int = 1):
-        """Simple WhisperX pipeline: transcribe + align + diarize (optionally)"""
+    def transcribe_and_diarize(self, audio_file_path: str, enable_speakers: bool = True, num_speakers: int = 1,
+                               speech_index: dict = None):
+        """
+        Simple WhisperX pipeline: transcribe + align + diarize (optionally).
+        With a `speech_index` only its speech regions are processed.
+        """
         import whisperx
         import time
         
         start_time = time.time()
         logger.info(f"🎯 Processing: {audio_file_path}")
+        self._ensure_visible(audio_file_path)
+        profiler = StageProfiler()
         
         try:
-            # Load and transcribe
-            audio = whisperx.load_audio(audio_file_path)
+            # Decode once; transcription, alignment and diarization all
+            # share this waveform
+            with profiler.stage("decode"):
+                audio = whisperx.load_audio(audio_file_path)
+            audio, index = self._compact(audio, speech_index, profiler)
 
-            raw_transcript_result = self.model.transcribe(audio, 
-                                                          batch_size=self.batch_size,
-                                                          verbose=True)
+            with profiler.stage("transcribe"):
+                raw_transcript_result = self.transcriber.transcribe(audio, 
+                                                                    batch_size=self.batch_size,
+                                                                    verbose=True)
             
-            logger.info(f"📝 Raw transcription completed: {len(raw_transcript_result.get('segments', []))} segments")
-            logger.info(f"🔍 Language detected: {raw_transcript_result.get('language', 'unknown')}")
+            transcript = self._finalize(raw_transcript_result, audio, profiler,
+                                        enable_speakers, num_speakers, start_time, index)
+
+            total_time = time.time() - start_time
+            logger.info(f"✅ Completed in {total_time:.2f}s")
+            logger.info(f"[GPU_PROFILE] {os.path.basename(audio_file_path)} {profiler.summary()}")
+            return [transcript, total_time]
             
-            if enable_speakers:
-                # Align for precise timestamps
+        except Exception as e:
+            logger.error(f"❌ Failed: {e}")
+            raise e
+
+    @method()
+    def transcribe_stream(self, audio_file_path: str, enable_speakers: bool = True, num_speakers: int = 1,
+                          speech_index: dict = None):
+        """
+        Streaming variant of transcribe_and_diarize. Yields
+        {"type": "segments", ...} events in order as each audio window is
+        decoded, then a final {"type": "result", ...} event with the same
+        payload transcribe_and_diarize returns (alignment and diarization
+        need the whole file, so they run after the last window).
+        """
+        import whisperx
+        import time
+
+        start_time = time.time()
+        logger.info(f"🎯 Streaming: {audio_file_path}")
+        self._ensure_visible(audio_file_path)
+        profiler = StageProfiler()
+
+        try:
+            with profiler.stage("decode"):
+                audio = whisperx.load_audio(audio_file_path)
+            audio, index = self._compact(audio, speech_index, profiler)
+
+            segments = []
+            language = None
+            with profiler.stage("transcribe"):
+                for window in stream_segments(self.transcriber, audio, self.batch_size, STREAM_WINDOW_SECONDS):
+                    language = window["language"]
+                    segments.extend(window["segments"])
+                    logger.info(f"📤 Window {window['window'][0]:.0f}-{window['window'][1]:.0f}s: {len(window['segments'])} segments")
+                    if index is not None:
+                        window = dict(window,
+                                      segments=index.remap_segments(window["segments"]),
+                                      window=[index.to_original(t) for t in window["window"]])
+                    yield {"type": "segments", **window}
+
+            raw_transcript_result = {"segments": segments, "language": language}
+            transcript = self._finalize(raw_transcript_result, audio, profiler,
+                                        enable_speakers, num_speakers, start_time, index)
+
+            total_time = time.time() - start_time
+            logger.info(f"✅ Completed in {total_time:.2f}s")
+            logger.info(f"[GPU_PROFILE] {os.path.basename(audio_file_path)} {profiler.summary()}")
+            yield {"type": "result", "transcript": transcript, "processing_time": total_time}
+
+        except Exception as e:
+            logger.error(f"❌ Failed: {e}")
+            raise e
+
+    def _ensure_visible(self, audio_file_path: str):
+        """
+        Normalized audio is committed by the pipeline container just before
+        dispatch; a warm container only sees it after a volume reload.
+        """
+        import os
+
+        if os.path.exists(audio_file_path):
+            return
+        try:
+            audio_storage_vol.reload()
+        except Exception as e:
+            # reload refuses while other inputs hold files open
+            logger.warning(f"Audio volume reload failed: {e}")
+
+    def _compact(self, audio, speech_index: dict, profiler: StageProfiler):
+        """(waveform to process, SpeechIndex or None) for a job's speech index"""
+        index = SpeechIndex.from_field(speech_index)
+        if index is None:
+            return audio, None
+        with profiler.stage("compact"):
+            compact_audio = index.compact(audio)
+        logger.info(
+            f"🔇 Skipping {index.skipped_seconds(len(audio) / index.sample_rate):.0f}s of silence: "
+            f"{len(compact_audio) / index.sample_rate:.0f}s of {len(audio) / index.sample_rate:.0f}s processed"
+        )
+        return compact_audio, index
+
+    def _finalize(self, raw_transcript_result, audio, profiler: StageProfiler,
+                  enable_speakers: bool, num_speakers: int, start_time: float,
+                  index: SpeechIndex = None):
+        """
+        Align + diarize (optionally) a raw transcription and format it.
+        `audio` is the already decoded 16 kHz float32 waveform; with an
+        `index` it is the compact speech-only audio, and timestamps are
+        mapped back to the original timeline before formatting.
+        """
+        import time
+
+        result, _ = self._align_and_diarize(raw_transcript_result, audio, profiler,
+                                            enable_speakers, index, num_speakers=num_speakers)
+        return self._format_result(result, time.time() - start_time, enable_speakers=enable_speakers)
+
+    def _align_and_diarize(self, raw_transcript_result, audio, profiler: StageProfiler,
+                           enable_speakers: bool, index: SpeechIndex = None,
+                           num_speakers: int = None, max_speakers: int = None,
+                           return_embeddings: bool = False):
+        """(whisperx result on the original timeline, speaker embeddings or None)"""
+        import whisperx
+
+        logger.info(f"📝 Raw transcription completed: {len(raw_transcript_result.get('segments', []))} segments")
+        logger.info(f"🔍 Language detected: {raw_transcript_result.get('language', 'unknown')}")
+        
+        embeddings = None
+        if enable_speakers:
+            # Align for precise timestamps
+            with profiler.stage("align"):
                 raw_transcript_result = whisperx.align(
                     raw_transcript_result["segments"], 
                     self.model_a, 
@@ -85,114 +223,145 @@ class WhisperX:
                     return_char_alignments=False
                 )
 
-                # Assign speakers
+            # Assign speakers; the pipeline takes the waveform directly
+            # instead of decoding the file a second time
+            with profiler.stage("diarize"):
                 diarize_segments = self.diarize_model(
-                    audio_file_path,
+                    audio,
                     num_speakers=num_speakers,
+                    max_speakers=max_speakers,
+                    return_embeddings=return_embeddings,
                 )
-                # Assign speakers to transcription
-                logger.info(f"🎭 Diarization completed: {len(diarize_segments)} speaker segments")
-                speaker_transcript_result = whisperx.assign_word_speakers(diarize_segments, 
-                                                       raw_transcript_result,
-                                                       fill_nearest=True)
-                transcript = self._format_result(speaker_transcript_result, time.time() - start_time, enable_speakers=True)
-            else:
-                # No diarization, just plain transcript
-                transcript = self._format_result(raw_transcript_result, time.time() - start_time, enable_speakers=False)
+                if return_embeddings:
+                    diarize_segments, embeddings = diarize_segments
+            # Assign speakers to transcription
+            logger.info(f"🎭 Diarization completed: {len(diarize_segments)} speaker segments")
+            with profiler.stage("assign_speakers"):
+                raw_transcript_result = assign_word_speakers(diarize_segments,
+                                                             raw_transcript_result,
+                                                             fill_nearest=True)
 
-            total_time = time.time() - start_time
-            logger.info(f"✅ Completed in {total_time:.2f}s")
-            return [transcript, total_time]
-            
-        except Exception as e:
-            logger.error(f"❌ Failed: {e}")
-            raise e
+        if index is not None:
+            raw_transcript_result = index.remap_result(raw_transcript_result)
+        return raw_transcript_result, embeddings
+
+    @method()
+    def transcribe_shard(self, audio_file_path: str, shard: dict, enable_speakers: bool = True,
+                         num_speakers: int = 1, speech_index: dict = None) -> dict:
+        """
+        Transcribe (and diarize) one shard of a long file, see
+        lib/asr/sharding.py. Timestamps stay shard-relative and speakers
+        shard-local; stitch_shards reconciles them.
+        """
+        import time
+
+        start_time = time.time()
+        logger.info(f"🧩 Shard {shard['index']} ({shard['start']:.0f}-{shard['end']:.0f}s): {audio_file_path}")
+        self._ensure_visible(audio_file_path)
+        profiler = StageProfiler()
+
+        with profiler.stage("decode"):
+            audio = load_audio_range(audio_file_path, shard["start"], shard["end"])
+        audio, index = self._compact(
+            audio, shard_speech_index(speech_index, shard["start"], shard["end"]), profiler
+        )
+        with profiler.stage("transcribe"):
+            raw_transcript_result = self.transcriber.transcribe(audio, batch_size=self.batch_size)
+        language = raw_transcript_result.get("language")
+
+        # a shard may hold only some of the speakers
+        result, embeddings = self._align_and_diarize(
+            raw_transcript_result, audio, profiler, enable_speakers, index,
+            max_speakers=num_speakers, return_embeddings=True,
+        )
+        logger.info(f"[GPU_PROFILE] shard {shard['index']} {profiler.summary()}")
+        return {
+            **shard,
+            "language": language,
+            "segments": result["segments"],
+            "speaker_embeddings": embeddings,
+            "processing_time": time.time() - start_time,
+        }
 
-    def _format_result(self, whisperx_result, processing_time, enable_speakers: bool = False):
+    @staticmethod
+    def _format_result(whisperx_result, processing_time, enable_speakers: bool = False):
         """Convert WhisperX result to expected format"""
         segments = whisperx_result.get("segments", [])
         
         # Extract plain text with proper spacing
         full_text = " ".join([seg.get("text", "").strip() for seg in segments if seg.get("text", "").strip()])
         
-        # Build speaker transcript with proper formatting
-        speaker_parts = []
-        for segment in segments:
-            text = segment.get("text", "").strip()
-            if not text:
-                continue
-                
-            words = segment.get("words", [])
-            if words and any(word.get("speaker") for word in words):
-                # Group words by speaker with proper spacing
-                current_speaker = None
-                word_buffer = []
-                
-                for word in words:
-                    speaker = word.get("speaker", "UNKNOWN")
-                    word_text = word.get("word", "").strip()
-                    
-                    if speaker != current_speaker:
-                        # Flush previous speaker's words
-                        if current_speaker and word_buffer:
-                            clean_text = " ".join(word_buffer).strip()
-                            if clean_text:
-                                speaker_parts.append(f"{current_speaker}: {clean_text}")
-                        current_speaker = speaker
-                        word_buffer = [word_text] if word_text else []
-                    else:
-                        if word_text:
-                            word_buffer.append(word_text)
-                
-                # Flush final speaker's words
-                if current_speaker and word_buffer:
-                    clean_text = " ".join(word_buffer).strip()
-                    if clean_text:
-                        speaker_parts.append(f"{current_speaker}: {clean_text}")
-            else:
-                # Fallback to segment-level speaker
-                speaker = segment.get("speaker", "UNKNOWN")
-                speaker_parts.append(f"{speaker}: {text}")
-        
-        # Join speaker parts with line breaks for better readability
-        # Also merge consecutive parts from the same speaker
-        merged_parts = []
-        current_speaker_id = None
-        current_text_parts = []
-        
-        for part in speaker_parts:
-            if ": " in part:
-                speaker_id, text = part.split(": ", 1)
-                
-                if speaker_id == current_speaker_id:
-                    # Same speaker, accumulate text
-                    current_text_parts.append(text)
-                else:
-                    # Different speaker, flush previous and start new
-                    if current_speaker_id and current_text_parts:
-                        merged_text = " ".join(current_text_parts)
-                        merged_parts.append(f"{current_speaker_id}: {merged_text}")
-                    
-                    current_speaker_id = speaker_id
-                    current_text_parts = [text]
-        
-        # Flush final speaker
-        if current_speaker_id and current_text_parts:
-            merged_text = " ".join(current_text_parts)
-            merged_parts.append(f"{current_speaker_id}: {merged_text}")
-        
-        speaker_transcript = "\n".join(merged_parts)
-        
-        # Print last 100 characters of speaker_transcript
-        logger.info(f"DEBUG: Last 100 characters of speaker_transcript: {speaker_transcript[-100:]}")
-        
+        # Speaker turns are built in one pass and only rendered when wanted
+        speaker_turns = SpeakerTurns.from_segments(segments) if enable_speakers else None
+
         return {
             "text": full_text,
-            "speaker_transcript": speaker_transcript if enable_speakers else None,
+            "speaker_transcript": speaker_turns.transcript if speaker_turns is not None else None,
             "language": whisperx_result.get("language", "en"),
-            "processing_time": processing_time
+            "processing_time": processing_time,
+            # stored as columns next to the document, never in its JSON
+            "word_timings": WordTimings.from_segments(segments),
         }
 
     @modal_exit()
     def close_container(self):
         logger.info("Shutting down WhisperX container")
+        if isinstance(self.transcriber, BatchedTranscriber):
+            logger.info(f"[GPU_BATCHING] {self.transcriber.scheduler.stats()}")
+
+
+@app.cls(
+    image=cuda_image,
+    gpu="A10G",
+    volumes={
+        str(RAW_AUDIO_DIR): audio_storage_vol,
+        str(TRANSCRIPTIONS_DIR): transcriptions_vol,
+    },
+    scaledown_window=40,
+    timeout=3600,
+)
+@modal.concurrent(max_inputs=15)
+class WhisperX(WhisperXWorker):
+    pass
+
+
+@app.cls(
+    image=cuda_image,
+    gpu="A10G",
+    volumes={
+        str(RAW_AUDIO_DIR): audio_storage_vol,
+        str(TRANSCRIPTIONS_DIR): transcriptions_vol,
+    },
+    scaledown_window=40,
+    timeout=3600,
+)
+class WhisperXShard(WhisperXWorker):
+    """
+    Target of `transcribe_shard.map`. Not concurrent: each container takes
+    one shard, so a long file's shards fan out across GPUs instead of being
+    packed onto one WhisperX container as up to 15 concurrent inputs.
+    """
+
+
+@app.cls(
+    image=cpu_inference_image,
+    cpu=CPU_TIER_CORES,
+    memory=8192,
+    volumes={
+        str(RAW_AUDIO_DIR): audio_storage_vol,
+        str(TRANSCRIPTIONS_DIR): transcriptions_vol,
+    },
+    scaledown_window=120,
+    timeout=3600,
+)
+@modal.concurrent(max_inputs=4)
+class WhisperXCPU(WhisperXWorker):
+    """
+    Int8 CPU tier for short clips, where loading large-v3 on a GPU costs
+    more than the transcription itself
+    """
+
+    model_name = CPU_WHISPER_MODEL
+    compute_type = "int8"
+    batch_size = 8
+    cpu_threads = CPU_TIER_CORES
@@ -20,6 +20,20 @@ def download_whisperx_models():
     except Exception as e:
         print(f"⚠️ WhisperX model download failed (will download at runtime): {e}")
 
+def download_cpu_whisperx_models():
+    """Pre-download the CPU tier's int8 model and the alignment model"""
+    import os
+    os.makedirs(config.MODEL_DIR, exist_ok=True)
+
+    try:
+        import whisperx
+        print("📥 Pre-downloading CPU tier models...")
+        whisperx.load_model(config.CPU_WHISPER_MODEL, device="cpu", compute_type="int8", download_root=config.MODEL_DIR)
+        whisperx.load_align_model(language_code="en", device="cpu", model_name="WAV2VEC2_ASR_LARGE_LV60K_960H")
+        print("✅ CPU tier models downloaded successfully")
+    except Exception as e:
+        print(f"⚠️ CPU tier model download failed (will download at runtime): {e}")
+
 """
 Cuda Image to run transcribe function
 """
@@ -43,4 +57,15 @@ base_image = (
     Image.debian_slim(python_version="3.12")
     .apt_install(*config.APT_PACKAGES)
     .pip_install(*config.BASE_PYTHON_PACKAGES)
-)
\ No newline at end of file
+)
+
+"""
+CPU Image to run the int8 transcription tier
+"""
+cpu_inference_image = (
+    Image.debian_slim(python_version="3.12")
+    .apt_install(*config.APT_PACKAGES)
+    .pip_install(*config.CPU_TORCH_PACKAGES, index_url=config.TORCH_CPU_INDEX_URL)
+    .pip_install(*config.BASE_PYTHON_PACKAGES + config.CPU_ML_PYTHON_PACKAGES)
+    .run_function(download_cpu_whisperx_models)
+)
@@ -1,4 +1,7 @@
-from ..utils import updateOutputJson, audio_path
+from ..job_session import JobSession
+from ... import config
+
+logger = config.get_logger(__name__)
 
 class CompletedProcessingState:
     def __init__(self) -> None:
@@ -7,18 +10,23 @@ class CompletedProcessingState:
     def _next_state(self):
         return None
 
-    async def run_job(self, vid: str) -> None:
+    async def run_job(self, vid: str, session: JobSession = None) -> None:
         import asyncio
         import os
         await asyncio.sleep(0.01)
+        session = session or JobSession(vid)
         # update new state on the output json
-        updateOutputJson(vid, self.StateSymbol)
-        # Delete the audio file after processing is complete
-        audiofile = audio_path(vid)
-        if audiofile.exists():
-            try:
-                os.remove(audiofile)
-                print(f"[CompletedProcessingState] Deleted audio file {audiofile}")
-            except Exception as e:
-                print(f"[CompletedProcessingState] Error deleting audio file {audiofile}: {e}")
+        session.update(symbol=self.StateSymbol)
+        session.checkpoint(self.StateSymbol)
+        logger.info(f"[JOB_IO] vid={vid} {session.stats()}")
+        await session.progress.close()
+        # Delete the audio files after processing is complete
+        from ..asr.normalize import normalized_audio_path
+        for audiofile in (session.audio_path, normalized_audio_path(vid)):
+            if audiofile.exists():
+                try:
+                    os.remove(audiofile)
+                    print(f"[CompletedProcessingState] Deleted audio file {audiofile}")
+                except Exception as e:
+                    print(f"[CompletedProcessingState] Error deleting audio file {audiofile}: {e}")
         return 0
\ No newline at end of file
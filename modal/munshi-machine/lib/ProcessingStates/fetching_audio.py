@@ -1,13 +1,8 @@
 from ... import config
 
 logger = config.get_logger(__name__)
-from ..utils import (
-    updateOutputJson,
-    updateOutputJsonDict,
-    audio_path,
-    output_handler,
-)
-from .transcribing import TranscribingProcessingState
+from ..job_session import JobSession
+from .normalizing_audio import NormalizingAudioProcessingState
 
 
 class FetchingAudioProcessingState:
@@ -15,42 +10,39 @@ class FetchingAudioProcessingState:
         self.StateSymbol = "FetchingAudio"
 
     def _next_state(self):
-        return TranscribingProcessingState()
-
-    async def run_job(self, vid: str) -> int | bytes:
-        from ..download_audio import get_stored_audio
+        return NormalizingAudioProcessingState()
 
+    async def run_job(self, vid: str, session: JobSession = None) -> int:
         self.vid = vid
+        session = session or JobSession(vid)
 
         logger.info(f"Fetching Audio...")
         # update new state on the output json
-        updateOutputJson(vid, self.StateSymbol)
+        session.update(symbol=self.StateSymbol)
+        session.checkpoint(self.StateSymbol)
 
-        audiofile_path = audio_path(vid)
-        oh = output_handler(vid)
+        audiofile_path = session.audio_path
 
         if audiofile_path.exists():
-            if oh.output.get("title") is None:
-                self.update_metadata()
+            if session.handler.get_field("title") is None:
+                self.update_metadata(session)
 
-            audio_data = get_stored_audio(audiofile_path)
-            
             # Start processing chain
-            await self._next_state().run_job(vid)
-            
-            return audio_data
+            await self._next_state().run_job(vid, session=session)
+            return 0
         try:
-            self.update_metadata()
-            await self._next_state().run_job(vid)
-            return get_stored_audio(audiofile_path)
+            self.update_metadata(session)
+            await self._next_state().run_job(vid, session=session)
+            return 0
 
         except Exception as err:
             print("Error occured while downloading the audio file.", err)
             # set error on output_file file
             return 0
 
-    def update_metadata(self):
+    def update_metadata(self, session: JobSession):
         from ..download_audio import get_metadata
 
         logger.info(f"Updating Metadata...")
-        updateOutputJsonDict(self.vid, get_metadata(self.vid))
+        # staged; written with the next checkpoint
+        session.update(**get_metadata(self.vid))
@@ -1,11 +1,7 @@
-from ..utils import (
-    output_handler,
-    updateOutputJson,
-)
+from ..job_session import JobSession
 
 
 import asyncio
-import pathlib
 from ... import config
 
 logger = config.get_logger(__name__)
@@ -16,12 +12,14 @@ def processingStateFactory(symbol):
     from .transcribing import TranscribingProcessingState
     from .completed import CompletedProcessingState
     from .fetching_audio import FetchingAudioProcessingState
+    from .normalizing_audio import NormalizingAudioProcessingState
 
     STATE_MAP = {
         "Init": InitProcessingState(),
         "initiated": InitProcessingState(),
         "FetchingAudio": FetchingAudioProcessingState(),
         "downloading_audio": FetchingAudioProcessingState(),
+        "NormalizingAudio": NormalizingAudioProcessingState(),
         "Transcribing": TranscribingProcessingState(),
         "Summarizing": SummarizingGeminiProcessingState(),
         "Completed": CompletedProcessingState(),
@@ -51,19 +49,21 @@ class InitProcessingState:
         from .fetching_audio import FetchingAudioProcessingState
         return FetchingAudioProcessingState()
 
-    async def run_job(self, vid: str, audiofile: str = None, chained=True):
+    async def run_job(self, vid: str, audiofile: str = None, chained=True, session: JobSession = None):
         from ...volumes import transcriptions_vol, audio_storage_vol
 
         # initate output json
-        outputHandler = output_handler(vid)
+        session = session or JobSession(vid)
+        outputHandler = session.handler
 
         # update new state on the output json
         out_path = outputHandler.out_path
-        if not pathlib.Path(out_path).exists():
+        if not outputHandler.exists():
             logger.info(
                 f"Output file doesn't exist, initiating new output file {out_path}"
             )
-            updateOutputJson(vid, symbol=self.StateSymbol, data={})
+            session.update(symbol=self.StateSymbol, data={})
+            session.checkpoint(self.StateSymbol)
             logger.info(f"Initiated new output file {out_path}")
             transcriptions_vol.commit()
             audio_storage_vol.commit()
@@ -73,7 +73,7 @@ class InitProcessingState:
             logger.info("Audiofile parameter provided but not implemented")
 
         if chained:
-            await self._next_state().run_job(vid)
+            await self._next_state().run_job(vid, session=session)
         else:
             await asyncio.sleep(0.001)
 
@@ -87,6 +87,9 @@ class FailedProcessingState:
     def _next_state(self):
         return InitProcessingState()
 
-    def run_job(self, vid: str) -> None:
+    async def run_job(self, vid: str, session: JobSession = None) -> None:
         # update new state on the output json
-        updateOutputJson(vid, self.StateSymbol)
+        session = session or JobSession(vid)
+        session.update(symbol=self.StateSymbol)
+        session.checkpoint(self.StateSymbol)
+        await session.progress.close()
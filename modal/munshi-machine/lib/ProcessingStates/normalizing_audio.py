@@ -0,0 +1,76 @@
+import asyncio
+
+from ..job_session import JobSession
+from ... import config
+from ...config import SPEECH_INDEX_ENABLED
+from .transcribing import TranscribingProcessingState
+
+logger = config.get_logger(__name__)
+
+
+class NormalizingAudioProcessingState:
+    """
+    Transcode the upload to 16 kHz mono FLAC on the CPU container, so the GPU
+    worker never decodes or resamples the original file, and index its
+    speech regions so the GPU stages can skip long silences.
+    """
+
+    def __init__(self) -> None:
+        self.StateSymbol = "NormalizingAudio"
+
+    def _next_state(self):
+        return TranscribingProcessingState()
+
+    async def run_job(self, vid: str, session: JobSession = None) -> int:
+        from ..asr.normalize import normalize_audio, normalized_audio_path
+        from ...volumes import audio_storage_vol
+
+        session = session or JobSession(vid)
+
+        session.update(symbol=self.StateSymbol)
+        session.checkpoint(self.StateSymbol)
+
+        source = session.audio_path
+        destination = normalized_audio_path(vid)
+        if not destination.exists():
+            try:
+                audio_info = await asyncio.to_thread(normalize_audio, source, destination)
+                await audio_storage_vol.commit.aio()
+                logger.info(
+                    f"Normalized {source.name}: {audio_info['source_bytes']} -> "
+                    f"{audio_info['normalized_bytes']} bytes, {audio_info['duration']}s"
+                )
+                # staged; written with the Transcribing checkpoint
+                session.update(audio_info=audio_info)
+            except Exception as e:
+                # WhisperX can still decode the original upload itself
+                logger.error(f"Audio normalization failed for {vid}, using original file: {e}")
+
+        if SPEECH_INDEX_ENABLED and destination.exists() and session.handler.get_field("speech_index") is None:
+            await self.index_speech(vid, session, destination)
+
+        await self._next_state().run_job(vid, session=session)
+        return 0
+
+
+    async def index_speech(self, vid: str, session: JobSession, normalized_path):
+        from ..asr.normalize import probe_audio
+        from ..asr.vad import build_speech_index
+
+        try:
+            audio_info = session.handler.get_field("audio_info")
+            if not audio_info:
+                audio_info = await asyncio.to_thread(probe_audio, normalized_path)
+            speech_index = await asyncio.to_thread(
+                build_speech_index, normalized_path, audio_info["duration"]
+            )
+        except Exception as e:
+            # the whole file is transcribed without an index
+            logger.error(f"Speech detection failed for {vid}: {e}")
+            return
+
+        logger.info(
+            f"Speech index for {vid}: {len(speech_index['regions'])} regions, "
+            f"{speech_index['speech_seconds']:.0f}s of {speech_index['duration']:.0f}s"
+        )
+        session.update(speech_index=speech_index)
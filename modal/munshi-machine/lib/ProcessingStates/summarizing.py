@@ -1,4 +1,4 @@
-from ..utils import updateOutputJson, output_handler
+from ..job_session import JobSession
 from .completed import CompletedProcessingState
 from ... import config
 import time
@@ -13,15 +13,18 @@ class SummarizingGeminiProcessingState:
     def _next_state(self):
         return self._next_state_obj
 
-    async def run_job(self, vid: str) -> None:
+    async def run_job(self, vid: str, session: JobSession = None) -> None:
         from ..gemini import processor
-        # update new state on the output json
-        updateOutputJson(vid, self.StateSymbol)
+        session = session or JobSession(vid)
+        # update new state on the output json (Transcribing already wrote it
+        # with the transcript; this only writes when resuming at this state)
+        session.update(symbol=self.StateSymbol)
+        session.checkpoint(self.StateSymbol)
         summarize_start = time.time()
         try:
             logger.info(f"Starting summary generation for video {vid}")
             # Use the processor directly and await it properly
-            summary = await processor.get_summary(vid)
+            summary = await processor.get_summary(vid, session.handler)
             logger.info(f"Summary generated successfully for video {vid}")
         except Exception as e:
             logger.error(f"Error generating summary for video {vid}: {e}")
@@ -29,14 +32,14 @@ class SummarizingGeminiProcessingState:
 
         # Add summarization time to processing_time
         summarize_elapsed = time.time() - summarize_start
-        oh = output_handler(vid)
+        oh = session.handler
         if oh.data is not None:
             prev_time = oh.data.get("processing_time", 0)
             total_time = prev_time + summarize_elapsed
             oh.data["processing_time"] = total_time
-            oh.write_transcription_data()
             logger.info(f"[PROCESSING_TIME] vid={vid} total_processing_time={total_time:.2f}s (transcribe+clean+summarize)")
 
-        await self._next_state_obj.run_job(vid)
+        # summary and processing time are written with the Completed checkpoint
+        await self._next_state_obj.run_job(vid, session=session)
 
         return 0
@@ -1,6 +1,8 @@
 from .summarizing import SummarizingGeminiProcessingState
-from ..utils import updateOutputJson, audio_path, get_speaker_settings
+from ..utils import get_speaker_settings
+from ..job_session import JobSession
 from ... import config
+from ...config import STREAMING_TRANSCRIPTION, SHARDING_ENABLED, SHARDING_MIN_SECONDS, SHARD_SECONDS
 from ...volumes import transcriptions_vol
 
 logger = config.get_logger(__name__)
@@ -14,54 +16,87 @@ class TranscribingProcessingState:
     def _next_state(self):
         return self._next_state_obj
 
-    async def run_job(self, vid: str) -> None:
-        from ...functions.transcribe import WhisperX
+    async def run_job(self, vid: str, session: JobSession = None) -> None:
+        from ...functions.transcribe import WhisperX, WhisperXCPU
+        from ..asr.routing import CPU_TIER, select_tier, speech_duration
+
+        session = session or JobSession(vid)
 
         # Update state
-        updateOutputJson(vid, self.StateSymbol)
+        session.update(symbol=self.StateSymbol)
+        session.checkpoint(self.StateSymbol)
 
         # Check audio file exists
-        audiofile_path = audio_path(vid)
+        audiofile_path = session.audio_path
         if not audiofile_path.exists():
             raise RuntimeError(f"Audio file missing: {audiofile_path}")
 
+        # Prefer the 16 kHz mono artifact from NormalizingAudio
+        from ..asr.normalize import normalized_audio_path
+        normalized_path = normalized_audio_path(vid)
+        if normalized_path.exists():
+            audiofile_path = normalized_path
+
         # Reload volume to ensure we get latest speaker settings
         transcriptions_vol.reload()
 
         # Get speaker settings
-        enable_speakers, num_speakers = get_speaker_settings(vid)
+        enable_speakers, num_speakers = get_speaker_settings(vid, session.handler)
+        speech_index = session.handler.get_field("speech_index")
         print(f"Starting transcription for {vid} - Speakers: {enable_speakers}, Count: {num_speakers}")
 
+        # Short or low-priority jobs go to the int8 CPU tier
+        duration = speech_duration(session.handler.get_field("audio_info"), speech_index)
+        tier = select_tier(duration, enable_speakers, session.handler.get_field("priority") or "normal")
+        logger.info(f"Routing {vid} ({duration}s of speech) to the {tier} tier")
+        session.update(transcription_tier=tier)
+
         try:
-            # Simple WhisperX call
-            model = WhisperX()
-            if enable_speakers:
-                output_data, time_elapsed = model.transcribe_and_diarize.remote(
-                    str(audiofile_path),
-                    enable_speakers=True,
-                    num_speakers=num_speakers
+            from ..gemini import get_cleaned_speaker_transcript
+
+            model = WhisperXCPU() if tier == CPU_TIER else WhisperX()
+            shards = None
+            if tier != CPU_TIER and audiofile_path == normalized_path:
+                shards = await self.plan_shards(vid, audiofile_path, duration)
+
+            if shards:
+                # Fan shards out across GPU containers, then stitch them
+                output_data, time_elapsed = await self.transcribe_shards(
+                    audiofile_path, shards, enable_speakers, num_speakers, speech_index
                 )
-            else:
-                # No speakers - just transcribe
-                output_data, time_elapsed = model.transcribe_and_diarize.remote(
+                logger.info(f"Sharded transcription of {len(shards)} shards completed in {time_elapsed:.2f}s")
+                await self.clean_text(output_data)
+            elif STREAMING_TRANSCRIPTION:
+                # Clean text chunks as segments stream out of the GPU worker
+                stream = model.transcribe_stream.remote_gen.aio(
                     str(audiofile_path),
-                    enable_speakers=False,
-                    num_speakers=1
+                    enable_speakers=enable_speakers,
+                    num_speakers=num_speakers if enable_speakers else 1,
+                    speech_index=speech_index,
                 )
-
-            logger.info(f"Transcription completed in {time_elapsed:.2f}s")
-
-            # Clean transcripts through Gemini
-            logger.info("Cleaning transcripts with Gemini...")
-            from ..gemini import get_cleaned_transcript, get_cleaned_speaker_transcript
-
-            # Clean regular transcript
-            if output_data.get("text"):
-                cleaned_result = await get_cleaned_transcript(output_data["text"])
-                if isinstance(cleaned_result, dict) and "cleaned_text" in cleaned_result:
-                    output_data["text"] = cleaned_result["cleaned_text"]
+                output_data, time_elapsed, cleaned_text = await self.transcribe_and_clean_stream(stream)
+                logger.info(f"Transcription completed in {time_elapsed:.2f}s")
+                output_data["text"] = cleaned_text
+            else:
+                # Simple WhisperX call
+                if enable_speakers:
+                    output_data, time_elapsed = model.transcribe_and_diarize.remote(
+                        str(audiofile_path),
+                        enable_speakers=True,
+                        num_speakers=num_speakers,
+                        speech_index=speech_index,
+                    )
                 else:
-                    output_data["text"] = cleaned_result
+                    # No speakers - just transcribe
+                    output_data, time_elapsed = model.transcribe_and_diarize.remote(
+                        str(audiofile_path),
+                        enable_speakers=False,
+                        num_speakers=1,
+                        speech_index=speech_index,
+                    )
+
+                logger.info(f"Transcription completed in {time_elapsed:.2f}s")
+                await self.clean_text(output_data)
                 
             # Clean speaker transcript and get mappings ONLY if speakers are enabled
             if enable_speakers and output_data.get("speaker_transcript"):
@@ -76,15 +111,98 @@ class TranscribingProcessingState:
                 if speaker_mappings:
                     output_data["speaker_mappings"] = speaker_mappings
                     logger.info(f"Detected speaker mappings: {speaker_mappings}")
-                
-                logger.info(f"DEBUG: Final speaker_transcript to be written: {output_data['speaker_transcript']}")
+
+            # Word timings go to their own columnar files, not the job JSON
+            word_timings = output_data.pop("word_timings", None)
+            if word_timings is not None:
+                session.handler.store.write_words(word_timings)
 
             # Update output and continue
-            updateOutputJson(vid, self._next_state_obj.StateSymbol, output_data)
-            await self._next_state_obj.run_job(vid)
+            session.update(symbol=self._next_state_obj.StateSymbol, data=output_data)
+            session.checkpoint(self._next_state_obj.StateSymbol)
+            await self._next_state_obj.run_job(vid, session=session)
 
             return 0
 
         except Exception as e:
             logger.error(f"Transcription failed: {e}")
-            return -1
\ No newline at end of file
+            return -1
+
+    async def clean_text(self, output_data: dict):
+        """Clean the plain transcript through Gemini, in place"""
+        from ..gemini import get_cleaned_transcript
+
+        logger.info("Cleaning transcripts with Gemini...")
+        if output_data.get("text"):
+            cleaned_result = await get_cleaned_transcript(output_data["text"])
+            if isinstance(cleaned_result, dict) and "cleaned_text" in cleaned_result:
+                output_data["text"] = cleaned_result["cleaned_text"]
+            else:
+                output_data["text"] = cleaned_result
+
+    async def plan_shards(self, vid: str, audiofile_path, duration):
+        """Shard specs for long audio, or None to transcribe it in one call"""
+        import asyncio
+        from ..asr.sharding import plan_file_shards
+
+        if not SHARDING_ENABLED or duration is None or duration < SHARDING_MIN_SECONDS:
+            return None
+        try:
+            shards = await asyncio.to_thread(plan_file_shards, audiofile_path, SHARD_SECONDS)
+        except Exception as e:
+            logger.error(f"Shard planning failed for {vid}, transcribing in one call: {e}")
+            return None
+        if len(shards) < 2:
+            return None
+        logger.info(f"Split {vid} into {len(shards)} shards at {[shard['start'] for shard in shards[1:]]}")
+        return shards
+
+    async def transcribe_shards(self, audiofile_path, shards, enable_speakers, num_speakers, speech_index):
+        """
+        Transcribe shards in parallel containers with `.map` and stitch them.
+        Returns (output_data, time_elapsed) like transcribe_and_diarize.
+        """
+        import time
+        from ..asr.sharding import stitch_shards
+        from ...functions.transcribe import WhisperXShard, WhisperXWorker
+
+        start_time = time.time()
+        results = []
+        # one shard per container
+        async for result in WhisperXShard().transcribe_shard.map.aio(
+            [str(audiofile_path)] * len(shards),
+            shards,
+            kwargs={
+                "enable_speakers": enable_speakers,
+                "num_speakers": num_speakers if enable_speakers else 1,
+                "speech_index": speech_index,
+            },
+        ):
+            results.append(result)
+
+        stitched = stitch_shards(results, max_speakers=num_speakers if enable_speakers else None)
+        time_elapsed = time.time() - start_time
+        return WhisperXWorker._format_result(stitched, time_elapsed, enable_speakers=enable_speakers), time_elapsed
+
+    async def transcribe_and_clean_stream(self, stream):
+        """
+        Consume transcription events (from WhisperX.transcribe_stream or a
+        local stand-in) and feed segment text to Gemini cleaning as it arrives.
+        Returns (output_data, time_elapsed, cleaned_text).
+        """
+        from ..gemini import processor, StreamingTranscriptCleaner
+
+        cleaner = StreamingTranscriptCleaner(processor)
+        result = None
+        async for event in stream:
+            if event["type"] == "segments":
+                for segment in event["segments"]:
+                    cleaner.feed(segment.get("text", ""))
+            elif event["type"] == "result":
+                result = event
+
+        if result is None:
+            raise RuntimeError("Transcription stream ended without a result")
+
+        cleaned_text = await cleaner.finish()
+        return result["transcript"], result["processing_time"], cleaned_text
\ No newline at end of file
@@ -0,0 +1,3 @@
+"""
+Speech-recognition helpers shared by the WhisperX workers and local tooling
+"""
@@ -0,0 +1,232 @@
+"""
+Cross-request batching for the WhisperX worker.
+
+The worker runs up to 15 inputs at once, and each used to call
+`FasterWhisperPipeline.transcribe` on its own: short clips decoded in
+half-empty batches, and concurrent inputs raced each other for the GPU (and
+for the pipeline's shared tokenizer). Here every input still runs VAD and
+language detection itself, but hands its speech chunks to one
+`BatchScheduler` thread. The scheduler fills each decoder batch from all
+waiting inputs of the same language, round-robin so a long file cannot
+starve a short one, and sends every input its own texts back.
+
+Backends provide `segment(audio)`, `detect_language(audio)` and
+`decode_batch(chunks, language)`; `FasterWhisperBackend` wraps a whisperx
+pipeline and `stub.StubWhisperModel` runs on the CPU.
+"""
+
+import itertools
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+
+from ... import config
+from .streaming import SAMPLE_RATE
+
+logger = config.get_logger("ASR_BATCHING")
+
+# A partial batch waits at most this long for chunks from other inputs
+MAX_BATCH_WAIT = 0.05
+
+
+class _Chunk:
+    __slots__ = ("audio", "future", "enqueued_at")
+
+    def __init__(self, audio):
+        self.audio = audio
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+
+
+class BatchScheduler:
+    """Single decoder thread fed by any number of submitting threads"""
+
+    def __init__(self, decode_batch, batch_size: int, max_wait: float = MAX_BATCH_WAIT):
+        self.decode_batch = decode_batch
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self._cond = threading.Condition()
+        # language -> request id -> chunks not yet in a batch
+        self._pending: dict[str, OrderedDict[int, deque]] = {}
+        self._request_ids = itertools.count()
+        self._thread = None
+        self.batches = 0
+        self.chunks = 0
+        self.full_batches = 0
+        self.shared_batches = 0
+
+    def submit(self, chunks: list, language: str) -> list[Future]:
+        """Queue one input's chunks; each future resolves to its text"""
+        items = [_Chunk(chunk) for chunk in chunks]
+        if not items:
+            return []
+        with self._cond:
+            self._ensure_thread()
+            queues = self._pending.setdefault(language, OrderedDict())
+            queues[next(self._request_ids)] = deque(items)
+            self._cond.notify()
+        return [item.future for item in items]
+
+    def run(self, chunks: list, language: str) -> list[str]:
+        """Blocking `submit`"""
+        return [future.result() for future in self.submit(chunks, language)]
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._loop, name="asr-batch-scheduler", daemon=True)
+            self._thread.start()
+
+    def _oldest(self):
+        """(language, enqueue time of its oldest waiting chunk, waiting count)"""
+        best = None
+        for language, queues in self._pending.items():
+            oldest = min(queue[0].enqueued_at for queue in queues.values())
+            waiting = sum(len(queue) for queue in queues.values())
+            if best is None or oldest < best[1]:
+                best = (language, oldest, waiting)
+        return best
+
+    def _take_batch(self, language: str) -> tuple[list[_Chunk], int]:
+        """Up to batch_size chunks, one from each waiting input in turn"""
+        queues = self._pending[language]
+        batch = []
+        requests = set()
+        while len(batch) < self.batch_size and queues:
+            for request_id in list(queues):
+                queue = queues[request_id]
+                batch.append(queue.popleft())
+                requests.add(request_id)
+                if not queue:
+                    del queues[request_id]
+                if len(batch) == self.batch_size:
+                    break
+        if not queues:
+            del self._pending[language]
+        return batch, len(requests)
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while True:
+                    oldest = self._oldest()
+                    if oldest is None:
+                        self._cond.wait()
+                        continue
+                    language, enqueued_at, waiting = oldest
+                    wait = enqueued_at + self.max_wait - time.monotonic()
+                    if waiting >= self.batch_size or wait <= 0:
+                        break
+                    self._cond.wait(wait)
+                batch, request_count = self._take_batch(language)
+
+            self.batches += 1
+            self.chunks += len(batch)
+            self.full_batches += len(batch) == self.batch_size
+            self.shared_batches += request_count > 1
+            try:
+                texts = self.decode_batch([item.audio for item in batch], language)
+            except BaseException as e:
+                for item in batch:
+                    item.future.set_exception(e)
+                continue
+            for item, text in zip(batch, texts):
+                item.future.set_result(text)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "chunks": self.chunks,
+            "mean_fill": round(self.chunks / self.batches / self.batch_size, 3) if self.batches else None,
+            "full_batches": self.full_batches,
+            "shared_batches": self.shared_batches,
+        }
+
+
+class BatchedTranscriber:
+    """
+    Drop-in for `FasterWhisperPipeline.transcribe` (and for `stream_segments`)
+    that decodes through a shared BatchScheduler
+    """
+
+    def __init__(self, backend, batch_size: int, max_wait: float = MAX_BATCH_WAIT):
+        self.backend = backend
+        self.scheduler = BatchScheduler(backend.decode_batch, batch_size, max_wait)
+
+    def transcribe(self, audio, batch_size: int = None, language: str = None, **kwargs) -> dict:
+        spans = self.backend.segment(audio)
+        if not spans:
+            return {"segments": [], "language": language or self.backend.language}
+        language = language or self.backend.detect_language(audio)
+        chunks = [
+            audio[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)]
+            for start, end in spans
+        ]
+        texts = self.scheduler.run(chunks, language)
+        segments = [
+            {"text": text, "start": round(start, 3), "end": round(end, 3)}
+            for (start, end), text in zip(spans, texts)
+        ]
+        return {"segments": segments, "language": language}
+
+
+class FasterWhisperBackend:
+    """
+    Batch backend over a whisperx 3.4 `FasterWhisperPipeline`, reproducing
+    the VAD, feature extraction and decoding steps of its `transcribe`
+    without touching the pipeline's shared tokenizer
+    """
+
+    def __init__(self, pipeline, chunk_size: int = 30):
+        self.pipeline = pipeline
+        self.chunk_size = chunk_size
+        self.language = pipeline.preset_language or "en"
+        self._tokenizers = {}
+        self._lock = threading.Lock()
+
+    def segment(self, audio) -> list[tuple[float, float]]:
+        from whisperx.vads import Vad, Pyannote
+
+        pipeline = self.pipeline
+        if issubclass(type(pipeline.vad_model), Vad):
+            waveform = pipeline.vad_model.preprocess_audio(audio)
+            merge_chunks = pipeline.vad_model.merge_chunks
+        else:
+            waveform = Pyannote.preprocess_audio(audio)
+            merge_chunks = Pyannote.merge_chunks
+        vad_segments = pipeline.vad_model({"waveform": waveform, "sample_rate": SAMPLE_RATE})
+        vad_segments = merge_chunks(
+            vad_segments,
+            self.chunk_size,
+            onset=pipeline._vad_params["vad_onset"],
+            offset=pipeline._vad_params["vad_offset"],
+        )
+        return [(segment["start"], segment["end"]) for segment in vad_segments]
+
+    def detect_language(self, audio) -> str:
+        if self.pipeline.preset_language:
+            return self.pipeline.preset_language
+        return self.pipeline.detect_language(audio)
+
+    def _tokenizer(self, language: str):
+        from whisperx.asr import Tokenizer
+
+        with self._lock:
+            if language not in self._tokenizers:
+                model = self.pipeline.model
+                self._tokenizers[language] = Tokenizer(
+                    model.hf_tokenizer, model.model.is_multilingual, task="transcribe", language=language
+                )
+            return self._tokenizers[language]
+
+    def decode_batch(self, chunks: list, language: str) -> list[str]:
+        import numpy as np
+        from whisperx.audio import N_SAMPLES, log_mel_spectrogram
+
+        model = self.pipeline.model
+        n_mels = model.feat_kwargs.get("feature_size") or 80
+        features = np.stack([
+            log_mel_spectrogram(chunk, n_mels=n_mels, padding=N_SAMPLES - chunk.shape[0]).cpu().numpy()
+            for chunk in chunks
+        ])
+        return model.generate_segment_batched(features, self._tokenizer(language), self.pipeline.options)
@@ -0,0 +1,83 @@
+"""
+One-time transcode of uploads to the 16 kHz mono audio Whisper consumes.
+
+Runs on the CPU pipeline container, so the GPU worker reads a small FLAC
+instead of decoding (possibly video) containers of up to 500MB itself.
+"""
+
+import json
+import os
+import pathlib
+import subprocess
+
+from ...config import RAW_AUDIO_DIR
+from .streaming import SAMPLE_RATE
+
+NORMALIZED_SUFFIX = ".16k.flac"
+FFMPEG_TIMEOUT = 1800
+
+
+def normalized_audio_path(vid: str) -> pathlib.Path:
+    return pathlib.Path(RAW_AUDIO_DIR, f"{vid}{NORMALIZED_SUFFIX}")
+
+
+def probe_audio(path) -> dict:
+    """Duration and sample count of the first audio stream"""
+    result = subprocess.run(
+        [
+            "ffprobe", "-v", "error",
+            "-select_streams", "a:0",
+            "-show_entries", "stream=sample_rate,channels,duration,duration_ts",
+            "-of", "json",
+            str(path),
+        ],
+        check=True,
+        capture_output=True,
+        timeout=120,
+    )
+    stream = json.loads(result.stdout)["streams"][0]
+    sample_rate = int(stream["sample_rate"])
+    duration = float(stream.get("duration") or 0)
+    # FLAC streams count time in samples; fall back to duration otherwise
+    samples = int(stream.get("duration_ts") or round(duration * sample_rate))
+    return {
+        "duration": round(samples / sample_rate, 3) if samples else duration,
+        "samples": samples,
+        "sample_rate": sample_rate,
+        "channels": int(stream["channels"]),
+    }
+
+
+def normalize_audio(source, destination) -> dict:
+    """
+    Transcode `source` to 16 kHz mono 16-bit FLAC at `destination` and
+    return its audio info. Blocking; run it in a worker thread.
+    """
+    destination = pathlib.Path(destination)
+    tmp_path = destination.with_name(f".{destination.name}.{os.getpid()}.tmp.flac")
+    try:
+        subprocess.run(
+            [
+                "ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error",
+                "-threads", "0",
+                "-i", str(source),
+                "-vn", "-sn", "-dn",
+                "-ac", "1",
+                "-ar", str(SAMPLE_RATE),
+                "-sample_fmt", "s16",
+                "-c:a", "flac",
+                "-y", str(tmp_path),
+            ],
+            check=True,
+            capture_output=True,
+            timeout=FFMPEG_TIMEOUT,
+        )
+        os.replace(tmp_path, destination)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+    info = probe_audio(destination)
+    info["source_bytes"] = os.path.getsize(source)
+    info["normalized_bytes"] = os.path.getsize(destination)
+    info["source_format"] = pathlib.Path(source).suffix.lstrip(".").lower()
+    return info
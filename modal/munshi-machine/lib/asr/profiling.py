@@ -0,0 +1,88 @@
+"""
+Per-stage wall time and memory for the GPU transcription pipeline
+"""
+
+import resource
+import threading
+import time
+from contextlib import contextmanager
+
+_PAGE_SIZE = resource.getpagesize()
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm", "r") as statm:
+            return int(statm.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _max_rss_bytes() -> int:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _cuda():
+    try:
+        import torch
+    except ImportError:
+        return None
+    return torch.cuda if torch.cuda.is_available() else None
+
+
+class StageProfiler:
+    """
+    Records, per stage: seconds, resident memory after the stage, growth of
+    the process's peak RSS and, on CUDA, peak allocated device memory.
+
+    Peaks are process-wide. They are attributed to a stage only when no
+    other input's stage ran at any point during it; otherwise they are
+    reported under container_* keys, and the CUDA peak counter is not
+    reset, so one input cannot clear another's peak.
+    """
+
+    # stages running in this process, across all profilers (inputs)
+    _lock = threading.Lock()
+    _active = 0
+    _started = 0
+
+    def __init__(self):
+        self.stages: dict[str, dict] = {}
+        self._cuda = _cuda()
+
+    @contextmanager
+    def stage(self, name: str):
+        cls = StageProfiler
+        cuda = self._cuda
+        with cls._lock:
+            cls._active += 1
+            cls._started += 1
+            ticket = cls._started
+            alone = cls._active == 1
+            if alone and cuda is not None:
+                cuda.reset_peak_memory_stats()
+        max_rss_before = _max_rss_bytes()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            with cls._lock:
+                cls._active -= 1
+                # nobody was running at entry and nobody started since
+                alone = alone and cls._started == ticket
+            prefix = "" if alone else "container_"
+            stats = {
+                "seconds": round(time.perf_counter() - started, 3),
+                "rss_mb": round(_rss_bytes() / 2**20, 1),
+                f"{prefix}peak_rss_growth_mb": round((_max_rss_bytes() - max_rss_before) / 2**20, 1),
+            }
+            if cuda is not None:
+                stats[f"{prefix}cuda_peak_mb"] = round(cuda.max_memory_allocated() / 2**20, 1)
+            self.stages[name] = stats
+
+    def summary(self) -> str:
+        return " ".join(
+            f"{name}=" + ",".join(f"{key}:{value}" for key, value in stats.items())
+            for name, stats in self.stages.items()
+        )
@@ -0,0 +1,35 @@
+"""
+Choose the transcription tier for a job from its probed duration
+"""
+
+from ...config import (
+    CPU_TIER_ENABLED,
+    CPU_TIER_MAX_SECONDS,
+    CPU_TIER_MAX_DIARIZE_SECONDS,
+    CPU_TIER_LOW_PRIORITY_MAX_SECONDS,
+)
+from .vad import SpeechIndex
+
+GPU_TIER = "gpu"
+CPU_TIER = "cpu"
+
+PRIORITIES = ("normal", "low")
+
+
+def speech_duration(audio_info: dict = None, speech_index: dict = None):
+    """Seconds of audio the worker will actually process, or None if unknown"""
+    if SpeechIndex.from_field(speech_index) is not None:
+        return speech_index["speech_seconds"]
+    if audio_info and audio_info.get("duration"):
+        return audio_info["duration"]
+    return None
+
+
+def select_tier(duration, enable_speakers: bool, priority: str = "normal") -> str:
+    if not CPU_TIER_ENABLED or duration is None:
+        return GPU_TIER
+    if priority == "low":
+        return CPU_TIER if duration <= CPU_TIER_LOW_PRIORITY_MAX_SECONDS else GPU_TIER
+    # diarization and alignment are the slow part on a CPU
+    limit = CPU_TIER_MAX_DIARIZE_SECONDS if enable_speakers else CPU_TIER_MAX_SECONDS
+    return CPU_TIER if duration <= limit else GPU_TIER
@@ -0,0 +1,269 @@
+"""
+Sharded transcription of long audio.
+
+The CPU pipeline cuts the normalized audio into shards of roughly equal
+length at the quietest pause near each boundary, so no word is split. Each
+shard is transcribed (and diarized) on its own WhisperX container via
+`.map`; `stitch_shards` shifts every segment and word back onto the
+original timeline and, since each shard's diarization names its speakers
+independently, matches speakers across shards by the cosine similarity of
+their embeddings.
+
+`LocalShardWorker` and `run_shards_locally` run the same split and stitch
+on the CPU with the stub model.
+"""
+
+import math
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from .speakers import assign_word_speakers
+from .streaming import SAMPLE_RATE
+from .vad import FRAME_SECONDS, SpeechIndex, file_frame_energies, frame_energies
+
+# Cuts are placed at the quietest point within this distance of the target,
+# and within a quarter of the shard spacing so neighbouring searches never meet
+CUT_SEARCH_SECONDS = 60
+# Frames this close to the quietest one are equally good; the one nearest
+# the target wins, so shards stay close to equal length
+CUT_TIE_DB = 1.0
+# Energies are smoothed over this span so cuts land in pauses, not gaps
+# between syllables
+CUT_SMOOTHING_SECONDS = 0.5
+# Shard speakers less similar than this to every known speaker are new ones
+SPEAKER_MATCH_THRESHOLD = 0.5
+
+
+def plan_shards(energies, duration: float, shard_seconds: float) -> list[dict]:
+    """[{index, start, end}] covering [0, duration] in seconds"""
+    import numpy as np
+
+    count = max(math.ceil(duration / shard_seconds), 1)
+    if count == 1 or len(energies) == 0:
+        return [{"index": 0, "start": 0.0, "end": round(duration, 3)}]
+
+    window = max(int(CUT_SMOOTHING_SECONDS / FRAME_SECONDS), 1)
+    smoothed = np.convolve(energies, np.ones(window) / window, mode="same")
+    spacing = duration / count
+    search = int(min(CUT_SEARCH_SECONDS, spacing / 4) / FRAME_SECONDS)
+
+    cuts = [0.0]
+    for k in range(1, count):
+        target = int(k * spacing / FRAME_SECONDS)
+        lo = max(target - search, 1)
+        hi = min(target + search, len(smoothed) - 1)
+        if hi <= lo:
+            continue
+        region = smoothed[lo:hi]
+        quiet = np.flatnonzero(region <= region.min() + CUT_TIE_DB)
+        frame = lo + int(quiet[np.argmin(np.abs(lo + quiet - target))])
+        cuts.append(round((frame + 0.5) * FRAME_SECONDS, 3))
+    cuts.append(round(duration, 3))
+    assert all(a < b for a, b in zip(cuts, cuts[1:])), f"shard cuts out of order: {cuts}"
+    return [
+        {"index": i, "start": start, "end": end}
+        for i, (start, end) in enumerate(zip(cuts, cuts[1:]))
+    ]
+
+
+def plan_file_shards(path, shard_seconds: float) -> list[dict]:
+    from .normalize import probe_audio
+
+    duration = probe_audio(path)["duration"]
+    return plan_shards(file_frame_energies(path), duration, shard_seconds)
+
+
+def plan_waveform_shards(audio, shard_seconds: float) -> list[dict]:
+    return plan_shards(frame_energies(audio), len(audio) / SAMPLE_RATE, shard_seconds)
+
+
+def load_audio_range(path, start: float, end: float, sample_rate: int = SAMPLE_RATE):
+    """Decode [start, end) seconds of a file like whisperx.load_audio"""
+    import numpy as np
+
+    result = subprocess.run(
+        [
+            "ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error",
+            "-threads", "0",
+            "-ss", f"{start:.3f}", "-t", f"{end - start:.3f}",
+            "-i", str(path),
+            "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(sample_rate), "-",
+        ],
+        check=True,
+        capture_output=True,
+    )
+    return np.frombuffer(result.stdout, np.int16).flatten().astype(np.float32) / 32768.0
+
+
+def shard_speech_index(speech_index: dict, start: float, end: float):
+    """A job's `speech_index` field restricted to one shard, shard-relative"""
+    if not speech_index or not speech_index.get("regions"):
+        return None
+    regions = [
+        [round(max(region_start, start) - start, 3), round(min(region_end, end) - start, 3)]
+        for region_start, region_end in speech_index["regions"]
+        if region_end > start and region_start < end
+    ]
+    return {
+        "version": speech_index.get("version"),
+        "duration": round(end - start, 3),
+        "speech_seconds": round(sum(region_end - region_start for region_start, region_end in regions), 3),
+        "regions": regions,
+    }
+
+
+def _cosine(a, b) -> float:
+    import numpy as np
+
+    norm = float(np.linalg.norm(a) * np.linalg.norm(b))
+    return float(np.dot(a, b)) / norm if norm else -1.0
+
+
+def reconcile_speakers(
+    shard_embeddings: list[dict], max_speakers: int = None, threshold: float = SPEAKER_MATCH_THRESHOLD
+) -> list[dict]:
+    """
+    For each shard, a mapping of its speaker labels to global labels.
+
+    Shards are taken in order; every shard speaker is matched to the most
+    similar global speaker not already matched in that shard, or becomes a
+    new global speaker below `threshold` (unless `max_speakers` are already
+    known, in which case it joins the closest one). A global speaker's
+    embedding is the mean of the shard embeddings matched to it.
+    """
+    import numpy as np
+
+    centroids: list = []
+    counts: list[int] = []
+    mappings = []
+    for embeddings in shard_embeddings:
+        embeddings = {
+            label: np.asarray(vector, dtype=np.float64)
+            for label, vector in (embeddings or {}).items()
+            if vector is not None and np.all(np.isfinite(vector))
+        }
+        pairs = sorted(
+            (
+                (_cosine(vector, centroid / count), label, k)
+                for label, vector in embeddings.items()
+                for k, (centroid, count) in enumerate(zip(centroids, counts))
+            ),
+            key=lambda pair: pair[0],
+            reverse=True,
+        )
+        mapping = {}
+        used = set()
+        for similarity, label, k in pairs:
+            if label in mapping or k in used or similarity < threshold:
+                continue
+            mapping[label] = k
+            used.add(k)
+
+        for label, vector in embeddings.items():
+            if label in mapping:
+                continue
+            if max_speakers and len(centroids) >= max_speakers:
+                mapping[label] = max(
+                    range(len(centroids)), key=lambda k: _cosine(vector, centroids[k] / counts[k])
+                )
+            else:
+                centroids.append(np.zeros_like(vector))
+                counts.append(0)
+                mapping[label] = len(centroids) - 1
+
+        for label, k in mapping.items():
+            centroids[k] = centroids[k] + embeddings[label]
+            counts[k] += 1
+        mappings.append({label: f"SPEAKER_{k:02d}" for label, k in mapping.items()})
+    return mappings
+
+
+def _shift(items: list, offset: float, speakers: dict) -> list:
+    shifted = []
+    for item in items:
+        item = dict(item)
+        for key in ("start", "end"):
+            if item.get(key) is not None:
+                item[key] = round(item[key] + offset, 3)
+        if item.get("speaker") is not None:
+            item["speaker"] = speakers.get(item["speaker"], item["speaker"])
+        if item.get("words"):
+            item["words"] = _shift(item["words"], offset, speakers)
+        shifted.append(item)
+    return shifted
+
+
+def stitch_shards(shard_results: list[dict], max_speakers: int = None) -> dict:
+    """
+    One whisperx-style result ({segments, word_segments, language}) on the
+    original timeline from the per-shard results of `transcribe_shard`
+    """
+    from collections import Counter
+
+    shard_results = sorted(shard_results, key=lambda result: result["index"])
+    speaker_maps = reconcile_speakers(
+        [result.get("speaker_embeddings") for result in shard_results], max_speakers
+    )
+    # unmatched labels (no embedding) are still kept apart per shard, as new
+    # SPEAKER_NN labels past every reconciled one and past max_speakers
+    reconciled = {label for speakers in speaker_maps for label in speakers.values()}
+    next_index = max([int(label.rsplit("_", 1)[1]) + 1 for label in reconciled] + [max_speakers or 0])
+    segments = []
+    for result, speakers in zip(shard_results, speaker_maps):
+        speakers = dict(speakers)
+        for segment in result["segments"]:
+            for item in [segment] + segment.get("words", []):
+                label = item.get("speaker")
+                if label is not None and label not in speakers:
+                    speakers[label] = f"SPEAKER_{next_index:02d}"
+                    next_index += 1
+        segments.extend(_shift(result["segments"], result["start"], speakers))
+
+    languages = Counter(result.get("language") for result in shard_results if result.get("language"))
+    return {
+        "segments": segments,
+        "word_segments": [word for segment in segments for word in segment.get("words", [])],
+        "language": languages.most_common(1)[0][0] if languages else None,
+    }
+
+
+class LocalShardWorker:
+    """
+    CPU stand-in for `WhisperX.transcribe_shard` over an in-memory waveform,
+    with a stub model and diarizer (see stub.py). Segments get the speaker
+    their time overlaps most, since the stub model has no word timings.
+    """
+
+    def __init__(self, audio, model, diarizer=None, batch_size: int = 32):
+        self.audio = audio
+        self.model = model
+        self.diarizer = diarizer
+        self.batch_size = batch_size
+
+    def transcribe_shard(self, audio_file_path: str, shard: dict, enable_speakers: bool = True,
+                         num_speakers: int = 1, speech_index: dict = None) -> dict:
+        audio = self.audio[int(shard["start"] * SAMPLE_RATE):int(shard["end"] * SAMPLE_RATE)]
+        index = SpeechIndex.from_field(shard_speech_index(speech_index, shard["start"], shard["end"]))
+        if index is not None:
+            audio = index.compact(audio)
+        result = self.model.transcribe(audio, batch_size=self.batch_size)
+        embeddings = None
+        if enable_speakers and self.diarizer is not None:
+            turns, embeddings = self.diarizer(audio, max_speakers=num_speakers)
+            result = assign_word_speakers(turns, result)
+        if index is not None:
+            result = index.remap_result(result)
+        return {
+            **shard,
+            "language": result.get("language"),
+            "segments": result["segments"],
+            "speaker_embeddings": embeddings,
+        }
+
+
+def run_shards_locally(worker, audio_file_path: str, shards: list[dict], max_workers: int = 4, **kwargs) -> list[dict]:
+    """`transcribe_shard.map` on a thread pool"""
+    with ThreadPoolExecutor(max_workers) as pool:
+        return list(pool.map(
+            lambda shard: worker.transcribe_shard(audio_file_path, shard, **kwargs), shards
+        ))
@@ -0,0 +1,196 @@
+"""
+Speaker assignment for aligned transcripts.
+
+Same inputs and output as `whisperx.assign_word_speakers` (3.4), which
+recomputes the overlap of every segment and word with every diarization
+turn in pandas: O(words x turns). Here turns are sorted once and every
+query is answered with binary searches:
+
+- without `fill_nearest`, a word gets the speaker with the largest total
+  overlap among turns overlapping it. Candidates are found with
+  `searchsorted` over turn starts and the running maximum of turn ends,
+  and their overlaps summed exactly as whisperx does.
+- with `fill_nearest`, whisperx does not pick the nearest turn: it takes
+  the speaker with the largest sum of signed overlaps
+  min(end, word_end) - max(start, word_start) over *all* of that speaker's
+  turns. That sum splits into prefix sums of each speaker's sorted starts
+  and ends, so each query costs one `searchsorted` per speaker.
+
+Totals are tied more often than one would think (diarization times sit on
+a frame grid), and whisperx breaks ties with pandas'
+`sort_values(ascending=False)`, whose quicksort is not stable; tied totals
+are therefore replayed through the same argsort. Ties are decided on totals
+rounded exactly as pandas rounds them: groupby sums each speaker's rows in
+row order with Kahan compensation. Prefix sums round differently, so where
+their top two totals are within TIE_TOLERANCE of each other the totals are
+recomputed that way before choosing.
+"""
+
+import numpy as np
+
+# relative to the magnitudes summed; far above the rounding error of the
+# prefix sums, so any closer pair may be a tie in pandas' own sums
+TIE_TOLERANCE = 1e-9
+
+
+def _diarization_arrays(diarize_segments):
+    """(starts, ends, speaker ids, sorted labels) of a DataFrame or turn dicts"""
+    if hasattr(diarize_segments, "to_dict"):
+        starts = diarize_segments["start"].to_numpy(dtype=np.float64)
+        ends = diarize_segments["end"].to_numpy(dtype=np.float64)
+        speakers = diarize_segments["speaker"].tolist()
+    else:
+        starts = np.array([turn["start"] for turn in diarize_segments], dtype=np.float64)
+        ends = np.array([turn["end"] for turn in diarize_segments], dtype=np.float64)
+        speakers = [turn["speaker"] for turn in diarize_segments]
+    labels = sorted(set(speakers))
+    label_ids = {label: i for i, label in enumerate(labels)}
+    speaker_ids = np.array([label_ids[speaker] for speaker in speakers], dtype=np.int64)
+    return starts, ends, speaker_ids, labels
+
+
+def _first_descending(totals) -> int:
+    """
+    Position of the entry `Series(totals).sort_values(ascending=False)`
+    lists first (pandas' nargsort: reverse, quicksort, reverse)
+    """
+    totals = np.asarray(totals, dtype=np.float64)
+    reversed_positions = np.arange(len(totals))[::-1]
+    return int(reversed_positions[totals[::-1].argsort(kind="quicksort")][-1])
+
+
+def _overlapping(starts, ends, speaker_ids, query_starts, query_ends) -> list[int]:
+    """Per query, the speaker with the most positive overlap, or -1"""
+    # turns with zero or negative length never overlap anything
+    valid = np.flatnonzero(ends > starts)
+    order = valid[np.argsort(starts[valid], kind="stable")]
+    sorted_starts = starts[order]
+    running_max_end = np.maximum.accumulate(ends[order]) if len(order) else ends[order]
+
+    # candidates are turns starting before the query ends, from the first
+    # turn that could still reach past the query start
+    his = np.searchsorted(sorted_starts, query_ends, side="left").tolist()
+    los = np.searchsorted(running_max_end, query_starts, side="right").tolist()
+
+    order = order.tolist()
+    starts = starts.tolist()
+    ends = ends.tolist()
+    speaker_ids = speaker_ids.tolist()
+    choices = []
+    for query_start, query_end, lo, hi in zip(query_starts.tolist(), query_ends.tolist(), los, his):
+        totals = {}
+        compensations = {}
+        # summed in row order with Kahan compensation, as the DataFrame groupby does
+        for row in sorted(order[lo:hi]):
+            overlap = min(ends[row], query_end) - max(starts[row], query_start)
+            if overlap > 0:
+                speaker = speaker_ids[row]
+                total = totals.get(speaker, 0.0)
+                y = overlap - compensations.get(speaker, 0.0)
+                t = total + y
+                compensations[speaker] = t - total - y
+                totals[speaker] = t
+        if not totals:
+            choices.append(-1)
+            continue
+        # groupby lists speakers in label order
+        speakers = sorted(totals)
+        choices.append(speakers[_first_descending([totals[speaker] for speaker in speakers])])
+    return choices
+
+
+def _signed_overlap_sums(starts, ends, speaker_ids, label_count, query_starts, query_ends):
+    """[speakers x queries] sums of min(end, qe) - max(start, qs) over each speaker's turns"""
+    scores = np.empty((label_count, len(query_starts)), dtype=np.float64)
+    for speaker in range(label_count):
+        mask = speaker_ids == speaker
+        speaker_starts = np.sort(starts[mask])
+        speaker_ends = np.sort(ends[mask])
+        count = len(speaker_starts)
+        start_sums = np.concatenate(([0.0], np.cumsum(speaker_starts)))
+        end_sums = np.concatenate(([0.0], np.cumsum(speaker_ends)))
+
+        # sum of min(end, qe): ends below qe as they are, the rest as qe
+        below = np.searchsorted(speaker_ends, query_ends, side="left")
+        min_ends = end_sums[below] + query_ends * (count - below)
+        # sum of max(start, qs): starts above qs as they are, the rest as qs
+        at_or_below = np.searchsorted(speaker_starts, query_starts, side="right")
+        max_starts = (start_sums[-1] - start_sums[at_or_below]) + query_starts * at_or_below
+        scores[speaker] = min_ends - max_starts
+    return scores
+
+
+def _exact_overlap_sums(starts, ends, speaker_ids, label_count, query_starts, query_ends):
+    """
+    [speakers x queries] signed overlap sums as whisperx's groupby computes
+    them: per row in row order, Kahan-compensated per speaker
+    """
+    totals = np.zeros((label_count, len(query_starts)), dtype=np.float64)
+    compensations = np.zeros_like(totals)
+    for start, end, speaker in zip(starts.tolist(), ends.tolist(), speaker_ids.tolist()):
+        overlap = np.minimum(end, query_ends) - np.maximum(start, query_starts)
+        total = totals[speaker]
+        y = overlap - compensations[speaker]
+        t = total + y
+        compensations[speaker] = t - total - y
+        totals[speaker] = t
+    return totals
+
+
+def _nearest(starts, ends, speaker_ids, label_count, query_starts, query_ends) -> list[int]:
+    """Per query, the speaker with the largest sum of signed overlaps"""
+    scores = _signed_overlap_sums(starts, ends, speaker_ids, label_count, query_starts, query_ends)
+    choices = scores.argmax(axis=0)
+    if label_count > 1:
+        top_two = np.partition(scores, label_count - 2, axis=0)[-2:]
+        magnitude = (
+            np.abs(starts).sum() + np.abs(ends).sum()
+            + len(starts) * (np.abs(query_starts) + np.abs(query_ends))
+        )
+        close = np.flatnonzero(top_two[1] - top_two[0] <= TIE_TOLERANCE * magnitude)
+        if len(close):
+            exact = _exact_overlap_sums(
+                starts, ends, speaker_ids, label_count, query_starts[close], query_ends[close]
+            )
+            for column, query in enumerate(close.tolist()):
+                choices[query] = _first_descending(exact[:, column])
+    return choices.tolist()
+
+
+def assign_word_speakers(diarize_segments, transcript_result: dict,
+                         speaker_embeddings: dict = None, fill_nearest: bool = False) -> dict:
+    """
+    Drop-in for `whisperx.assign_word_speakers`: sets "speaker" on every
+    segment and timed word in place and returns `transcript_result`.
+    `diarize_segments` is the DiarizationPipeline DataFrame or a list of
+    {start, end, speaker} turns.
+    """
+    targets = []
+    query_starts = []
+    query_ends = []
+    for segment in transcript_result["segments"]:
+        targets.append(segment)
+        query_starts.append(segment["start"])
+        query_ends.append(segment["end"])
+        if "words" in segment:
+            for word in segment["words"]:
+                if "start" in word:
+                    targets.append(word)
+                    query_starts.append(word["start"])
+                    query_ends.append(word["end"])
+
+    starts, ends, speaker_ids, labels = _diarization_arrays(diarize_segments)
+    if targets and labels:
+        query_starts = np.asarray(query_starts, dtype=np.float64)
+        query_ends = np.asarray(query_ends, dtype=np.float64)
+        if fill_nearest:
+            choices = _nearest(starts, ends, speaker_ids, len(labels), query_starts, query_ends)
+        else:
+            choices = _overlapping(starts, ends, speaker_ids, query_starts, query_ends)
+        for target, choice in zip(targets, choices):
+            if choice >= 0:
+                target["speaker"] = labels[choice]
+
+    if speaker_embeddings is not None:
+        transcript_result["speaker_embeddings"] = speaker_embeddings
+    return transcript_result
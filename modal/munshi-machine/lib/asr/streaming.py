@@ -0,0 +1,140 @@
+"""
+Window-by-window transcription so finalized segments can be consumed while
+later audio is still being decoded
+"""
+
+import asyncio
+import threading
+import time
+from typing import Any, AsyncIterator, Iterator
+
+SAMPLE_RATE = 16000
+
+# Search this far back from a window boundary for the quietest cut point
+CUT_SEARCH_SECONDS = 5
+CUT_FRAME_SECONDS = 0.1
+
+
+def _quiet_cut(audio, target: int, search: int, frame: int) -> int:
+    """Sample index of the lowest-energy frame in audio[target - search:target]"""
+    import numpy as np
+
+    lo = max(0, target - search)
+    region = audio[lo:target]
+    n_frames = len(region) // frame
+    if n_frames < 2:
+        return target
+    energy = np.square(region[:n_frames * frame].reshape(n_frames, frame)).mean(axis=1)
+    return lo + int(np.argmin(energy)) * frame + frame // 2
+
+
+def iter_windows(audio, window_seconds: float, sample_rate: int = SAMPLE_RATE) -> Iterator[tuple[int, int]]:
+    """
+    (start, end) sample ranges of roughly `window_seconds`, cut at the
+    quietest point near each boundary so words are not split
+    """
+    total = len(audio)
+    window = int(window_seconds * sample_rate)
+    search = int(CUT_SEARCH_SECONDS * sample_rate)
+    frame = int(CUT_FRAME_SECONDS * sample_rate)
+
+    start = 0
+    while start < total:
+        end = start + window
+        if end >= total:
+            yield start, total
+            return
+        end = _quiet_cut(audio, end, min(search, window // 2), frame)
+        yield start, end
+        start = end
+
+
+def stream_segments(
+    model,
+    audio,
+    batch_size: int,
+    window_seconds: float,
+    language: str = None,
+    sample_rate: int = SAMPLE_RATE,
+) -> Iterator[dict]:
+    """
+    Transcribe `audio` window by window, yielding each window's segments
+    with timestamps shifted to the original timeline. The language detected
+    on the first window is reused for the rest.
+    """
+    for start, end in iter_windows(audio, window_seconds, sample_rate):
+        kwargs = {"batch_size": batch_size}
+        if language:
+            kwargs["language"] = language
+        result = model.transcribe(audio[start:end], **kwargs)
+        language = language or result.get("language")
+
+        offset = start / sample_rate
+        segments = []
+        for segment in result.get("segments", []):
+            segment = dict(segment)
+            segment["start"] = round(segment["start"] + offset, 3)
+            segment["end"] = round(segment["end"] + offset, 3)
+            segments.append(segment)
+
+        yield {
+            "segments": segments,
+            "language": language,
+            "window": [start / sample_rate, end / sample_rate],
+        }
+
+
+async def iterate_in_thread(generator: Iterator[Any], max_buffered: int = 8) -> AsyncIterator[Any]:
+    """
+    Drive a blocking generator on a worker thread and yield its items on the
+    event loop (used by transcribe_stream_local to run a local model
+    alongside async consumers)
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max_buffered)
+    done = object()
+
+    def produce():
+        try:
+            for item in generator:
+                asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+        except BaseException as e:
+            asyncio.run_coroutine_threadsafe(queue.put(e), loop).result()
+        finally:
+            asyncio.run_coroutine_threadsafe(queue.put(done), loop).result()
+
+    threading.Thread(target=produce, daemon=True).start()
+    while True:
+        item = await queue.get()
+        if item is done:
+            return
+        if isinstance(item, BaseException):
+            raise item
+        yield item
+
+
+async def transcribe_stream_local(
+    model,
+    audio,
+    batch_size: int,
+    window_seconds: float,
+    format_result=None,
+) -> AsyncIterator[dict]:
+    """
+    Local stand-in for WhisperX.transcribe_stream: decodes on a worker thread
+    and yields the same {"type": "segments"} events, then a {"type": "result"}
+    event whose transcript is `format_result(result, seconds)`, or the raw
+    whisperx-style result when no formatter is given
+    """
+    start_time = time.time()
+    segments = []
+    language = None
+    async for window in iterate_in_thread(stream_segments(model, audio, batch_size, window_seconds)):
+        language = window["language"]
+        segments.extend(window["segments"])
+        yield {"type": "segments", **window}
+
+    result = {"segments": segments, "language": language}
+    processing_time = time.time() - start_time
+    transcript = format_result(result, processing_time) if format_result else result
+    yield {"type": "result", "transcript": transcript, "processing_time": processing_time}
@@ -0,0 +1,115 @@
+"""
+CPU stand-in for the WhisperX model, for running the pipeline locally
+"""
+
+import threading
+import time
+
+from .streaming import SAMPLE_RATE
+
+
+class StubWhisperModel:
+    """
+    Mimics `FasterWhisperPipeline`: audio is cut into `segment_seconds`
+    chunks, and decoding a batch of up to `batch_size` chunks sleeps
+    `batch_latency` seconds however full it is, like a GPU that is not yet
+    compute-bound. Batches from concurrent callers run one at a time, as
+    on a single device. Also implements the backend interface of
+    `batching.BatchedTranscriber`.
+    """
+
+    def __init__(self, batch_latency: float = 0.05, segment_seconds: float = 10.0, language: str = "en"):
+        self.batch_latency = batch_latency
+        self.segment_seconds = segment_seconds
+        self.language = language
+        self.calls = 0
+        self.batches = 0
+        self._device = threading.Lock()
+
+    def segment(self, audio) -> list[tuple[float, float]]:
+        duration = len(audio) / SAMPLE_RATE
+        segments = []
+        start = 0.0
+        while start < duration:
+            end = min(start + self.segment_seconds, duration)
+            segments.append((round(start, 3), round(end, 3)))
+            start = end
+        return segments
+
+    def detect_language(self, audio) -> str:
+        return self.language
+
+    def decode_batch(self, chunks: list, language: str) -> list[str]:
+        with self._device:
+            self.batches += 1
+            time.sleep(self.batch_latency)
+        return [
+            f" Segment of {len(chunk) / SAMPLE_RATE:.1f} seconds."
+            for chunk in chunks
+        ]
+
+    def transcribe(self, audio, batch_size: int = 32, language: str = None, **kwargs) -> dict:
+        self.calls += 1
+        language = language or self.detect_language(audio)
+        spans = self.segment(audio)
+        texts = []
+        for i in range(0, len(spans), batch_size):
+            chunks = [
+                audio[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)]
+                for start, end in spans[i:i + batch_size]
+            ]
+            texts.extend(self.decode_batch(chunks, language))
+        segments = [
+            {"start": start, "end": end, "text": text}
+            for (start, end), text in zip(spans, texts)
+        ]
+        return {"segments": segments, "language": language}
+
+
+class StubDiarizer:
+    """
+    Labels each second of audio by its spectrum: seconds whose band-energy
+    profiles are close are the same speaker. Labels are assigned in order of
+    first appearance, so the same voice can get different labels in
+    different shards, as with real diarization. Returns (turns, embeddings)
+    like `DiarizationPipeline(..., return_embeddings=True)`.
+    """
+
+    def __init__(self, bands: int = 32, similarity: float = 0.9, silence_db: float = -40.0):
+        self.bands = bands
+        self.similarity = similarity
+        self.silence_db = silence_db
+
+    def __call__(self, audio, max_speakers: int = None):
+        import numpy as np
+
+        centroids = []
+        turns = []
+        for start in range(0, len(audio) - SAMPLE_RATE + 1, SAMPLE_RATE):
+            frame = audio[start:start + SAMPLE_RATE]
+            if 10 * np.log10(np.square(frame).mean() + 1e-12) < self.silence_db:
+                continue
+            spectrum = np.abs(np.fft.rfft(frame))
+            profile = np.array([band.sum() for band in np.array_split(spectrum, self.bands)])
+            profile /= np.linalg.norm(profile) or 1.0
+
+            similarities = [float(profile @ (c / np.linalg.norm(c))) for c in centroids]
+            best = int(np.argmax(similarities)) if similarities else None
+            if best is None or (similarities[best] < self.similarity
+                                and not (max_speakers and len(centroids) >= max_speakers)):
+                centroids.append(profile.copy())
+                best = len(centroids) - 1
+            else:
+                centroids[best] += profile
+            speaker = f"SPEAKER_{best:02d}"
+
+            seconds = start / SAMPLE_RATE
+            if turns and turns[-1]["speaker"] == speaker and turns[-1]["end"] == seconds:
+                turns[-1]["end"] = seconds + 1.0
+            else:
+                turns.append({"start": seconds, "end": seconds + 1.0, "speaker": speaker})
+
+        embeddings = {
+            f"SPEAKER_{k:02d}": (c / np.linalg.norm(c)).tolist() for k, c in enumerate(centroids)
+        }
+        return turns, embeddings
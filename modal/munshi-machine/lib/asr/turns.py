@@ -0,0 +1,119 @@
+"""
+Speaker turns of an aligned transcript.
+
+A transcript's turns are one NumPy record per turn (speaker index, start,
+end, and the turn's slice of a shared text buffer), built in one pass over
+the segments. Consecutive words and segments of the same speaker extend the
+open turn in place, so no per-speaker strings are joined, re-split or
+re-joined, and the "SPEAKER: text" transcript is only rendered when asked for.
+"""
+
+from array import array
+from functools import cached_property
+
+import numpy as np
+
+TURN_DTYPE = np.dtype([
+    ("speaker", np.int16),
+    ("start", np.float32),
+    ("end", np.float32),
+    ("text_start", np.int32),
+    ("text_end", np.int32),
+])
+
+NAN = float("nan")
+
+
+class SpeakerTurns:
+    """`turns` records index into `speakers` (labels) and `text`"""
+
+    def __init__(self, speakers: list[str], turns, text: str):
+        self.speakers = speakers
+        self.turns = turns
+        self.text = text
+
+    @classmethod
+    def from_segments(cls, segments: list[dict]) -> "SpeakerTurns":
+        """
+        Turns of whisperx-style segments: words carry their own speaker when
+        any word of the segment has one, otherwise the whole segment is the
+        segment's speaker. Words and segments without text are skipped, as are
+        words whose speaker is set to None.
+        """
+        speaker_ids = {}
+        # one typed column per field, so rows are never boxed
+        columns = tuple(array(TURN_DTYPE[name].char) for name in TURN_DTYPE.names)
+        speaker_column, start_column, end_column, text_start_column, text_end_column = columns
+        texts = []
+        length = 0
+        # open turn: speaker label, start, end and its words
+        label = start = end = None
+        turn_words = []
+
+        def close():
+            nonlocal length
+            turn_text = " ".join(turn_words)
+            speaker_column.append(speaker_ids.setdefault(label, len(speaker_ids)))
+            start_column.append(NAN if start is None else start)
+            end_column.append(NAN if end is None else end)
+            text_start_column.append(length)
+            length += len(turn_text)
+            text_end_column.append(length)
+            texts.append(turn_text)
+
+        for segment in segments:
+            text = segment.get("text", "").strip()
+            if not text:
+                continue
+            words = segment.get("words", [])
+            if not (words and any(word.get("speaker") for word in words)):
+                speaker = f"{segment.get('speaker', 'UNKNOWN')}"
+                if not speaker:
+                    continue
+                words = ({"word": text, "start": segment.get("start"), "end": segment.get("end"), "speaker": speaker},)
+
+            for word in words:
+                speaker = word.get("speaker", "UNKNOWN")
+                word_text = word.get("word", "").strip()
+                if not (speaker and word_text):
+                    continue
+                if speaker != label:
+                    if turn_words:
+                        close()
+                    label, start, end = speaker, None, None
+                    turn_words = []
+                turn_words.append(word_text)
+                # words whisperx could not align have no timings
+                if start is None:
+                    start = word.get("start")
+                end = word.get("end", end)
+        if turn_words:
+            close()
+
+        turns = np.empty(len(texts), dtype=TURN_DTYPE)
+        for name, column in zip(TURN_DTYPE.names, columns):
+            turns[name] = np.frombuffer(column, dtype=TURN_DTYPE[name]) if column else 0
+        return cls(list(speaker_ids), turns, "".join(texts))
+
+    def __len__(self) -> int:
+        return len(self.turns)
+
+    def _columns(self, *names):
+        # aligned copies of the packed fields, whose memoryviews iterate as
+        # plain numbers without boxing whole rows
+        return [memoryview(self.turns[name].copy()) for name in names]
+
+    def __iter__(self):
+        """(speaker label, start, end, text) per turn"""
+        for speaker, start, end, text_start, text_end in zip(*self._columns(*TURN_DTYPE.names)):
+            yield self.speakers[speaker], start, end, self.text[text_start:text_end]
+
+    @cached_property
+    def transcript(self) -> str:
+        """One "SPEAKER: text" line per turn"""
+        prefixes = [f"{speaker}: " for speaker in self.speakers]
+        text = self.text
+        return "\n".join(
+            prefixes[speaker] + text[text_start:text_end]
+            for speaker, text_start, text_end in zip(*self._columns("speaker", "text_start", "text_end"))
+        )
@@ -0,0 +1,198 @@
+"""
+Energy-based voice activity detection and the speech-region index.
+
+The CPU pipeline scans the normalized 16 kHz audio once and stores the
+regions worth transcribing as the job's `speech_index` field. The GPU worker
+cuts those regions out of the decoded waveform, runs transcription,
+alignment and diarization on the shorter "compact" audio, then maps every
+timestamp back to the original timeline.
+
+Only silence and near-silence is skipped; music and background noise are
+loud enough to count as speech, so they are still transcribed.
+"""
+
+import bisect
+import subprocess
+
+from .streaming import SAMPLE_RATE
+
+FRAME_SECONDS = 0.03
+# Frames this far above the recording's noise floor count as speech...
+NOISE_MARGIN_DB = 12.0
+# ...but the threshold never goes below/above these levels (dBFS)
+MIN_THRESHOLD_DB = -55.0
+MAX_THRESHOLD_DB = -35.0
+NOISE_FLOOR_PERCENTILE = 10
+# Silences shorter than this stay in; Whisper keeps its context across them
+MIN_SILENCE_SECONDS = 2.0
+# Speech kept on either side of every region
+PAD_SECONDS = 0.3
+MIN_SPEECH_SECONDS = 0.2
+# Below this much skippable audio the full waveform is used as is
+MIN_SKIPPED_SECONDS = 10.0
+
+READ_CHUNK_SECONDS = 30
+INDEX_VERSION = 1
+
+
+def frame_energies(audio, sample_rate: int = SAMPLE_RATE):
+    """Per-frame energy in dBFS of float audio in [-1, 1]"""
+    import numpy as np
+
+    frame = int(FRAME_SECONDS * sample_rate)
+    n_frames = len(audio) // frame
+    if n_frames == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = np.asarray(audio[:n_frames * frame], dtype=np.float32).reshape(n_frames, frame)
+    power = np.square(frames).mean(axis=1)
+    return (10 * np.log10(power + 1e-12)).astype(np.float32)
+
+
+def file_frame_energies(path, sample_rate: int = SAMPLE_RATE):
+    """
+    frame_energies of an audio file, decoded by ffmpeg and read in chunks so
+    an hour of audio never sits in memory as float32
+    """
+    import numpy as np
+
+    frame = int(FRAME_SECONDS * sample_rate)
+    chunk_bytes = (READ_CHUNK_SECONDS * sample_rate // frame) * frame * 2
+    process = subprocess.Popen(
+        [
+            "ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error",
+            "-i", str(path),
+            "-f", "s16le", "-ac", "1", "-ar", str(sample_rate), "-",
+        ],
+        stdout=subprocess.PIPE,
+    )
+    energies = []
+    try:
+        while True:
+            raw = process.stdout.read(chunk_bytes)
+            if not raw:
+                break
+            samples = np.frombuffer(raw[:len(raw) // 2 * 2], dtype=np.int16)
+            energies.append(frame_energies(samples.astype(np.float32) / 32768.0, sample_rate))
+    finally:
+        process.stdout.close()
+        if process.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed to decode {path}")
+    return np.concatenate(energies) if energies else np.zeros(0, dtype=np.float32)
+
+
+def speech_threshold(energies) -> float:
+    import numpy as np
+
+    if len(energies) == 0:
+        return MIN_THRESHOLD_DB
+    noise_floor = float(np.percentile(energies, NOISE_FLOOR_PERCENTILE))
+    return min(max(noise_floor + NOISE_MARGIN_DB, MIN_THRESHOLD_DB), MAX_THRESHOLD_DB)
+
+
+def detect_speech(energies, duration: float) -> list[tuple[float, float]]:
+    """(start, end) seconds of speech regions, padded and merged"""
+    import numpy as np
+
+    if len(energies) == 0:
+        return [(0.0, duration)] if duration > 0 else []
+
+    active = energies > speech_threshold(energies)
+    # rising and falling edges of runs of active frames
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], active.astype(np.int8), [0]))))
+    regions = []
+    for start_frame, end_frame in zip(edges[::2], edges[1::2]):
+        start = max(start_frame * FRAME_SECONDS - PAD_SECONDS, 0.0)
+        end = min(end_frame * FRAME_SECONDS + PAD_SECONDS, duration)
+        if regions and start - regions[-1][1] < MIN_SILENCE_SECONDS:
+            regions[-1] = (regions[-1][0], end)
+        else:
+            regions.append((start, end))
+    regions = [
+        (round(start, 3), round(end, 3))
+        for start, end in regions
+        if end - start >= MIN_SPEECH_SECONDS + 2 * PAD_SECONDS
+    ]
+    # nothing detected is more likely a very quiet recording than silence
+    return regions or [(0.0, duration)]
+
+
+def build_speech_index(path, duration: float) -> dict:
+    """The job's `speech_index` field for a normalized audio file"""
+    regions = detect_speech(file_frame_energies(path), duration)
+    speech_seconds = sum(end - start for start, end in regions)
+    return {
+        "version": INDEX_VERSION,
+        "duration": round(duration, 3),
+        "speech_seconds": round(speech_seconds, 3),
+        "regions": [[start, end] for start, end in regions],
+    }
+
+
+class SpeechIndex:
+    """Cuts speech regions out of a waveform and maps compact times back"""
+
+    def __init__(self, regions, sample_rate: int = SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self.regions = [(float(start), float(end)) for start, end in regions]
+        # start of each region on the compact timeline
+        self.compact_starts = []
+        position = 0.0
+        for start, end in self.regions:
+            self.compact_starts.append(position)
+            position += end - start
+        self.compact_duration = position
+
+    @classmethod
+    def from_field(cls, speech_index: dict, sample_rate: int = SAMPLE_RATE):
+        """
+        Index for a job's `speech_index` field, or None if there is too
+        little silence in it to be worth cutting
+        """
+        if not speech_index or speech_index.get("version") != INDEX_VERSION:
+            return None
+        index = cls(speech_index.get("regions") or [], sample_rate)
+        if not index.regions or index.skipped_seconds(speech_index["duration"]) < MIN_SKIPPED_SECONDS:
+            return None
+        return index
+
+    def skipped_seconds(self, duration: float) -> float:
+        return max(duration - self.compact_duration, 0.0)
+
+    def compact(self, audio):
+        """Concatenation of the speech regions of `audio`"""
+        import numpy as np
+
+        pieces = [
+            audio[int(start * self.sample_rate):int(end * self.sample_rate)]
+            for start, end in self.regions
+        ]
+        if not pieces:
+            return audio[:0]
+        return np.concatenate(pieces)
+
+    def to_original(self, t: float) -> float:
+        if not self.regions:
+            return t
+        i = max(bisect.bisect_right(self.compact_starts, t) - 1, 0)
+        start, end = self.regions[i]
+        return round(min(start + t - self.compact_starts[i], end), 3)
+
+    def remap_segments(self, segments: list) -> list:
+        """Copies of segments (and their words) on the original timeline"""
+        remapped = []
+        for segment in segments:
+            segment = dict(segment)
+            for key in ("start", "end"):
+                if segment.get(key) is not None:
+                    segment[key] = self.to_original(segment[key])
+            if segment.get("words"):
+                segment["words"] = self.remap_segments(segment["words"])
+            remapped.append(segment)
+        return remapped
+
+    def remap_result(self, result: dict) -> dict:
+        result = dict(result)
+        result["segments"] = self.remap_segments(result.get("segments", []))
+        if result.get("word_segments"):
+            result["word_segments"] = self.remap_segments(result["word_segments"])
+        return result
@@ -0,0 +1,112 @@
+"""
+Word-level timings of an aligned transcript, stored by column.
+
+Every word is one entry in a few flat arrays (start, end, speaker index,
+alignment score, and offsets into one UTF-8 text blob) instead of a JSON
+object, so a multi-hour transcript's words take ~18 bytes each plus their
+text. Words are kept ordered by start time, and `span` finds the words
+starting in [t0, t1) with two binary searches, which also works on columns
+memory-mapped from the job store without reading them.
+"""
+
+import numpy as np
+
+WORDS_VERSION = 1
+
+WORD_COLUMNS = {
+    "start": np.float32,
+    "end": np.float32,
+    # index into `speakers`, -1 for none
+    "speaker": np.int16,
+    # whisperx alignment score, NaN when the word was not aligned
+    "score": np.float32,
+    # byte offsets of each word in `text`, one more than there are words
+    "text_offsets": np.int32,
+    "text": np.uint8,
+}
+
+
+class WordTimings:
+    def __init__(self, speakers: list[str], columns: dict):
+        self.speakers = speakers
+        self.columns = columns
+
+    @classmethod
+    def from_segments(cls, segments: list[dict]) -> "WordTimings":
+        """
+        Words of whisperx-style segments. Words whisperx could not align (e.g.
+        numerals) have no timings; they are pinned to the end of the previous
+        word, or the start of their segment.
+        """
+        speaker_ids = {}
+        words = []
+        clock = 0.0
+        for segment in segments:
+            if segment.get("start") is not None:
+                clock = segment["start"]
+            for word in segment.get("words", []):
+                text = word.get("word", "").strip()
+                if not text:
+                    continue
+                start = word.get("start")
+                end = word.get("end")
+                if start is None or end is None:
+                    start = end = clock
+                clock = end
+                speaker = word.get("speaker")
+                speaker = -1 if speaker is None else speaker_ids.setdefault(speaker, len(speaker_ids))
+                score = word.get("score")
+                words.append((start, end, speaker, np.nan if score is None else score, text.encode("utf-8")))
+        # stitched or remapped results are ordered already
+        if any(a[0] > b[0] for a, b in zip(words, words[1:])):
+            words.sort(key=lambda word: word[0])
+
+        texts = [word[4] for word in words]
+        offsets = np.zeros(len(words) + 1, dtype=WORD_COLUMNS["text_offsets"])
+        np.cumsum([len(text) for text in texts], out=offsets[1:])
+        columns = {
+            name: np.array([word[i] for word in words], dtype=WORD_COLUMNS[name])
+            for i, name in enumerate(("start", "end", "speaker", "score"))
+        }
+        columns["text_offsets"] = offsets
+        columns["text"] = np.frombuffer(b"".join(texts), dtype=WORD_COLUMNS["text"])
+        return cls(list(speaker_ids), columns)
+
+    def meta(self) -> dict:
+        return {"version": WORDS_VERSION, "count": len(self), "speakers": self.speakers}
+
+    def __len__(self) -> int:
+        return len(self.columns["start"])
+
+    def span(self, start: float = None, end: float = None) -> tuple[int, int]:
+        """(lo, hi) index range of the words starting in [start, end)"""
+        starts = self.columns["start"]
+        lo = 0 if start is None else int(np.searchsorted(starts, start, side="left"))
+        hi = len(starts) if end is None else int(np.searchsorted(starts, end, side="left"))
+        return lo, max(lo, hi)
+
+    def words(self, start: float = None, end: float = None) -> list[dict]:
+        """whisperx-style word dicts of the words starting in [start, end)"""
+        lo, hi = self.span(start, end)
+        columns = self.columns
+        offsets = columns["text_offsets"][lo:hi + 1].tolist()
+        text = columns["text"][offsets[0]:offsets[-1]].tobytes() if offsets else b""
+        base = offsets[0] if offsets else 0
+        words = []
+        for i, (word_start, word_end, speaker, score) in enumerate(zip(
+            columns["start"][lo:hi].tolist(),
+            columns["end"][lo:hi].tolist(),
+            columns["speaker"][lo:hi].tolist(),
+            columns["score"][lo:hi].tolist(),
+        )):
+            word = {
+                "word": text[offsets[i] - base:offsets[i + 1] - base].decode("utf-8"),
+                "start": round(word_start, 3),
+                "end": round(word_end, 3),
+            }
+            if score == score:
+                word["score"] = round(score, 3)
+            if speaker >= 0:
+                word["speaker"] = self.speakers[speaker]
+            words.append(word)
+        return words
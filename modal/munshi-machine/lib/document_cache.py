@@ -0,0 +1,146 @@
+"""
+In-process cache of transcript documents for the web container.
+
+Entries are keyed by vid and validated against JobStore.version() (two
+directory stats) on every hit, so a repeat read of an unchanged transcript
+costs no file reads, no JSON parsing and no re-serialization of the
+response body. The body is kept serialized and gzip-compressed, ready to
+send with Content-Encoding: gzip. Least-recently-used entries are evicted
+past a memory cap.
+"""
+
+import gzip
+import json
+import os
+import time
+from collections import OrderedDict
+
+from .. import config
+from .job_store import JobStore
+from .utils import output_handler
+
+logger = config.get_logger("DOCUMENT_CACHE")
+
+DOCUMENT_CACHE_MAX_BYTES = int(os.environ.get("DOCUMENT_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+# Every entry is re-read at least this often, whatever its version says
+DOCUMENT_CACHE_TTL = 300
+# Jobs still running are written often; directory mtimes can be coarse on
+# network filesystems, so their entries also expire quickly
+IN_PROGRESS_TTL = 2
+
+
+GZIP_LEVEL = 6
+
+
+class CachedDocument:
+    """A /fetch_data response body, serialized and compressed once per version"""
+
+    __slots__ = ("status", "version", "body", "gzip_body", "loaded_at")
+
+    def __init__(self, document: dict, version):
+        self.status = document.get("status")
+        self.version = version
+        self.body = json.dumps(
+            document, ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+        self.gzip_body = gzip.compress(self.body, compresslevel=GZIP_LEVEL, mtime=0)
+        self.loaded_at = time.monotonic()
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + len(self.gzip_body)
+
+    def encoded(self, accept_encoding: str = None) -> tuple[bytes, str]:
+        """(body, content encoding or None) for a request's Accept-Encoding"""
+        if accept_encoding and _accepts_gzip(accept_encoding):
+            return self.gzip_body, "gzip"
+        return self.body, None
+
+    def is_expired(self, now: float) -> bool:
+        ttl = DOCUMENT_CACHE_TTL if self.status == "Completed" else IN_PROGRESS_TTL
+        return now - self.loaded_at > ttl
+
+
+def _accepts_gzip(accept_encoding: str) -> bool:
+    for coding in accept_encoding.split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip().lower() not in ("gzip", "*"):
+            continue
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                return float(quality[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+class DocumentCache:
+    """Bounded LRU of {status, data, metadata} response bodies"""
+
+    def __init__(self, max_bytes: int = DOCUMENT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries: OrderedDict[str, CachedDocument] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def get(self, vid: str) -> CachedDocument:
+        store = JobStore(vid)
+        version = store.version()
+        entry = self._entries.get(vid)
+
+        if entry is not None:
+            if entry.version == version and not entry.is_expired(time.monotonic()):
+                self._entries.move_to_end(vid)
+                self.hits += 1
+                return entry
+            self.invalidations += 1
+            self._remove(vid)
+
+        self.misses += 1
+        entry = self._load(vid, store, version)
+        self._insert(vid, entry)
+        return entry
+
+    def _load(self, vid: str, store: JobStore, version) -> CachedDocument:
+        oh = output_handler(vid)
+        document = {"status": oh.status, "data": oh.data, "metadata": oh.get_metadata()}
+        return CachedDocument(document, version)
+
+    def _insert(self, vid: str, entry: CachedDocument):
+        if entry.version is None or entry.size > self.max_bytes:
+            # missing jobs are not cached; oversized ones are served uncached
+            return
+        self._entries[vid] = entry
+        self.total_bytes += entry.size
+        while self.total_bytes > self.max_bytes:
+            evicted_vid, evicted = self._entries.popitem(last=False)
+            self.total_bytes -= evicted.size
+            self.evictions += 1
+            logger.info(f"Evicted {evicted_vid} from document cache")
+
+    def _remove(self, vid: str):
+        entry = self._entries.pop(vid, None)
+        if entry is not None:
+            self.total_bytes -= entry.size
+
+    def invalidate(self, vid: str):
+        """Drop a job after this container wrote to it"""
+        self._remove(vid)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions,
+        }
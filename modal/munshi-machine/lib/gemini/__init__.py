@@ -4,6 +4,7 @@ Gemini AI Module for Transcript Processing and Summarization
 
 from .processor import (
     GeminiProcessor,
+    StreamingTranscriptCleaner,
     get_cleaned_transcript,
     get_cleaned_speaker_transcript,
     processor
@@ -12,6 +13,7 @@ from .processor import (
 from .prompts import (
     clean_transcript_prompt,
     clean_speaker_transcript_prompt,
+    speaker_identification_prompt,
     batch_combine_prompt
 )
 
@@ -19,12 +21,17 @@ from .config import (
     GEMINI_MODELS,
     GENERATION_CONFIGS,
     TOKEN_LIMITS,
-    ERROR_HANDLING
+    ERROR_HANDLING,
+    MAX_CONCURRENT_REQUESTS,
+    RATE_LIMITS
 )
 
+from .rate_limiter import get_rate_limiter
+
 __all__ = [
     # Processor
     "GeminiProcessor",
+    "StreamingTranscriptCleaner",
     "processor",
     "get_cleaned_transcript", 
     "get_cleaned_speaker_transcript",
@@ -32,11 +39,17 @@ __all__ = [
     # Prompts
     "clean_transcript_prompt",
     "clean_speaker_transcript_prompt", 
+    "speaker_identification_prompt",
     "batch_combine_prompt",
     
     # Config
     "GEMINI_MODELS",
     "GENERATION_CONFIGS", 
     "TOKEN_LIMITS",
-    "ERROR_HANDLING"
+    "ERROR_HANDLING",
+    "MAX_CONCURRENT_REQUESTS",
+    "RATE_LIMITS",
+
+    # Rate limiting
+    "get_rate_limiter"
 ] 
\ No newline at end of file
@@ -0,0 +1,209 @@
+"""
+Content-addressed, size-bounded on-disk cache for Gemini responses
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import pathlib
+import threading
+import time
+from typing import Any
+
+from ...config import GEMINI_CACHE_DIR
+from ...volumes import transcriptions_vol
+from .config import GEMINI_MODELS, GENERATION_CONFIGS, RESPONSE_CACHE
+
+CACHE_MISS = object()
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _config_fingerprint(config: dict) -> str:
+    """Stable representation of a generation config (schemas, SDK types)"""
+
+    def normalize(value):
+        if isinstance(value, type) and hasattr(value, "model_json_schema"):
+            return {value.__name__: value.model_json_schema()}
+        if hasattr(value, "model_dump"):
+            return value.model_dump(mode="json", exclude_none=True)
+        return value
+
+    return json.dumps(
+        {key: normalize(value) for key, value in config.items()},
+        sort_keys=True,
+        default=str,
+    )
+
+
+class ResponseCache:
+    """
+    Stores one JSON file per response under `cache_dir/<key[:2]>/<key>.json`.
+    File mtimes are bumped on every hit, and the least recently used entries
+    are evicted once the total size exceeds `max_bytes`.
+
+    `aget`/`aput` do the file work on a worker thread, so cache traffic on
+    the volume never stalls the event loop, and commit `volume` after writes
+    so other containers see new entries.
+    """
+
+    def __init__(self, cache_dir: pathlib.Path, max_bytes: int, enabled: bool = True, volume=None):
+        self.cache_dir = pathlib.Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.volume = volume
+        self.commits = 0
+        self._uncommitted = False
+        self._committing = False
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._total_bytes = None
+        self._lock = threading.Lock()
+
+    def make_key(self, task_type: str, prompt: str, content: str) -> str:
+        return _sha256(json.dumps({
+            "model": GEMINI_MODELS[task_type],
+            "prompt": _sha256(prompt),
+            "config": _sha256(_config_fingerprint(GENERATION_CONFIGS[task_type])),
+            "content": _sha256(content),
+        }, sort_keys=True))
+
+    def _path(self, key: str) -> pathlib.Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str, task_type: str) -> Any:
+        """Return the cached response, or `CACHE_MISS`"""
+        if not self.enabled:
+            return CACHE_MISS
+
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as cache_file:
+                entry = json.load(cache_file)
+            os.utime(path)
+        except (OSError, json.JSONDecodeError):
+            self.misses += 1
+            return CACHE_MISS
+
+        self.hits += 1
+        if entry.get("kind") == "parsed":
+            schema = GENERATION_CONFIGS[task_type]["response_schema"]
+            return schema.model_validate(entry["value"])
+        return entry["value"]
+
+    async def aget(self, key: str, task_type: str) -> Any:
+        if not self.enabled:
+            return CACHE_MISS
+        return await asyncio.to_thread(self.get, key, task_type)
+
+    async def aput(self, key: str, value: Any):
+        if not self.enabled:
+            return
+        if await asyncio.to_thread(self.put, key, value):
+            await self.commit()
+
+    async def commit(self):
+        """
+        Commit the volume holding the cache. Writes landing while a commit
+        runs are picked up by one follow-up commit instead of one each.
+        """
+        if self.volume is None:
+            return
+        self._uncommitted = True
+        if self._committing:
+            return
+        self._committing = True
+        try:
+            while self._uncommitted:
+                self._uncommitted = False
+                await self.volume.commit.aio()
+                self.commits += 1
+        except Exception as e:
+            print(f"[GEMINI WARN] {time.strftime('%H:%M:%S')} - Response cache commit failed: {e}")
+        finally:
+            self._committing = False
+
+    def put(self, key: str, value: Any) -> bool:
+        """Store a response; False if nothing was written"""
+        if not self.enabled:
+            return False
+
+        if hasattr(value, "model_dump"):
+            entry = {"kind": "parsed", "value": value.model_dump(mode="json")}
+        else:
+            entry = {"kind": "text", "value": value}
+
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as cache_file:
+                json.dump(entry, cache_file, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, path)
+            size = path.stat().st_size
+        except OSError as e:
+            print(f"[GEMINI WARN] {time.strftime('%H:%M:%S')} - Response cache write failed: {e}")
+            return False
+
+        with self._lock:
+            self.writes += 1
+            if self._total_bytes is None:
+                self._total_bytes = sum(p.stat().st_size for p in self._entries())
+            else:
+                self._total_bytes += size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+        return True
+
+    def _entries(self) -> list[pathlib.Path]:
+        if not self.cache_dir.exists():
+            return []
+        return list(self.cache_dir.glob("*/*.json"))
+
+    def _evict(self):
+        """Drop least recently used entries until 90% of the size budget"""
+        entries = []
+        for path in self._entries():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            self.evictions += 1
+        self._total_bytes = total
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "commits": self.commits,
+        }
+
+
+response_cache = ResponseCache(
+    GEMINI_CACHE_DIR,
+    max_bytes=RESPONSE_CACHE["max_bytes"],
+    enabled=RESPONSE_CACHE["enabled"],
+    volume=transcriptions_vol,
+)
@@ -0,0 +1,130 @@
+"""
+Single-pass, token-aware transcript chunking
+"""
+
+import functools
+import re
+from bisect import bisect_right
+from itertools import accumulate
+from typing import NamedTuple
+
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+")
+
+
+class TextChunk(NamedTuple):
+    text: str
+    tokens: int
+
+
+@functools.lru_cache(maxsize=1)
+def get_encoding():
+    """Module-level cached tokenizer (loading the BPE ranks is expensive)"""
+    import tiktoken
+    return tiktoken.get_encoding("cl100k_base")
+
+
+@functools.lru_cache(maxsize=1)
+def _token_byte_lengths() -> list[int]:
+    """Byte length of every token id, so offsets can be summed without decoding"""
+    encoding = get_encoding()
+    lengths = []
+    for token in range(encoding.n_vocab):
+        try:
+            lengths.append(len(encoding.decode_single_token_bytes(token)))
+        except KeyError:
+            lengths.append(0)
+    return lengths
+
+
+def encode(text: str) -> list[int]:
+    # encode_ordinary skips the special-token scan and never raises on
+    # transcripts that happen to contain "<|endoftext|>"-like text
+    return get_encoding().encode_ordinary(text)
+
+
+def count_tokens(text: str) -> int:
+    return len(encode(text))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    tokens = encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return get_encoding().decode(tokens[:max_tokens])
+
+
+def _sentence_spans(text: str) -> list[tuple[int, int]]:
+    """(start, end) character spans matching re.split(r'(?<=[.!?])\\s+', text)"""
+    spans = []
+    start = 0
+    for match in _SENTENCE_BREAK.finditer(text):
+        spans.append((start, match.start()))
+        start = match.end()
+    spans.append((start, len(text)))
+    return spans
+
+
+def chunk_text(text: str, max_tokens: int, tokens: list[int] = None) -> list[TextChunk]:
+    """
+    Pack whole sentences into chunks of at most `max_tokens`.
+
+    The text is encoded once; token offsets are mapped back to sentence
+    boundaries, so each sentence's token count is a slice length rather than
+    a separate encode call. Sentences longer than `max_tokens` are split on
+    token boundaries.
+    """
+    encoding = get_encoding()
+    if tokens is None:
+        tokens = encoding.encode_ordinary(text)
+
+    # byte offset where each token ends
+    token_ends = list(accumulate(map(_token_byte_lengths().__getitem__, tokens)))
+
+    spans = _sentence_spans(text)
+    if text.isascii():
+        sentence_starts = [start for start, _ in spans]
+    else:
+        sentence_starts = []
+        byte_pos, prev = 0, 0
+        for start, _ in spans:
+            byte_pos += len(text[prev:start].encode("utf-8"))
+            prev = start
+            sentence_starts.append(byte_pos)
+
+    # first token of each sentence; a token straddling a sentence start (the
+    # BPE merges leading whitespace into the next word) counts for the new sentence
+    boundaries = [bisect_right(token_ends, start) for start in sentence_starts] + [len(tokens)]
+
+    chunks = []
+    current = []
+    current_tokens = 0
+
+    def flush():
+        nonlocal current, current_tokens
+        if current:
+            chunk = " ".join(current).strip()
+            if chunk:
+                chunks.append(TextChunk(chunk, current_tokens))
+        current = []
+        current_tokens = 0
+
+    for i, (start, end) in enumerate(spans):
+        sentence = text[start:end]
+        sentence_tokens = boundaries[i + 1] - boundaries[i]
+
+        # Handle sentences longer than max_tokens
+        if sentence_tokens > max_tokens:
+            flush()
+            sentence_ids = tokens[boundaries[i]:boundaries[i + 1]]
+            for j in range(0, len(sentence_ids), max_tokens):
+                piece = sentence_ids[j:j + max_tokens]
+                chunks.append(TextChunk(encoding.decode(piece), len(piece)))
+            continue
+
+        if current_tokens + sentence_tokens > max_tokens:
+            flush()
+        current.append(sentence)
+        current_tokens += sentence_tokens
+
+    flush()
+    return chunks
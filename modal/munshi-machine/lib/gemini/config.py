@@ -1,5 +1,7 @@
 # Gemini AI Configuration
-from .models import GeminiResponse, GeminiSpeakerResponse
+import os
+
+from .models import GeminiResponse, GeminiSpeakerResponse, GeminiSpeakerMapping
 from google.genai import types
 
 # Model configurations
@@ -7,6 +9,7 @@ GEMINI_MODELS = {
     "summary": "gemini-2.5-pro",
     "cleaning_normal": "gemini-2.5-flash",
     "cleaning_speaker": "gemini-2.5-flash",
+    "speaker_identification": "gemini-2.5-flash",
 }
 
 # Generation configurations for different tasks
@@ -32,6 +35,14 @@ GENERATION_CONFIGS = {
         "response_schema": GeminiSpeakerResponse,
         "thinking_config": types.ThinkingConfig(thinking_budget=0)
     },
+    "speaker_identification": {
+        "temperature": 0.2,
+        "max_output_tokens": 4000,
+        "top_p": 0.8,
+        "response_mime_type": "application/json",
+        "response_schema": GeminiSpeakerMapping,
+        "thinking_config": types.ThinkingConfig(thinking_budget=0)
+    },
 }
 
 # Request timeouts (in seconds)
@@ -39,15 +50,39 @@ REQUEST_TIMEOUTS = {
     "summary": 600,
     "cleaning_normal": 600,
     "cleaning_speaker": 600,
+    "speaker_identification": 300,
+}
+
+# Maximum number of Gemini requests in flight per process
+MAX_CONCURRENT_REQUESTS = int(os.environ.get("GEMINI_MAX_CONCURRENT_REQUESTS", 8))
+
+# Per-model quota, shared by every request in the process
+# rpm: requests per minute, tpm: input tokens per minute
+RATE_LIMITS = {
+    "gemini-2.5-pro": {"rpm": 150, "tpm": 2_000_000},
+    "gemini-2.5-flash": {"rpm": 1000, "tpm": 1_000_000},
+}
+DEFAULT_RATE_LIMIT = {"rpm": 60, "tpm": 250_000}
+
+# On-disk response cache (LRU-evicted once it grows past max_bytes)
+RESPONSE_CACHE = {
+    "enabled": os.environ.get("GEMINI_RESPONSE_CACHE", "1") != "0",
+    "max_bytes": 512 * 1024 * 1024,
 }
 
 # Token limits for chunking
 TOKEN_LIMITS = {
     "cleaning_normal": 60000,
     "cleaning_speaker": 60000,
+    "speaker_identification": 12000,  # Budget for the sampled speaker turns
     "summary": 800000,
 }
 
+# Speaker transcript cleaning strategy
+# "parallel": identify speakers once from a sample, then clean all chunks concurrently
+# "sequential": clean chunks one after another
+SPEAKER_CLEANING_MODE = os.environ.get("SPEAKER_CLEANING_MODE", "parallel")
+
 # Quality thresholds
 QUALITY_THRESHOLDS = {
     "min_transcript_length": 100,  # Minimum characters for processing
@@ -59,7 +94,7 @@ QUALITY_THRESHOLDS = {
 ERROR_HANDLING = {
     "max_retries": 5,
     "backoff_multiplier": 2,
-    "initial_delay": 30,  # Start with 30 seconds for rate limit errors
-    "rate_limit_delay": 60,  # Wait 60 seconds for 429 errors
+    "initial_delay": 2,  # Exponential backoff base for transient errors
+    "rate_limit_delay": 15,  # 429 pause when the server sends no retry hint
     "log_errors": True,
 } 
\ No newline at end of file
@@ -9,3 +9,6 @@ class GeminiSpeakerResponse(BaseModel):
     speaker_ids: list[str]
     speaker_names: list[str]
 
+class GeminiSpeakerMapping(BaseModel):
+    speaker_ids: list[str]
+    speaker_names: list[str]
@@ -8,12 +8,18 @@ from google import genai
 import os
 import asyncio
 import time
+import weakref
 from typing import Dict, Any
 
 from .config import (
     GEMINI_MODELS, GENERATION_CONFIGS,
-    TOKEN_LIMITS, ERROR_HANDLING
+    TOKEN_LIMITS, ERROR_HANDLING,
+    MAX_CONCURRENT_REQUESTS, SPEAKER_CLEANING_MODE
 )
+from .rate_limiter import get_rate_limiter, estimate_tokens, parse_retry_delay
+from .cache import response_cache, CACHE_MISS
+from .chunking import TextChunk, chunk_text, count_tokens, encode, truncate_tokens
+from ..progress import report_progress, with_progress
 
 def log_gemini(message: str, level: str = "INFO"):
     """Enhanced logging for Gemini operations"""
@@ -23,10 +29,40 @@ def log_gemini(message: str, level: str = "INFO"):
 class GeminiProcessor:
     """Enhanced Gemini processor for transcripts and summaries"""
     
-    def __init__(self):
-        self.client = genai.Client(api_key=os.environ["GEMINI_API_KEY"])
-    
-    
+    def __init__(self, client=None, max_concurrency: int = None):
+        self.client = client or genai.Client(api_key=os.environ["GEMINI_API_KEY"])
+        self.max_concurrency = max_concurrency or MAX_CONCURRENT_REQUESTS
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """
+        Concurrency limiter for the running event loop (the processor is a
+        module-level singleton, so one semaphore is kept per loop)
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphores[loop] = semaphore
+        return semaphore
+
+    async def _generate_content(self, task_type: str, prompt: str, content: str):
+        """
+        Non-blocking Gemini request through the async client, bounded by the
+        model's rate budget and the per-process concurrency limit
+        """
+        limiter = get_rate_limiter(GEMINI_MODELS[task_type])
+        waited = await limiter.acquire(estimate_tokens(prompt, content))
+        if waited > 0:
+            log_gemini(f"⏳ Rate budget for {GEMINI_MODELS[task_type]}: waited {waited:.1f}s")
+
+        async with self._get_semaphore():
+            return await self.client.aio.models.generate_content(
+                model=GEMINI_MODELS[task_type],
+                contents=[prompt, content],
+                config=GENERATION_CONFIGS[task_type]
+            )
+
     async def ask_gemini_with_retry(
         self, 
         prompt: str, 
@@ -38,6 +74,12 @@ class GeminiProcessor:
         Enhanced Gemini API call with structured output support
         """
         max_retries = max_retries or ERROR_HANDLING["max_retries"]
+
+        cache_key = response_cache.make_key(task_type, prompt, content)
+        cached = await response_cache.aget(cache_key, task_type)
+        if cached is not CACHE_MISS:
+            log_gemini(f"💾 Cache hit for {task_type} - {response_cache.stats()}")
+            return cached
         
         log_gemini(f"🚀 Starting Gemini request - task_type: {task_type}, content_length: {len(content)}")
         log_gemini(f"📋 Using model: {GEMINI_MODELS[task_type]}, max_retries: {max_retries}")
@@ -46,21 +88,17 @@ class GeminiProcessor:
             try:
                 log_gemini(f"🔄 Attempt {attempt + 1}/{max_retries} for {task_type}")
                 
-                response = self.client.models.generate_content(
-                    model=GEMINI_MODELS[task_type],
-                    contents=[prompt, content],
-                    config=GENERATION_CONFIGS[task_type]
-                )
+                response = await self._generate_content(task_type, prompt, content)
                 
                 # Return structured data for cleaning tasks, text for summaries
-                if task_type.startswith("cleaning"):
+                if "response_schema" in GENERATION_CONFIGS[task_type]:
                     
                     if not response.parsed:
                         log_gemini(f"⚠️ No parsed data in response for {task_type} (attempt {attempt + 1})", "WARN")
                         log_gemini(f"TextualResponse: {response.text}", "WARN")
                         # This is a parsing failure, not a network error - continue to next attempt
                         if attempt < max_retries - 1:
-                            wait_time = ERROR_HANDLING["initial_delay"] + (ERROR_HANDLING["backoff_multiplier"] ** attempt)
+                            wait_time = self._backoff_delay(attempt)
                             log_gemini(f"🕐 Parsing error, waiting {wait_time}s before retry", "WARN")
                             await asyncio.sleep(wait_time)
                             continue
@@ -68,9 +106,12 @@ class GeminiProcessor:
                             log_gemini(f"💥 All retries exhausted for {task_type} - parsing failed", "ERROR")
                             raise Exception(f"Failed to get structured response after {max_retries} attempts")
                     
+                    await response_cache.aput(cache_key, response.parsed)
                     return response.parsed
                 else:
                     log_gemini(f"📝 Returning text response for {task_type}")
+                    if response.text:
+                        await response_cache.aput(cache_key, response.text)
                     return response.text
                 
             except Exception as e:
@@ -80,29 +121,35 @@ class GeminiProcessor:
                 if attempt < max_retries - 1:
                     # Determine wait time based on error type
                     if "429" in error_str or "quota" in error_str.lower() or "rate" in error_str.lower():
-                        wait_time = ERROR_HANDLING["rate_limit_delay"]
-                        log_gemini(f"🕐 Rate limit detected, waiting {wait_time}s before retry", "WARN")
+                        # Honor the server retry hint and pause every caller of this model
+                        wait_time = parse_retry_delay(e) or ERROR_HANDLING["rate_limit_delay"]
+                        get_rate_limiter(GEMINI_MODELS[task_type]).penalize(wait_time)
+                        log_gemini(f"🕐 Rate limit detected, model paused for {wait_time}s", "WARN")
+                        continue
                     elif "timeout" in error_str.lower() or "deadline" in error_str.lower():
-                        wait_time = ERROR_HANDLING["initial_delay"] * 2  # Longer wait for timeouts
+                        wait_time = self._backoff_delay(attempt + 1)  # Longer wait for timeouts
                         log_gemini(f"🕐 Timeout detected, waiting {wait_time}s before retry", "WARN")
                     else:
                         # Exponential backoff for other errors
-                        wait_time = ERROR_HANDLING["initial_delay"] + (ERROR_HANDLING["backoff_multiplier"] ** attempt)
+                        wait_time = self._backoff_delay(attempt)
                         log_gemini(f"🕐 General error, exponential backoff: {wait_time}s", "WARN")
                     
                     await asyncio.sleep(wait_time)
                 else:
                     log_gemini(f"💥 All retries exhausted for {task_type}", "ERROR")
                     raise e
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """Exponential backoff delay for transient (non-quota) failures"""
+        return ERROR_HANDLING["initial_delay"] * (ERROR_HANDLING["backoff_multiplier"] ** attempt)
     
-    def _needs_batch_processing(self, text: str) -> bool:
+    def _needs_batch_processing(self, text: str, token_count: int = None) -> bool:
         """
         Check if transcript needs batch processing based on token count
         """
         try:
-            import tiktoken
-            encoding = tiktoken.get_encoding("cl100k_base")
-            token_count = len(encoding.encode(text))
+            if token_count is None:
+                token_count = count_tokens(text)
             threshold = TOKEN_LIMITS["summary"] * 0.8
             needs_batch = token_count > threshold
             
@@ -116,7 +163,7 @@ class GeminiProcessor:
             log_gemini(f"📊 Character analysis - count: {len(text)}, limit: {char_limit}, needs_batch: {needs_batch}")
             return needs_batch
     
-    async def _generate_batch_summary(self, transcript: str) -> str:
+    async def _generate_batch_summary(self, transcript: str, tokens: list[int] = None) -> str:
         """
         Generate summary using batch processing for large transcripts
         """
@@ -125,40 +172,37 @@ class GeminiProcessor:
         from .prompts import comprehensive_summary_prompt
         
         # Split transcript into manageable chunks
-        chunks = self._smart_chunk_text(transcript, TOKEN_LIMITS["summary"])
+        chunks = self._smart_chunk_text(transcript, TOKEN_LIMITS["summary"], tokens=tokens)
         total_chunks = len(chunks)
         
         log_gemini(f"📦 Processing {total_chunks} batches")
         
-        # Generate summaries for each batch with sequential processing to avoid rate limits
-        batch_summaries = []
-        
-        for i, chunk in enumerate(chunks):
+        # Map: summarize every batch concurrently; pacing comes from the shared
+        # rate limiter and the per-process concurrency limit
+        async def summarize_batch(i: int, chunk: TextChunk) -> str:
             log_gemini(f"🔄 Processing batch {i+1}/{total_chunks}")
-            
             try:
                 batch_summary = await self.ask_gemini_with_retry(
                     comprehensive_summary_prompt,
-                    chunk,
+                    chunk.text,
                     task_type="summary"
                 )
-                batch_summaries.append(batch_summary)
                 log_gemini(f"✅ Batch {i+1} completed")
-                
-                # Add delay between batch requests to respect rate limits
-                if i < len(chunks) - 1:  # Don't wait after the last batch
-                    await asyncio.sleep(2)  # 2 second delay between batches
-                    
+                return batch_summary
             except Exception as e:
                 log_gemini(f"❌ Batch {i+1} failed: {str(e)}", "ERROR")
-                batch_summaries.append(f"[Error processing section {i+1}: {str(e)}]")
+                return f"[Error processing section {i+1}: {str(e)}]"
+
+        batch_summaries = list(await asyncio.gather(*with_progress("summarizing", [
+            summarize_batch(i, chunk) for i, chunk in enumerate(chunks)
+        ])))
         
         log_gemini(f"📊 Batch processing complete - {len(batch_summaries)} summaries generated")
         
-        # Combine batch summaries into final comprehensive summary
+        # Reduce: combine batch summaries into final comprehensive summary
         if len(batch_summaries) > 1:
             log_gemini(f"🔄 Combining {len(batch_summaries)} batch summaries")
-            final_summary = await self._combine_batch_summaries(batch_summaries)
+            final_summary = await self._reduce_batch_summaries(batch_summaries)
         else:
             log_gemini(f"📝 Single batch summary, using directly")
             final_summary = batch_summaries[0] if batch_summaries else "Error: No summaries generated"
@@ -166,6 +210,67 @@ class GeminiProcessor:
         log_gemini(f"✅ Final batch summary generated: {len(final_summary)} chars")
         return final_summary
 
+    async def _reduce_batch_summaries(self, batch_summaries: list[str]) -> str:
+        """
+        Tree reduce: merge section summaries in groups that fit the summary
+        token limit, concurrently per level, until a single summary remains
+        """
+        from .prompts import batch_combine_prompt
+
+        # Room for the section summaries once the prompt and separators are in
+        budget = TOKEN_LIMITS["summary"] - count_tokens(batch_combine_prompt) - 1000
+
+        level = 0
+        summaries = batch_summaries
+        while len(summaries) > 1:
+            level += 1
+            groups = self._group_summaries(summaries, budget)
+            log_gemini(f"🌲 Reduce level {level}: {len(summaries)} summaries → {len(groups)} groups")
+            summaries = list(await asyncio.gather(*[
+                self._combine_batch_summaries(group) if len(group) > 1 else asyncio.sleep(0, group[0])
+                for group in groups
+            ]))
+
+        return summaries[0]
+
+    def _group_summaries(self, summaries: list[str], budget: int) -> list[list[str]]:
+        """
+        Greedily pack consecutive summaries into groups of at most `budget`
+        tokens. Every group has at least two members (truncating oversized
+        ones), so each reduce level strictly shrinks the list.
+        """
+        sized = [TextChunk(summary, count_tokens(summary)) for summary in summaries]
+
+        groups = []
+        current = []
+        current_tokens = 0
+        for summary in sized:
+            if current and current_tokens + summary.tokens > budget and len(current) > 1:
+                groups.append(current)
+                current, current_tokens = [], 0
+            current.append(summary)
+            current_tokens += summary.tokens
+
+        if current:
+            if len(current) == 1 and groups:
+                groups[-1].append(current[0])
+            else:
+                groups.append(current)
+
+        packed = []
+        for group in groups:
+            total = sum(summary.tokens for summary in group)
+            if total > budget:
+                share = budget // len(group)
+                log_gemini(f"✂️ Group of {len(group)} summaries is {total} tokens > {budget}, truncating each to {share}", "WARN")
+                packed.append([
+                    truncate_tokens(summary.text, share) if summary.tokens > share else summary.text
+                    for summary in group
+                ])
+            else:
+                packed.append([summary.text for summary in group])
+        return packed
+
     async def _combine_batch_summaries(self, batch_summaries: list[str]) -> str:
         """
         Combine multiple batch summaries into a comprehensive final summary
@@ -211,15 +316,15 @@ class GeminiProcessor:
         log_gemini(f"📦 Created {len(chunks)} chunks for cleaning")
         
         # Process chunks in parallel with error handling
-        log_gemini(f"🚀 Starting parallel processing of {len(chunks)} chunks")
-        tasks = [
+        log_gemini(f"🚀 Starting parallel processing of {len(chunks)} chunks (max {self.max_concurrency} in flight)")
+        tasks = with_progress("cleaning", [
             self.ask_gemini_with_retry(
                 clean_transcript_prompt, 
-                chunk, 
+                chunk.text, 
                 task_type="cleaning_normal"
             ) 
             for chunk in chunks
-        ]
+        ])
         
         try:
             results = await asyncio.gather(*tasks, return_exceptions=True)
@@ -232,7 +337,7 @@ class GeminiProcessor:
                 if isinstance(result, Exception):
                     log_gemini(f"❌ Chunk {i+1} processing failed: {str(result)}", "ERROR")
                     # Use original chunk as fallback
-                    cleaned_chunks.append(chunks[i])
+                    cleaned_chunks.append(chunks[i].text)
                     continue
                 
                 # Always expect a list for cleaned_text
@@ -261,8 +366,6 @@ class GeminiProcessor:
         start_time = time.time()
         log_gemini(f"👥 Starting speaker transcript cleaning - input length: {len(speaker_transcript)} chars")
         
-        from .prompts import clean_speaker_transcript_prompt
-        
         # Check transcript length
         if len(speaker_transcript) < 100:
             log_gemini(f"📏 Speaker transcript too short ({len(speaker_transcript)} chars), returning as-is")
@@ -275,17 +378,42 @@ class GeminiProcessor:
         chunks = self._smart_chunk_text(speaker_transcript, chunk_limit)
         log_gemini(f"📦 Created {len(chunks)} speaker chunks")
         
-        # Process chunks sequentially to maintain speaker context
+        if SPEAKER_CLEANING_MODE == "parallel" and len(chunks) > 1:
+            cleaned_chunks, all_speaker_mappings = await self._clean_speaker_chunks_parallel(speaker_transcript, chunks)
+        else:
+            cleaned_chunks, all_speaker_mappings = await self._clean_speaker_chunks_sequential(chunks)
+        
+        log_gemini(f"🔄 Merging {len(cleaned_chunks)} speaker chunks")
+        final_transcript = self._merge_cleaned_chunks(cleaned_chunks)
+        
+        total_time = time.time() - start_time
+        log_gemini(f"✅ Speaker cleaning completed in {total_time:.1f}s ({len(chunks)} chunks)")
+        log_gemini(f"📊 Final transcript: {len(final_transcript)} chars")
+        log_gemini(f"👥 Total speaker mappings: {len(all_speaker_mappings)}")
+        log_gemini(f"🎭 Speaker mappings: {all_speaker_mappings}")
+        
+        return {
+            "cleaned_transcript": final_transcript,
+            "speaker_mappings": all_speaker_mappings
+        }
+
+    async def _clean_speaker_chunks_sequential(self, chunks: list[TextChunk]) -> tuple[list[str], Dict[str, str]]:
+        """
+        Clean speaker chunks one after another
+        """
+        from .prompts import clean_speaker_transcript_prompt
+
         cleaned_chunks = []
         all_speaker_mappings = {}
         
         for i, chunk in enumerate(chunks):
             log_gemini(f"🔄 Processing speaker chunk {i+1}/{len(chunks)}")
+            report_progress("speaker_cleaning", i, len(chunks))
             
             try:
                 response = await self.ask_gemini_with_retry(
                     clean_speaker_transcript_prompt,
-                    chunk,
+                    chunk.text,
                     task_type="cleaning_speaker",
                     max_retries=3
                 )
@@ -296,92 +424,183 @@ class GeminiProcessor:
                 cleaned_chunks.append(cleaned_text)
                 
                 # Convert speaker mappings from array to dict
-                if hasattr(response, 'speaker_ids') and hasattr(response, 'speaker_names'):
-
-                    if len(response.speaker_ids) != len(response.speaker_names):
-                        log_gemini(f"⚠️ Speaker IDs and names mismatch: {len(response.speaker_ids)} != {len(response.speaker_names)}", "WARN")
-                        continue
-
-                    log_gemini(f"👥 Processing {len(response.speaker_ids)} speaker mappings")
-                    for j in range(len(response.speaker_ids)):
-                        speaker_id = response.speaker_ids[j]
-                        speaker_name = response.speaker_names[j]
-                        all_speaker_mappings[speaker_id] = speaker_name
-                        log_gemini(f"👤 Mapped: {speaker_id} → {speaker_name}")
-                else:
-                    log_gemini(f"⚠️ No speaker mappings in response", "WARN")
-                
-                # Small delay between chunks to avoid rate limits
-                if i < len(chunks) - 1:
-                    await asyncio.sleep(1)
+                for speaker_id, speaker_name in self._response_speaker_mappings(response).items():
+                    all_speaker_mappings[speaker_id] = speaker_name
+                    log_gemini(f"👤 Mapped: {speaker_id} → {speaker_name}")
                     
             except Exception as e:
                 log_gemini(f"❌ Speaker chunk {i+1} failed: {str(e)}", "ERROR")
                 raise e
-        
-        log_gemini(f"🔄 Merging {len(cleaned_chunks)} speaker chunks")
-        final_transcript = self._merge_cleaned_chunks(cleaned_chunks)
-        
-        total_time = time.time() - start_time
-        log_gemini(f"✅ Speaker cleaning completed in {total_time:.1f}s")
-        log_gemini(f"📊 Final transcript: {len(final_transcript)} chars")
-        log_gemini(f"👥 Total speaker mappings: {len(all_speaker_mappings)}")
-        log_gemini(f"🎭 Speaker mappings: {all_speaker_mappings}")
-        
-        return {
-            "cleaned_transcript": final_transcript,
-            "speaker_mappings": all_speaker_mappings
-        }
 
-    def _smart_chunk_text(self, text: str, max_tokens: int) -> list[str]:
+        report_progress("speaker_cleaning", len(chunks), len(chunks))
+        return cleaned_chunks, all_speaker_mappings
+
+    async def _clean_speaker_chunks_parallel(
+        self, speaker_transcript: str, chunks: list[TextChunk]
+    ) -> tuple[list[str], Dict[str, str]]:
         """
-        Intelligent text chunking that preserves sentence boundaries and context
+        Two-phase speaker cleaning: identify speakers once from a sample of
+        turns, clean every chunk concurrently with that mapping pinned in the
+        prompt, then reconcile the per-chunk mappings by vote
         """
-        import tiktoken
-        import re
-        
-        encoding = tiktoken.get_encoding("cl100k_base")
-        sentences = re.split(r'(?<=[.!?])\s+', text)
-        
-        chunks = []
-        current_chunk = ""
-        current_tokens = 0
-        
-        for i, sentence in enumerate(sentences):
-            sentence_tokens = len(encoding.encode(sentence))
-            
-            # Handle sentences longer than max_tokens
-            if sentence_tokens > max_tokens:
-                log_gemini(f"⚠️ Long sentence {i+1}: {sentence_tokens} tokens > {max_tokens}, splitting", "WARN")
-                
-                if current_chunk:
-                    chunks.append(current_chunk.strip())
-                    current_chunk = ""
-                    current_tokens = 0
-                
-                # Split long sentence by tokens
-                tokens = encoding.encode(sentence)
-                for j in range(0, len(tokens), max_tokens):
-                    chunk_tokens = tokens[j:j + max_tokens]
-                    token_chunk = encoding.decode(chunk_tokens)
-                    chunks.append(token_chunk)
+        from .prompts import clean_speaker_transcript_prompt, speaker_mapping_context
+
+        # Phase 1: speaker identification from a compact sample of turns
+        identified = await self._identify_speakers(speaker_transcript)
+
+        prompt = clean_speaker_transcript_prompt
+        if identified:
+            prompt = speaker_mapping_context(identified) + clean_speaker_transcript_prompt
+
+        # Phase 2: concurrent cleaning
+        log_gemini(f"🚀 Cleaning {len(chunks)} speaker chunks concurrently (max {self.max_concurrency} in flight)")
+        results = await asyncio.gather(*with_progress("speaker_cleaning", [
+            self.ask_gemini_with_retry(
+                prompt,
+                chunk.text,
+                task_type="cleaning_speaker",
+                max_retries=3
+            )
+            for chunk in chunks
+        ]), return_exceptions=True)
+
+        cleaned_chunks = []
+        chunk_mappings = []
+        for i, result in enumerate(results):
+            if isinstance(result, Exception):
+                log_gemini(f"❌ Speaker chunk {i+1} failed: {str(result)}", "ERROR")
+                # Use original chunk as fallback
+                cleaned_chunks.append(chunks[i].text)
                 continue
-            
-            # Check if adding sentence exceeds limit
-            if current_tokens + sentence_tokens > max_tokens:
-                if current_chunk:
-                    chunks.append(current_chunk.strip())
-                current_chunk = sentence + " "
-                current_tokens = sentence_tokens
-            else:
-                current_chunk += sentence + " "
-                current_tokens += sentence_tokens
-        
-        # Add final chunk
-        if current_chunk:
-            chunks.append(current_chunk.strip())
 
-        log_gemini(f"✅ Chunking complete: {len(chunks)} chunks created")
+            cleaned_text = '\n\n'.join(result.cleaned_transcript)
+            log_gemini(f"📝 Speaker chunk {i+1} cleaned: {len(cleaned_text)} chars")
+            cleaned_chunks.append(cleaned_text)
+            chunk_mappings.append(self._response_speaker_mappings(result))
+
+        if all(isinstance(result, Exception) for result in results):
+            raise results[0]
+
+        # Phase 3: reconcile conflicting mappings
+        return cleaned_chunks, self._reconcile_speaker_mappings(identified, chunk_mappings)
+
+    async def _identify_speakers(self, speaker_transcript: str) -> Dict[str, str]:
+        """
+        Work out the speaker-ID-to-name mapping once for the whole transcript
+        """
+        from .prompts import speaker_identification_prompt
+
+        sample = self._sample_speaker_turns(speaker_transcript, TOKEN_LIMITS["speaker_identification"])
+        log_gemini(f"🔎 Identifying speakers from a {len(sample)} char sample")
+        try:
+            response = await self.ask_gemini_with_retry(
+                speaker_identification_prompt,
+                sample,
+                task_type="speaker_identification",
+                max_retries=3
+            )
+        except Exception as e:
+            log_gemini(f"⚠️ Speaker identification failed, cleaning without pinned names: {e}", "WARN")
+            return {}
+
+        mappings = self._response_speaker_mappings(response)
+        log_gemini(f"🎭 Identified speakers: {mappings}")
+        return mappings
+
+    def _sample_speaker_turns(self, speaker_transcript: str, max_tokens: int) -> str:
+        """
+        Compact sample of `SPEAKER_XX:` turns: the opening of the recording
+        (where introductions usually are) plus the first turns of every speaker
+        """
+        import re
+
+        turn_pattern = re.compile(r"^\s*([A-Z]+_\d+|UNKNOWN)\s*:\s*(.*)$")
+        turns = []
+        for line in speaker_transcript.splitlines():
+            match = turn_pattern.match(line)
+            if match and match.group(2):
+                turns.append((match.group(1), match.group(2)))
+
+        if not turns:
+            return speaker_transcript[:max_tokens * 4]
+
+        max_turn_chars = 400
+        opening_turns = 30
+        turns_per_speaker = 6
+
+        selected = set(range(min(opening_turns, len(turns))))
+        per_speaker = {}
+        for i, (speaker, _) in enumerate(turns):
+            if per_speaker.get(speaker, 0) < turns_per_speaker:
+                per_speaker[speaker] = per_speaker.get(speaker, 0) + 1
+                selected.add(i)
+
+        lines = []
+        budget = max_tokens * 4  # chars, rough 4 chars per token
+        previous = -1
+        for i in sorted(selected):
+            speaker, text = turns[i]
+            line = f"{speaker}: {text[:max_turn_chars]}"
+            if budget - len(line) < 0:
+                break
+            if previous >= 0 and i != previous + 1:
+                lines.append("...")
+            lines.append(line)
+            budget -= len(line)
+            previous = i
+
+        return "\n".join(lines)
+
+    def _response_speaker_mappings(self, response) -> Dict[str, str]:
+        """Convert the parallel speaker_ids/speaker_names arrays to a dict"""
+        if not hasattr(response, 'speaker_ids') or not hasattr(response, 'speaker_names'):
+            log_gemini(f"⚠️ No speaker mappings in response", "WARN")
+            return {}
+
+        if len(response.speaker_ids) != len(response.speaker_names):
+            log_gemini(f"⚠️ Speaker IDs and names mismatch: {len(response.speaker_ids)} != {len(response.speaker_names)}", "WARN")
+            return {}
+
+        mappings = {}
+        for speaker_id, speaker_name in zip(response.speaker_ids, response.speaker_names):
+            mappings.setdefault(speaker_id, speaker_name)
+        return mappings
+
+    def _reconcile_speaker_mappings(
+        self, identified: Dict[str, str], chunk_mappings: list[Dict[str, str]]
+    ) -> Dict[str, str]:
+        """
+        Majority vote per speaker ID across chunks; the whole-recording
+        identification counts double and breaks ties
+        """
+        from collections import Counter
+
+        votes = {}
+        for speaker_id, name in identified.items():
+            votes.setdefault(speaker_id, Counter())[name] += 2
+        for mappings in chunk_mappings:
+            for speaker_id, name in mappings.items():
+                votes.setdefault(speaker_id, Counter())[name] += 1
+
+        reconciled = {}
+        for speaker_id, counter in votes.items():
+            ranked = counter.most_common()
+            best_count = ranked[0][1]
+            tied = [name for name, count in ranked if count == best_count]
+            name = identified[speaker_id] if identified.get(speaker_id) in tied else tied[0]
+            if len(counter) > 1:
+                log_gemini(f"⚖️ Conflicting names for {speaker_id}: {dict(counter)} → {name}", "WARN")
+            reconciled[speaker_id] = name
+        return reconciled
+
+    def _smart_chunk_text(self, text: str, max_tokens: int, tokens: list[int] = None) -> list[TextChunk]:
+        """
+        Intelligent text chunking that preserves sentence boundaries and context.
+        Returns chunks with their token counts so callers don't re-encode them.
+        """
+        chunks = chunk_text(text, max_tokens, tokens=tokens)
+
+        log_gemini(f"✅ Chunking complete: {len(chunks)} chunks created ({sum(c.tokens for c in chunks)} tokens)")
         return chunks
     
     def _merge_cleaned_chunks(self, chunks: list[str]) -> str:
@@ -405,9 +624,11 @@ class GeminiProcessor:
         
         return merged
 
-    async def get_summary(self, vid: str) -> str:
+    async def get_summary(self, vid: str, outputHandler=None) -> str:
         """
-        Generate summary for a video ID by reading transcript and processing with Gemini
+        Generate summary for a video ID by reading transcript and processing with Gemini.
+        When the caller passes its job's output_handler, the transcript is read
+        from it and the summary is only staged on it for the caller to write.
         """
         log_gemini(f"📋 Starting summary generation for video {vid}")
         
@@ -416,8 +637,10 @@ class GeminiProcessor:
         
         # Get transcript data
         log_gemini(f"📂 Loading transcript data for {vid}")
-        oh = output_handler(vid)
-        oh.get_output()
+        owns_handler = outputHandler is None
+        oh = outputHandler or output_handler(vid)
+        if owns_handler:
+            oh.get_output()
         
         if not oh.data or not oh.data.get("text"):
             log_gemini(f"❌ No transcript data found for video {vid}", "ERROR")
@@ -431,10 +654,16 @@ class GeminiProcessor:
             log_gemini(f"📏 Transcript too short for summarization: {len(transcript_text)} chars")
             return transcript_text
         
+        # Encode once; the token ids are reused by the batch chunker
+        try:
+            tokens = encode(transcript_text)
+        except ImportError:
+            tokens = None
+
         # Check if batch processing is needed
-        if self._needs_batch_processing(transcript_text):
+        if self._needs_batch_processing(transcript_text, token_count=len(tokens) if tokens is not None else None):
             log_gemini(f"📦 Using batch processing for large transcript")
-            summary = await self._generate_batch_summary(transcript_text)
+            summary = await self._generate_batch_summary(transcript_text, tokens=tokens)
         else:
             log_gemini(f"📝 Using single-pass summarization")
             summary = await self.ask_gemini_with_retry(
@@ -448,7 +677,8 @@ class GeminiProcessor:
         # Save summary to output data
         if oh.data:
             oh.data["summary_gemini"] = summary
-            oh.write_transcription_data()
+            if owns_handler:
+                oh.write_transcription_data()
             log_gemini(f"💾 Summary saved to output data")
         else:
             log_gemini(f"⚠️ No output data to save summary to", "WARN")
@@ -456,6 +686,85 @@ class GeminiProcessor:
         return summary
 
 
+class StreamingTranscriptCleaner:
+    """
+    Cleans a transcript while it is still being produced: text is fed in as
+    segments arrive, and every full chunk is sent to Gemini right away, so
+    cleaning of early chunks overlaps with transcription of later audio
+    """
+
+    def __init__(self, gemini_processor: GeminiProcessor, max_tokens: int = None):
+        self.processor = gemini_processor
+        self.max_tokens = max_tokens or TOKEN_LIMITS["cleaning_normal"]
+        self.buffer = []
+        self.buffered_tokens = 0
+        self.submitted = []  # (chunk, task) in transcript order
+        self.completed = 0
+        self.start_time = time.time()
+
+    def feed(self, text: str):
+        text = text.strip()
+        if not text:
+            return
+        self.buffer.append(text)
+        self.buffered_tokens += count_tokens(text)
+
+        if self.buffered_tokens > self.max_tokens:
+            # Submit every complete chunk; the tail stays buffered so chunk
+            # boundaries still fall on sentence ends
+            chunks = self.processor._smart_chunk_text(" ".join(self.buffer), self.max_tokens)
+            for chunk in chunks[:-1]:
+                self._submit(chunk)
+            tail = chunks[-1]
+            self.buffer = [tail.text]
+            self.buffered_tokens = tail.tokens
+
+    def _submit(self, chunk: TextChunk):
+        from .prompts import clean_transcript_prompt
+
+        log_gemini(f"🚚 Streaming chunk {len(self.submitted) + 1} to cleaning ({chunk.tokens} tokens)")
+        task = asyncio.create_task(self.processor.ask_gemini_with_retry(
+            clean_transcript_prompt,
+            chunk.text,
+            task_type="cleaning_normal"
+        ))
+        self.submitted.append((chunk, task))
+        # the total grows while the transcript is still streaming in
+        task.add_done_callback(self._report_progress)
+
+    def _report_progress(self, _task):
+        self.completed += 1
+        report_progress("cleaning", self.completed, len(self.submitted))
+
+    async def finish(self) -> str:
+        """Submit the remaining text and return the merged cleaned transcript"""
+        remainder = " ".join(self.buffer)
+        self.buffer = []
+
+        if not self.submitted and len(remainder) < 100:
+            log_gemini(f"📏 Transcript too short ({len(remainder)} chars), returning as-is")
+            return remainder
+
+        if remainder:
+            for chunk in self.processor._smart_chunk_text(remainder, self.max_tokens):
+                self._submit(chunk)
+
+        results = await asyncio.gather(*[task for _, task in self.submitted], return_exceptions=True)
+
+        cleaned_chunks = []
+        for i, ((chunk, _), result) in enumerate(zip(self.submitted, results)):
+            if isinstance(result, Exception):
+                log_gemini(f"❌ Chunk {i+1} processing failed: {str(result)}", "ERROR")
+                # Use original chunk as fallback
+                cleaned_chunks.append(chunk.text)
+                continue
+            cleaned_chunks.append('\n\n'.join(result.cleaned_text))
+
+        final_result = self.processor._merge_cleaned_chunks(cleaned_chunks)
+        log_gemini(f"✅ Streaming cleaning completed {time.time() - self.start_time:.1f}s after first segment - {len(cleaned_chunks)} chunks, {len(final_result)} chars")
+        return final_result
+
+
 # Global processor instance
 processor = GeminiProcessor()
 
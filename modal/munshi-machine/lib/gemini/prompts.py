@@ -76,6 +76,33 @@ Return the cleaned output as a list of strings, where each string is a speaker s
 
 Process this speaker transcript:"""
 
+speaker_identification_prompt = """Identify who each speaker is in this diarized transcript excerpt.
+
+The excerpt is a sample of turns taken from across a whole recording (introductions first, then early turns from every speaker). Lines are in original order; "..." marks skipped material.
+
+SPEAKER IDENTIFICATION RULES:
+• Use FULL NAMES consistently (e.g., "John Smith" not just "John")
+• Look for introductions, name mentions, and how speakers address each other
+• If someone says "I'm [Name]" or is addressed as "[Name]", map that speaker
+• Use self-references vs. third-person references as clues
+• If you cannot find a name, attribute the speaker to a role such as "Host", "Guest" or "Lecturer"
+
+CONSTRAINTS:
+• Only use speaker labels that appear in the excerpt (SPEAKER_00, SPEAKER_01, etc.)
+• The output lists speaker_ids and speaker_names MUST be the same length, and each speaker_id must appear only once.
+
+Identify the speakers in this excerpt:"""
+
+
+def speaker_mapping_context(speaker_mappings: dict) -> str:
+    """Prompt preamble that pins speaker names identified for the whole recording"""
+    lines = "\n".join(f"• {speaker_id} → {name}" for speaker_id, name in sorted(speaker_mappings.items()))
+    return f"""KNOWN SPEAKERS (identified from the full recording, use these names unless this section clearly contradicts them):
+{lines}
+
+"""
+
+
 comprehensive_summary_prompt = f"""Analyze this content and create a summary that matches the content type and context.
 
 {HTML_FORMAT_RULES}
@@ -0,0 +1,111 @@
+"""
+Token-bucket rate limiting shared by all Gemini traffic in a process
+"""
+
+import asyncio
+import re
+import threading
+import time
+
+from .config import RATE_LIMITS, DEFAULT_RATE_LIMIT
+
+# Rough chars-per-token ratio used when no exact token count is supplied
+CHARS_PER_TOKEN = 4
+
+_RETRY_DELAY_PATTERN = re.compile(r"retryDelay['\"]?\s*[:=]\s*['\"]?(\d+(?:\.\d+)?)s")
+
+
+def estimate_tokens(*texts: str) -> int:
+    """Cheap token estimate for rate budgeting"""
+    return sum(len(text) for text in texts if text) // CHARS_PER_TOKEN + 1
+
+
+def parse_retry_delay(error: Exception) -> float | None:
+    """
+    Extract the server retry hint (google.rpc.RetryInfo.retryDelay) from a
+    Gemini API error, if present
+    """
+    details = getattr(error, "details", None)
+    if isinstance(details, dict):
+        for detail in details.get("error", {}).get("details", []) or []:
+            delay = detail.get("retryDelay") if isinstance(detail, dict) else None
+            if delay:
+                try:
+                    return float(str(delay).rstrip("s"))
+                except ValueError:
+                    pass
+
+    match = _RETRY_DELAY_PATTERN.search(str(error))
+    if match:
+        return float(match.group(1))
+    return None
+
+
+class TokenBucket:
+    """
+    Reservation-style token bucket: callers reserve capacity up front and are
+    told how long to wait, so no lock is held across awaits
+    """
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take `amount` from the bucket and return the seconds to wait"""
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        self.level -= min(amount, self.capacity)
+        if self.level >= 0:
+            return 0.0
+        return -self.level / self.rate
+
+
+class ModelRateLimiter:
+    """Requests-per-minute and tokens-per-minute budget for one model"""
+
+    def __init__(self, model: str, rpm: int, tpm: int):
+        self.model = model
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: int) -> float:
+        with self._lock:
+            now = time.monotonic()
+            wait = max(
+                self.requests.reserve(1, now),
+                self.tokens.reserve(tokens, now),
+                self.blocked_until - now,
+            )
+        return max(wait, 0.0)
+
+    async def acquire(self, tokens: int) -> float:
+        """Wait until the request fits in the budget; returns time waited"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def penalize(self, delay: float):
+        """Pause every caller of this model, e.g. after a 429 with a retry hint"""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+
+
+_limiters: dict[str, ModelRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(model: str) -> ModelRateLimiter:
+    """Process-wide limiter for a Gemini model name"""
+    with _limiters_lock:
+        limiter = _limiters.get(model)
+        if limiter is None:
+            limits = RATE_LIMITS.get(model, DEFAULT_RATE_LIMIT)
+            limiter = ModelRateLimiter(model, limits["rpm"], limits["tpm"])
+            _limiters[model] = limiter
+        return limiter
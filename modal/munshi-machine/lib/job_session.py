@@ -0,0 +1,123 @@
+"""
+Job-scoped write-back session passed through the ProcessingStates chain
+"""
+
+import pathlib
+import time
+
+from .. import config
+from .utils import output_handler, audio_path
+from .progress import ProgressPublisher
+
+logger = config.get_logger("JOB_SESSION")
+
+
+class JobSession:
+    """
+    Holds one job's document in memory for the whole state chain.
+
+    States read through `handler` and stage changes with `update`; changes
+    reach the volume only at `checkpoint`s (state transitions that pollers
+    need to see, and the end of the job). The session counts the store
+    reads/writes it performed and the ones it avoided compared with building
+    a fresh output_handler at every step: a read is saved when a state's
+    first document access is served from memory, when a staged update
+    replaces an updateOutputJson load, and when the audio path is not
+    stat()ed again.
+    """
+
+    def __init__(self, vid: str):
+        self.vid = vid
+        self._handler = output_handler(vid)
+        self._audio_path = None
+        self.reads_saved = 0
+        self.writes_saved = 0
+        self.checkpoints = 0
+        self._pending_updates = 0
+        self._staged_status = None
+        # the constructor's load serves the first state
+        self._state_has_handler = True
+        # live events for /job_events subscribers
+        self.progress = ProgressPublisher(vid)
+
+    @property
+    def handler(self) -> output_handler:
+        if not self._state_has_handler:
+            # the state would have opened its own output_handler(vid)
+            self._state_has_handler = True
+            self.reads_saved += 1
+        return self._handler
+
+    @property
+    def status(self):
+        return self._handler.status
+
+    @property
+    def audio_path(self) -> pathlib.Path:
+        """Audio file location, resolved once per job instead of per state"""
+        if self._audio_path is None:
+            path = audio_path(self.vid)
+            if not path.exists():
+                # not fetched yet; resolve again next time
+                return path
+            self._audio_path = path
+        else:
+            self.reads_saved += 1
+        return self._audio_path
+
+    def reload(self):
+        """Re-read the document, e.g. after another container committed to the volume"""
+        self._handler.get_output()
+
+    def update(self, symbol: str = None, data=None, **fields):
+        """Stage changes in memory; they are written at the next checkpoint"""
+        staged = False
+        # A state re-announcing the status the previous checkpoint wrote is a no-op
+        if symbol is not None and symbol != self._handler.status:
+            self._handler.update_field("status", symbol)
+            self._record_stage(symbol)
+            self._staged_status = symbol
+            self._state_has_handler = False
+            staged = True
+        if data is not None:
+            self._handler.update_field("data", data)
+            staged = True
+        for fieldname, value in fields.items():
+            self._handler.update_field(fieldname, value)
+            staged = True
+        # updateOutputJson loaded the document before every write
+        self.reads_saved += 1
+        if staged:
+            self._pending_updates += 1
+        else:
+            self.writes_saved += 1
+
+    def _record_stage(self, symbol: str):
+        """Stamp when `symbol` started, for the status endpoint's stage timings"""
+        stage_timings = dict(self._handler.get_field("stage_timings") or {})
+        stage_timings[symbol] = round(time.time(), 3)
+        self._handler.update_field("stage_timings", stage_timings)
+
+    def checkpoint(self, label: str = ""):
+        """Flush staged changes to the job store"""
+        if self._pending_updates == 0 and not self._handler.is_dirty():
+            return
+        self._handler.write_transcription_data()
+        self.checkpoints += 1
+        if self._staged_status is not None:
+            # announced only once the new state is on the volume
+            self.progress.publish("state", status=self._staged_status)
+            self._staged_status = None
+        # Every update used to be its own read-modify-write of the document
+        self.writes_saved += max(self._pending_updates - 1, 0)
+        self._pending_updates = 0
+        logger.info(f"Checkpoint {label or self.checkpoints} for {self.vid}")
+
+    def stats(self) -> dict:
+        return {
+            "store_reads": self._handler.store.reads,
+            "store_writes": self._handler.store.writes,
+            "checkpoints": self.checkpoints,
+            "reads_saved": self.reads_saved,
+            "writes_saved": self.writes_saved,
+        }
@@ -0,0 +1,106 @@
+"""
+Small status documents for frontend polling.
+
+Built from the job's top-level fields only (status, stage timings, title,
+author), so a poll never touches the transcript payload.
+"""
+
+import hashlib
+import json
+from email.utils import formatdate, parsedate_to_datetime
+
+from .job_store import JobStore, FIELDS_DIR
+
+# Pipeline order and the share of the job done when each stage starts
+STAGE_PROGRESS = {
+    "Init": 0.0,
+    "FetchingAudio": 0.05,
+    "NormalizingAudio": 0.07,
+    "Transcribing": 0.1,
+    "Summarizing": 0.8,
+    "Completed": 1.0,
+}
+STAGE_ALIASES = {
+    "initiated": "Init",
+    "downloading_audio": "FetchingAudio",
+}
+
+
+def _stages(status: str, stage_timings: dict) -> list[dict]:
+    stages = []
+    started = sorted(stage_timings.items(), key=lambda item: item[1])
+    for i, (name, started_at) in enumerate(started):
+        stage = {"name": name, "started_at": started_at}
+        if i + 1 < len(started):
+            stage["duration"] = round(started[i + 1][1] - started_at, 3)
+        elif name == "Completed":
+            stage["duration"] = 0.0
+        # the running stage has no duration, so the document (and its ETag)
+        # stays the same between transitions; clients add elapsed time
+        stages.append(stage)
+    return stages
+
+
+def _last_modified(store: JobStore) -> float:
+    if store.is_migrated():
+        fields_dir = store.job_dir / FIELDS_DIR
+        mtimes = []
+        for path in fields_dir.glob("*.json"):
+            try:
+                mtimes.append(path.stat().st_mtime)
+            except FileNotFoundError:
+                # replaced or deleted between the glob and the stat
+                continue
+        return max(mtimes, default=store.job_dir.stat().st_mtime)
+    return store.legacy_path.stat().st_mtime
+
+
+def get_job_status(vid: str, store: JobStore = None):
+    """
+    (status document, last-modified epoch seconds), or (None, None) if the
+    job does not exist
+    """
+    store = store or JobStore(vid)
+    if not store.exists():
+        return None, None
+
+    fields = store.read_fields()
+    status = fields.get("status", "Unknown")
+    stage = STAGE_ALIASES.get(status, status)
+    stage_timings = fields.get("stage_timings") or {}
+
+    document = {
+        "vid": vid,
+        "status": status,
+        "progress": STAGE_PROGRESS.get(stage),
+        "stages": _stages(stage, stage_timings),
+        "metadata": {"title": fields.get("title"), "author": fields.get("author")},
+    }
+    return document, _last_modified(store)
+
+
+def etag_for(document: dict) -> str:
+    payload = json.dumps(document, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return f'W/"{hashlib.sha1(payload).hexdigest()[:20]}"'
+
+
+def http_date(timestamp: float) -> str:
+    return formatdate(timestamp, usegmt=True)
+
+
+def is_not_modified(request_headers, etag: str, last_modified: float) -> bool:
+    """RFC 9110 conditional GET: If-None-Match wins over If-Modified-Since"""
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+    # HTTP dates have one-second resolution
+    return int(last_modified) <= since
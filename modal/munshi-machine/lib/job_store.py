@@ -0,0 +1,398 @@
+"""
+Incremental on-disk job store.
+
+Each job is a directory on the transcriptions volume. Small top-level fields
+(status, title, speaker settings, ...) and every key of the large `data`
+payload live in separate files, so a status transition or a speaker edit
+rewrites a few bytes instead of the whole transcript document:
+
+    {TRANSCRIPTIONS_DIR}/{vid}/fields/{name}.json
+    {TRANSCRIPTIONS_DIR}/{vid}/data/{key}.json[.gz|.zst]
+    {TRANSCRIPTIONS_DIR}/{vid}/words/{column}.{generation}.npy, meta.json
+
+Data values are stored as compact JSON, compressed according to
+JOB_STORE_FORMAT ("gzip" by default, "zstd" when the zstandard package is
+installed, or "json" for plain files). Reads accept every format, so jobs
+written before a format change stay readable.
+
+Word timings are kept out of `data`: each column of a WordTimings (see
+lib/asr/words.py) is a .npy file that is memory-mapped when read. Every
+write stores its columns under a new generation and then replaces meta.json,
+which names the generation, the speakers and the number of words, so a
+reader only ever pairs meta.json with the columns written alongside it.
+
+Jobs written before the store existed are single `{vid}.json` documents;
+they are read transparently and exploded into the store on first write.
+"""
+
+import gzip
+import json
+import os
+import pathlib
+import shutil
+import threading
+
+from ..config import TRANSCRIPTIONS_DIR, get_logger
+
+logger = get_logger("JOB_STORE")
+
+FIELDS_DIR = "fields"
+DATA_DIR = "data"
+WORDS_DIR = "words"
+WORDS_META = "meta.json"
+# a writer may swap generations between reading meta.json and the columns
+WORDS_READ_ATTEMPTS = 3
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 10
+
+
+def _zstd():
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        return None
+
+
+# suffix -> (encode str to bytes, decode bytes to str)
+CODECS = {
+    ".json": (
+        lambda text: text.encode("utf-8"),
+        lambda raw: raw.decode("utf-8"),
+    ),
+    ".json.gz": (
+        lambda text: gzip.compress(text.encode("utf-8"), compresslevel=GZIP_LEVEL, mtime=0),
+        lambda raw: gzip.decompress(raw).decode("utf-8"),
+    ),
+    ".json.zst": (
+        lambda text: _zstd().ZstdCompressor(level=ZSTD_LEVEL).compress(text.encode("utf-8")),
+        lambda raw: _zstd().ZstdDecompressor().decompress(raw).decode("utf-8"),
+    ),
+}
+FORMAT_SUFFIXES = {"json": ".json", "gzip": ".json.gz", "zstd": ".json.zst"}
+
+
+def _data_suffix() -> str:
+    store_format = os.environ.get("JOB_STORE_FORMAT", "gzip")
+    if store_format not in FORMAT_SUFFIXES:
+        logger.warning(f"Unknown JOB_STORE_FORMAT {store_format!r}, using gzip")
+        store_format = "gzip"
+    if store_format == "zstd" and _zstd() is None:
+        logger.warning("JOB_STORE_FORMAT=zstd but zstandard is not installed, using gzip")
+        store_format = "gzip"
+    return FORMAT_SUFFIXES[store_format]
+
+
+DATA_SUFFIX = _data_suffix()
+
+
+def _split_suffix(name: str):
+    """("key", ".json.gz") for "key.json.gz"; None for foreign files"""
+    # longest first, so "x.json.gz" is not read as "x.json" + ".gz"
+    for suffix in sorted(CODECS, key=len, reverse=True):
+        if name.endswith(suffix):
+            return name[: -len(suffix)], suffix
+    return None
+
+
+def _atomic_write(path: pathlib.Path, payload):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    if isinstance(payload, str):
+        payload = payload.encode("utf-8")
+    with open(tmp_path, "wb") as tmp_file:
+        tmp_file.write(payload)
+    os.replace(tmp_path, path)
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _field_file(job_dir: pathlib.Path, name: str) -> pathlib.Path:
+    return job_dir / FIELDS_DIR / f"{name}.json"
+
+
+def _data_file(job_dir: pathlib.Path, key: str, suffix: str = None) -> pathlib.Path:
+    return job_dir / DATA_DIR / f"{key}{suffix or DATA_SUFFIX}"
+
+
+def _write_data_file(job_dir: pathlib.Path, key: str, value):
+    encode, _ = CODECS[DATA_SUFFIX]
+    _atomic_write(_data_file(job_dir, key), encode(_dumps(value)))
+
+
+def _read_data_file(path: pathlib.Path, suffix: str):
+    _, decode = CODECS[suffix]
+    with open(path, "rb") as data_file:
+        return json.loads(decode(data_file.read()))
+
+
+def _words_file(words_dir: pathlib.Path, name: str, generation: str = None) -> pathlib.Path:
+    # words written before generations were stored as {column}.npy
+    return words_dir / (f"{name}.{generation}.npy" if generation else f"{name}.npy")
+
+
+def _load_words(words_dir: pathlib.Path, meta: dict):
+    """The WordTimings meta.json describes, or None if its columns disagree"""
+    import numpy as np
+    from .asr.words import WORD_COLUMNS, WordTimings
+
+    columns = {
+        name: np.load(_words_file(words_dir, name, meta.get("generation")), mmap_mode="r", allow_pickle=False)
+        for name in WORD_COLUMNS
+    }
+    count = meta["count"]
+    offsets = columns["text_offsets"]
+    if (
+        any(len(columns[name]) != count for name in ("start", "end", "speaker", "score"))
+        or len(offsets) != count + 1
+        or len(columns["text"]) != int(offsets[-1])
+    ):
+        logger.warning(f"Word columns in {words_dir} do not match {WORDS_META}")
+        return None
+    return WordTimings(meta["speakers"], columns)
+
+
+def _stat_stamp(path: pathlib.Path):
+    try:
+        return path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _read_json(path: pathlib.Path):
+    with open(path, "r", encoding="utf-8") as json_file:
+        return json.load(json_file)
+
+
+class JobStore:
+    """File-per-field storage for one job"""
+
+    def __init__(self, vid: str, root: pathlib.Path = TRANSCRIPTIONS_DIR):
+        self.vid = vid
+        self.root = pathlib.Path(root)
+        self.job_dir = self.root / vid
+        self.legacy_path = self.root / f"{vid}.json"
+        # Files read/written through this store (for per-job accounting)
+        self.reads = 0
+        self.writes = 0
+
+    # Layout
+
+    def _field_path(self, name: str) -> pathlib.Path:
+        return _field_file(self.job_dir, name)
+
+    def _data_paths(self) -> dict:
+        """{key: (path, suffix)} of the stored data files"""
+        data_dir = self.job_dir / DATA_DIR
+        if not data_dir.is_dir():
+            return {}
+        paths = {}
+        for path in data_dir.iterdir():
+            parsed = _split_suffix(path.name)
+            if parsed is None or path.name.startswith("."):
+                continue
+            key, suffix = parsed
+            # a key present in several formats is read in the current one
+            if key not in paths or suffix == DATA_SUFFIX:
+                paths[key] = (path, suffix)
+        return paths
+
+    def _find_data_path(self, key: str):
+        for suffix in (DATA_SUFFIX, *CODECS):
+            path = _data_file(self.job_dir, key, suffix)
+            if path.exists():
+                return path, suffix
+        return None
+
+    def is_migrated(self) -> bool:
+        return self.job_dir.is_dir()
+
+    def exists(self) -> bool:
+        return self.is_migrated() or self.legacy_path.exists()
+
+    def version(self):
+        """
+        Cheap change stamp for caches: every write is an atomic rename into
+        fields/ or data/, which bumps that directory's mtime. None if the
+        job does not exist.
+        """
+        try:
+            if self.is_migrated():
+                return tuple(
+                    _stat_stamp(self.job_dir / name) for name in (FIELDS_DIR, DATA_DIR)
+                )
+            stat = self.legacy_path.stat()
+            return (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            return None
+
+    def _legacy_document(self) -> dict:
+        self.reads += 1
+        return _read_json(self.legacy_path)
+
+    # Reads
+
+    def read_field(self, name: str, default=None):
+        if not self.is_migrated():
+            if not self.legacy_path.exists():
+                return default
+            return self._legacy_document().get(name, default)
+        try:
+            self.reads += 1
+            return _read_json(self._field_path(name))
+        except FileNotFoundError:
+            return default
+
+    def read_fields(self) -> dict:
+        """All top-level fields except `data`"""
+        if not self.is_migrated():
+            if not self.legacy_path.exists():
+                return {}
+            document = self._legacy_document()
+            document.pop("data", None)
+            return document
+
+        fields = {}
+        fields_dir = self.job_dir / FIELDS_DIR
+        if fields_dir.is_dir():
+            for path in fields_dir.glob("*.json"):
+                self.reads += 1
+                fields[path.stem] = _read_json(path)
+        return fields
+
+    def data_keys(self) -> list[str]:
+        return list(self._data_paths())
+
+    def read_data(self):
+        """The `data` payload, or None if the job has none"""
+        if not self.is_migrated():
+            if not self.legacy_path.exists():
+                return None
+            return self._legacy_document().get("data")
+
+        data_dir = self.job_dir / DATA_DIR
+        if not data_dir.is_dir():
+            return None
+        paths = self._data_paths()
+        self.reads += len(paths)
+        return {key: _read_data_file(path, suffix) for key, (path, suffix) in paths.items()}
+
+    def read_data_key(self, key: str, default=None):
+        if not self.is_migrated():
+            return (self.read_data() or {}).get(key, default)
+        found = self._find_data_path(key)
+        if found is None:
+            return default
+        try:
+            self.reads += 1
+            return _read_data_file(*found)
+        except FileNotFoundError:
+            return default
+
+    # Writes
+
+    def _ensure_migrated(self):
+        """Explode a legacy single-document job into the store"""
+        if self.is_migrated():
+            return
+        if not self.legacy_path.exists():
+            self.job_dir.mkdir(parents=True, exist_ok=True)
+            return
+
+        document = self._legacy_document()
+        # Build the job directory aside and swap it in, so readers never see
+        # a half-migrated job
+        staging_dir = self.root / f".{self.vid}.migrating.{os.getpid()}"
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        for name, value in document.items():
+            if name == "data":
+                if value is not None:
+                    (staging_dir / DATA_DIR).mkdir(parents=True, exist_ok=True)
+                    for key, item in value.items():
+                        _write_data_file(staging_dir, key, item)
+            else:
+                _atomic_write(_field_file(staging_dir, name), _dumps(value))
+        staging_dir.mkdir(parents=True, exist_ok=True)
+        os.replace(staging_dir, self.job_dir)
+        self.legacy_path.unlink(missing_ok=True)
+        logger.info(f"Migrated legacy output {self.legacy_path.name} into job store")
+
+    def write_field(self, name: str, value):
+        self._ensure_migrated()
+        self.writes += 1
+        _atomic_write(self._field_path(name), _dumps(value))
+
+    def write_data_key(self, key: str, value):
+        self._ensure_migrated()
+        self.writes += 1
+        _write_data_file(self.job_dir, key, value)
+        # drop copies of this key left in another format
+        for suffix in CODECS:
+            if suffix != DATA_SUFFIX:
+                _data_file(self.job_dir, key, suffix).unlink(missing_ok=True)
+
+    def delete_data_key(self, key: str):
+        for suffix in CODECS:
+            _data_file(self.job_dir, key, suffix).unlink(missing_ok=True)
+
+    def write_words(self, timings):
+        """Store a WordTimings; an empty one removes the stored words"""
+        import io
+        import uuid
+        import numpy as np
+
+        if not len(timings):
+            self.delete_words()
+            return
+        self._ensure_migrated()
+        words_dir = self.job_dir / WORDS_DIR
+        generation = uuid.uuid4().hex[:12]
+        for name, column in timings.columns.items():
+            buffer = io.BytesIO()
+            np.save(buffer, np.ascontiguousarray(column), allow_pickle=False)
+            _atomic_write(_words_file(words_dir, name, generation), buffer.getvalue())
+            self.writes += 1
+        _atomic_write(words_dir / WORDS_META, _dumps({**timings.meta(), "generation": generation}))
+        self.writes += 1
+        # earlier generations; a reader that still maps them keeps its mapping
+        current = {_words_file(words_dir, name, generation).name for name in timings.columns}
+        for path in words_dir.glob("*.npy"):
+            if path.name not in current:
+                path.unlink(missing_ok=True)
+
+    def read_words(self):
+        """The job's WordTimings with memory-mapped columns, or None"""
+        from .asr.words import WORDS_VERSION
+
+        words_dir = self.job_dir / WORDS_DIR
+        for _ in range(WORDS_READ_ATTEMPTS):
+            try:
+                meta = _read_json(words_dir / WORDS_META)
+                self.reads += 1
+                if meta.get("version") != WORDS_VERSION:
+                    return None
+                return _load_words(words_dir, meta)
+            except FileNotFoundError:
+                # no words, or a writer removed this generation under us
+                continue
+        return None
+
+    def delete_words(self):
+        shutil.rmtree(self.job_dir / WORDS_DIR, ignore_errors=True)
+
+    def replace_data(self, data):
+        """Rewrite the whole `data` payload (None removes it)"""
+        self._ensure_migrated()
+        data_dir = self.job_dir / DATA_DIR
+        if data is None:
+            shutil.rmtree(data_dir, ignore_errors=True)
+            return
+        data_dir.mkdir(parents=True, exist_ok=True)
+        stale = set(self.data_keys()) - set(data.keys())
+        for key, value in data.items():
+            self.write_data_key(key, value)
+        for key in stale:
+            self.delete_data_key(key)
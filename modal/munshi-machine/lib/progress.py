@@ -0,0 +1,231 @@
+"""
+Live job progress.
+
+The ProcessingStates chain publishes state transitions and Gemini chunk
+counts for its job into a shared modal.Dict (the pipeline and the web API
+run in different containers). Each web container runs one poller per job
+that fans new events out to all of its Server-Sent Events subscribers.
+"""
+
+import asyncio
+import contextvars
+import json
+import time
+from typing import AsyncIterator, Iterable
+
+from .. import config
+
+logger = config.get_logger("PROGRESS")
+
+PROGRESS_DICT_NAME = "munshi-job-progress"
+MAX_EVENTS = 100
+POLL_INTERVAL = 0.5
+HEARTBEAT_INTERVAL = 15
+TERMINAL_STATES = {"Completed", "Failed"}
+
+# Publisher of the job running in the current task (set by init_transcription)
+current_publisher = contextvars.ContextVar("current_progress_publisher", default=None)
+
+HEARTBEAT = object()
+
+_progress_dict = None
+
+
+def get_progress_dict():
+    global _progress_dict
+    if _progress_dict is None:
+        from modal import Dict
+        _progress_dict = Dict.from_name(PROGRESS_DICT_NAME, create_if_missing=True)
+    return _progress_dict
+
+
+def is_finished(events: list[dict]) -> bool:
+    """Whether the latest state event ends the job"""
+    for event in reversed(events):
+        if event.get("event") == "state":
+            return event.get("status") in TERMINAL_STATES
+    return False
+
+
+class ProgressPublisher:
+    """
+    Per-job event log mirrored to the progress Dict as
+    {"seq": last id, "events": [...last MAX_EVENTS events]}.
+
+    publish() never blocks: writes are coalesced into one background flush,
+    so a burst of chunk completions costs one Dict put.
+    """
+
+    def __init__(self, vid: str, store=None):
+        self.vid = vid
+        self.store = store
+        self.seq = 0
+        self.events = []
+        self._dirty = False
+        self._flush_task = None
+
+    def publish(self, event: str, **payload):
+        # Millisecond ids stay increasing when a job is resumed in another
+        # container with a fresh publisher
+        self.seq = max(self.seq + 1, time.time_ns() // 1_000_000)
+        entry = {"id": self.seq, "event": event, "ts": round(time.time(), 3), **payload}
+        last = self.events[-1] if self.events else None
+        if (
+            event == "progress"
+            and last is not None
+            and last["event"] == "progress"
+            and last.get("stage") == payload.get("stage")
+        ):
+            # Only the latest count of a running stage matters
+            self.events[-1] = entry
+        else:
+            self.events.append(entry)
+            del self.events[:-MAX_EVENTS]
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        self._dirty = True
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # no loop (sync caller); the next publish or close() flushes
+            return
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = loop.create_task(self._flush())
+
+    async def _flush(self):
+        store = self.store or get_progress_dict()
+        while self._dirty:
+            self._dirty = False
+            snapshot = {"seq": self.seq, "events": list(self.events)}
+            try:
+                await store.put.aio(self.vid, snapshot)
+            except Exception as e:
+                # progress is best effort; never fail the job over it
+                logger.warning(f"Could not publish progress for {self.vid}: {e}")
+                return
+
+    async def close(self):
+        """Wait until every published event has reached the Dict"""
+        if self._flush_task is not None and not self._flush_task.done():
+            await self._flush_task
+        if self._dirty:
+            await self._flush()
+
+
+def report_progress(stage: str, done: int, total: int):
+    publisher = current_publisher.get()
+    if publisher is not None:
+        publisher.publish("progress", stage=stage, done=done, total=total)
+
+
+def with_progress(stage: str, coroutines: Iterable) -> list:
+    """Wrap coroutines so each completion reports `done/total` for `stage`"""
+    coroutines = list(coroutines)
+    if current_publisher.get() is None:
+        return coroutines
+
+    total = len(coroutines)
+    done = 0
+
+    async def run(coroutine):
+        nonlocal done
+        try:
+            return await coroutine
+        finally:
+            done += 1
+            report_progress(stage, done, total)
+
+    report_progress(stage, 0, total)
+    return [run(coroutine) for coroutine in coroutines]
+
+
+class ProgressHub:
+    """
+    Fans a job's events out to local subscribers with one shared poller per
+    job, however many viewers are connected to this container
+    """
+
+    def __init__(self, store=None, poll_interval: float = POLL_INTERVAL):
+        self.store = store
+        self.poll_interval = poll_interval
+        self._subscribers: dict[str, set[asyncio.Queue]] = {}
+        self._pollers: dict[str, asyncio.Task] = {}
+        self._latest: dict[str, list[dict]] = {}
+
+    async def subscribe(
+        self, vid: str, last_id: int = 0, heartbeat: float = HEARTBEAT_INTERVAL
+    ) -> AsyncIterator:
+        """
+        Events with id > last_id until the job reaches a terminal state
+        (the poller then ends every subscription).
+        Yields HEARTBEAT when nothing happened for `heartbeat` seconds.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        for event in self._latest.get(vid, []):
+            queue.put_nowait(event)
+        self._subscribers.setdefault(vid, set()).add(queue)
+        if vid not in self._pollers:
+            self._pollers[vid] = asyncio.create_task(self._poll(vid))
+
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield HEARTBEAT
+                    continue
+                if event is None:
+                    return
+                if event["id"] <= last_id:
+                    continue
+                last_id = event["id"]
+                yield event
+        finally:
+            subscribers = self._subscribers.get(vid)
+            if subscribers is not None:
+                subscribers.discard(queue)
+
+    def _broadcast(self, vid: str, event):
+        for queue in self._subscribers.get(vid, ()):
+            queue.put_nowait(event)
+
+    async def _poll(self, vid: str):
+        store = self.store or get_progress_dict()
+        last_seq = 0
+        try:
+            while self._subscribers.get(vid):
+                try:
+                    snapshot = await store.get.aio(vid)
+                except Exception as e:
+                    logger.warning(f"Could not read progress for {vid}: {e}")
+                    snapshot = None
+
+                if snapshot and snapshot["seq"] > last_seq:
+                    events = snapshot["events"]
+                    self._latest[vid] = events
+                    for event in events:
+                        if event["id"] > last_seq:
+                            self._broadcast(vid, event)
+                    last_seq = snapshot["seq"]
+                    if is_finished(events):
+                        break
+
+                await asyncio.sleep(self.poll_interval)
+        finally:
+            self._broadcast(vid, None)
+            self._pollers.pop(vid, None)
+            self._subscribers.pop(vid, None)
+            self._latest.pop(vid, None)
+
+
+def format_sse(event: dict = None, name: str = None) -> str:
+    """One Server-Sent Events frame (a comment line for heartbeats)"""
+    if event is None or event is HEARTBEAT:
+        return ": keep-alive\n\n"
+    lines = []
+    if "id" in event:
+        lines.append(f"id: {event['id']}")
+    lines.append(f"event: {name or event['event']}")
+    lines.append(f"data: {json.dumps(event, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
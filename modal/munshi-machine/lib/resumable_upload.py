@@ -0,0 +1,223 @@
+"""
+Resumable, chunked uploads.
+
+A session lives in {RAW_AUDIO_DIR}/.uploads/{upload_id}/ on the audio
+volume: session.json describes the file, and every received chunk is its
+own part file named by its offset. Chunks can arrive in any order, in
+parallel, and on different web containers, since no two requests write the
+same file. Once every part is present the parts are streamed, in order,
+into one file while it is hashed, and the result goes through the same
+content-addressed dedup as a single-request upload.
+"""
+
+import io
+import json
+import os
+import pathlib
+import shutil
+import time
+import uuid
+
+from .. import config
+from ..config import RAW_AUDIO_DIR
+from .upload_utils import UPLOAD_MAX_BYTES, SUPPORTED_EXTENSIONS
+
+logger = config.get_logger("RESUMABLE_UPLOAD")
+
+UPLOAD_SESSIONS_DIR = pathlib.Path(RAW_AUDIO_DIR, ".uploads")
+DEFAULT_CHUNK_SIZE = 8 << 20
+MIN_CHUNK_SIZE = 1 << 20
+MAX_CHUNK_SIZE = 32 << 20
+# Sessions untouched for this long are swept when new ones are created
+SESSION_TTL = 24 * 3600
+
+SESSION_FILE = "session.json"
+PART_PREFIX = "part-"
+
+
+class UploadSessionError(ValueError):
+    pass
+
+
+class UploadSessionNotFound(UploadSessionError):
+    pass
+
+
+def _part_name(offset: int) -> str:
+    return f"{PART_PREFIX}{offset:012d}"
+
+
+class UploadSession:
+    def __init__(self, upload_id: str, root: pathlib.Path = UPLOAD_SESSIONS_DIR):
+        if not upload_id or not all(c.isalnum() or c == "-" for c in upload_id):
+            raise UploadSessionNotFound(f"Invalid upload id: {upload_id!r}")
+        self.upload_id = upload_id
+        self.dir = pathlib.Path(root) / upload_id
+        self._info = None
+
+    @classmethod
+    def create(
+        cls,
+        fileName: str,
+        size: int,
+        chunk_size: int = None,
+        upload_token: str = None,
+        root: pathlib.Path = UPLOAD_SESSIONS_DIR,
+    ) -> "UploadSession":
+        if not fileName or not fileName.lower().endswith(SUPPORTED_EXTENSIONS):
+            raise UploadSessionError(f"Unsupported file type: {fileName}")
+        if not isinstance(size, int) or size <= 0:
+            raise UploadSessionError("size must be a positive integer")
+        if size > UPLOAD_MAX_BYTES:
+            raise UploadSessionError(f"File too large: {size} bytes (max 500MB)")
+        chunk_size = min(max(chunk_size or DEFAULT_CHUNK_SIZE, MIN_CHUNK_SIZE), MAX_CHUNK_SIZE)
+
+        claims = None
+        if upload_token:
+            from .upload_negotiation import verify_upload_token
+            claims = verify_upload_token(upload_token)
+            if claims.get("size") != size:
+                raise UploadSessionError("size does not match the upload token")
+
+        sweep_stale_sessions(root)
+
+        session = cls(str(uuid.uuid4()), root)
+        session.dir.mkdir(parents=True)
+        session._info = {
+            "fileName": fileName,
+            "size": size,
+            "chunk_size": chunk_size,
+            "claims": claims,
+            "created_at": time.time(),
+        }
+        _write_json(session.dir / SESSION_FILE, session._info)
+        return session
+
+    @property
+    def info(self) -> dict:
+        if self._info is None:
+            try:
+                with open(self.dir / SESSION_FILE, "r") as session_file:
+                    self._info = json.load(session_file)
+            except FileNotFoundError:
+                raise UploadSessionNotFound(f"Upload {self.upload_id} not found")
+        return self._info
+
+    @property
+    def part_count(self) -> int:
+        info = self.info
+        return -(-info["size"] // info["chunk_size"])
+
+    def expected_length(self, offset: int) -> int:
+        info = self.info
+        if offset < 0 or offset >= info["size"] or offset % info["chunk_size"]:
+            raise UploadSessionError(
+                f"offset must be a multiple of {info['chunk_size']} below {info['size']}"
+            )
+        return min(info["chunk_size"], info["size"] - offset)
+
+    def write_part(self, offset: int, data: bytes):
+        """Store one chunk; re-sending a chunk replaces it"""
+        expected = self.expected_length(offset)
+        if len(data) != expected:
+            raise UploadSessionError(f"chunk at {offset} must be {expected} bytes, got {len(data)}")
+        path = self.dir / _part_name(offset)
+        tmp_path = self.dir / f".{path.name}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as part_file:
+            part_file.write(data)
+        os.replace(tmp_path, path)
+
+    def received_offsets(self) -> list[int]:
+        self.info  # raise if the session does not exist
+        offsets = []
+        for path in self.dir.iterdir():
+            if path.name.startswith(PART_PREFIX):
+                offsets.append(int(path.name[len(PART_PREFIX):]))
+        return sorted(offsets)
+
+    def status(self) -> dict:
+        info = self.info
+        received = self.received_offsets()
+        chunk_size = info["chunk_size"]
+        received_bytes = sum(min(chunk_size, info["size"] - offset) for offset in received)
+        missing = sorted(
+            set(range(0, info["size"], chunk_size)) - set(received)
+        )
+        return {
+            "upload_id": self.upload_id,
+            "fileName": info["fileName"],
+            "size": info["size"],
+            "chunk_size": chunk_size,
+            "parts": self.part_count,
+            "received_bytes": received_bytes,
+            "missing_offsets": missing,
+            "complete": not missing,
+        }
+
+    def assemble(self, destination_path: str) -> tuple[int, str]:
+        """
+        Stream every part, in order, into `destination_path` while hashing.
+        Blocking; run it in a worker thread.
+        """
+        from .upload_utils import copy_and_hash
+
+        status = self.status()
+        if not status["complete"]:
+            raise UploadSessionError(
+                f"{len(status['missing_offsets'])} of {status['parts']} parts missing"
+            )
+        paths = [self.dir / _part_name(offset) for offset in range(0, status["size"], status["chunk_size"])]
+        with _ConcatenatedParts(paths) as source:
+            return copy_and_hash(source, destination_path)
+
+    def delete(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+class _ConcatenatedParts(io.RawIOBase):
+    """Read-only stream over several files in sequence"""
+
+    def __init__(self, paths: list[pathlib.Path]):
+        self._paths = list(paths)
+        self._current = None
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while True:
+            if self._current is None:
+                if not self._paths:
+                    return 0
+                self._current = open(self._paths.pop(0), "rb")
+            length = self._current.readinto(buffer)
+            if length:
+                return length
+            self._current.close()
+            self._current = None
+
+    def close(self):
+        if self._current is not None:
+            self._current.close()
+            self._current = None
+        super().close()
+
+
+def _write_json(path: pathlib.Path, value):
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    with open(tmp_path, "w") as json_file:
+        json.dump(value, json_file)
+    os.replace(tmp_path, path)
+
+
+def sweep_stale_sessions(root: pathlib.Path = UPLOAD_SESSIONS_DIR):
+    if not root.is_dir():
+        return
+    cutoff = time.time() - SESSION_TTL
+    for session_dir in root.iterdir():
+        try:
+            if session_dir.stat().st_mtime < cutoff:
+                shutil.rmtree(session_dir, ignore_errors=True)
+                logger.info(f"Removed stale upload session {session_dir.name}")
+        except FileNotFoundError:
+            continue
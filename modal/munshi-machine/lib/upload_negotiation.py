@@ -0,0 +1,151 @@
+"""
+Hash-first upload negotiation.
+
+Before sending a file, the client offers its SHA-256, or a cheap partial
+fingerprint plus its size. If a completed transcript already exists the
+upload is skipped entirely. Otherwise the client gets a signed upload token
+naming the hash it promised, which /upload_file checks against the hash of
+the bytes it actually receives.
+
+Partial fingerprint (computed identically by client and server):
+
+    sha256(f"{size}:".encode() + data[:1MB] + data[max(size - 1MB, 0):]).hexdigest()
+
+Fingerprints of stored uploads are indexed on the transcriptions volume so
+they can be resolved to a file ID without the full hash.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import pathlib
+import secrets
+import time
+
+from .. import config
+from ..config import TRANSCRIPTIONS_DIR
+
+logger = config.get_logger("UPLOAD_NEGOTIATION")
+
+FINGERPRINT_SPAN = 1 << 20
+UPLOAD_TOKEN_TTL = 3600
+FINGERPRINT_INDEX_DIR = pathlib.Path(TRANSCRIPTIONS_DIR, ".upload_index")
+
+_token_secret = None
+
+
+class InvalidUploadToken(ValueError):
+    pass
+
+
+def _get_token_secret() -> bytes:
+    global _token_secret
+    if _token_secret is None:
+        configured = os.environ.get("UPLOAD_TOKEN_SECRET")
+        if configured:
+            _token_secret = configured.encode("utf-8")
+        else:
+            # tokens then only verify in the container that issued them
+            logger.warning("UPLOAD_TOKEN_SECRET is not set, using a per-container secret")
+            _token_secret = secrets.token_bytes(32)
+    return _token_secret
+
+
+def _b64(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _unb64(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def issue_upload_token(
+    size: int, sha256: str = None, fingerprint: str = None, ttl: int = UPLOAD_TOKEN_TTL
+) -> tuple[str, int]:
+    """
+    (token, expiry epoch seconds) binding an upload to its size and to the
+    full hash or partial fingerprint the client promised
+    """
+    expires_at = int(time.time()) + ttl
+    payload = {"size": size, "exp": expires_at}
+    if sha256:
+        payload["sha256"] = sha256
+    if fingerprint:
+        payload["fingerprint"] = fingerprint
+    claims = _b64(json.dumps(payload).encode("utf-8"))
+    signature = hmac.new(_get_token_secret(), claims.encode("ascii"), hashlib.sha256).digest()
+    return f"{claims}.{_b64(signature)}", expires_at
+
+
+def verify_upload_token(token: str) -> dict:
+    """Claims of a valid, unexpired token; raises InvalidUploadToken otherwise"""
+    try:
+        claims, signature = token.split(".", 1)
+        expected = hmac.new(_get_token_secret(), claims.encode("ascii"), hashlib.sha256).digest()
+        if not hmac.compare_digest(expected, _unb64(signature)):
+            raise InvalidUploadToken("Upload token signature mismatch")
+        payload = json.loads(_unb64(claims))
+    except (ValueError, UnicodeError) as e:
+        if isinstance(e, InvalidUploadToken):
+            raise
+        raise InvalidUploadToken(f"Malformed upload token: {e}")
+
+    if payload.get("exp", 0) < time.time():
+        raise InvalidUploadToken("Upload token expired")
+    return payload
+
+
+def check_upload_claims(claims: dict, path: str, size: int, sha256: str):
+    """Raise InvalidUploadToken if the received file is not the negotiated one"""
+    if claims.get("size") != size:
+        raise InvalidUploadToken(f"Uploaded {size} bytes, negotiated {claims.get('size')}")
+    if "sha256" in claims and claims["sha256"] != sha256:
+        raise InvalidUploadToken("Uploaded file does not match the negotiated SHA-256")
+    if "fingerprint" in claims and claims["fingerprint"] != file_fingerprint(path):
+        raise InvalidUploadToken("Uploaded file does not match the negotiated fingerprint")
+
+
+def is_sha256(value) -> bool:
+    if not isinstance(value, str) or len(value) != 64:
+        return False
+    try:
+        int(value, 16)
+    except ValueError:
+        return False
+    return True
+
+
+def file_fingerprint(path: str) -> str:
+    """Partial fingerprint of a stored file (see module docstring)"""
+    size = os.path.getsize(path)
+    hasher = hashlib.sha256(f"{size}:".encode("ascii"))
+    with open(path, "rb") as source:
+        hasher.update(source.read(FINGERPRINT_SPAN))
+        source.seek(max(size - FINGERPRINT_SPAN, 0))
+        hasher.update(source.read(FINGERPRINT_SPAN))
+    return hasher.hexdigest()
+
+
+def _index_path(fingerprint: str) -> pathlib.Path:
+    return FINGERPRINT_INDEX_DIR / f"{fingerprint}.json"
+
+
+def record_fingerprint(fingerprint: str, sha256: str, size: int, file_id: str):
+    path = _index_path(fingerprint)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps({"sha256": sha256, "size": size, "file_id": file_id}))
+    os.replace(tmp_path, path)
+
+
+def lookup_fingerprint(fingerprint: str, size: int):
+    """Index entry {sha256, size, file_id} for a fingerprint, or None"""
+    if not is_sha256(fingerprint):
+        return None
+    try:
+        entry = json.loads(_index_path(fingerprint).read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    return entry if entry.get("size") == size else None
@@ -1,14 +1,38 @@
-from typing import Tuple
+from typing import BinaryIO, Tuple
+import asyncio
 import hashlib
 import os
 import json
+import queue
+import threading
 import uuid
 import time
 
 from fastapi import UploadFile
-from ..config import RAW_AUDIO_DIR, TRANSCRIPTIONS_DIR
+from ..config import RAW_AUDIO_DIR
 from ..volumes import audio_storage_vol
 
+UPLOAD_MAX_BYTES = 524_288_000  # 500MB
+SUPPORTED_EXTENSIONS = ('.mp3', '.wav', '.m4a', '.mp4', '.mov', '.avi')
+
+# Copy buffers start at 1MB and double while reads fill them, up to 8MB
+MIN_COPY_BUFFER = 1 << 20
+MAX_COPY_BUFFER = 8 << 20
+# Buffers hashed but not yet written; bounds memory per upload
+WRITE_QUEUE_DEPTH = 4
+# Uploads copied at once per container; more copy threads only contend for
+# the GIL with the event loop without adding disk throughput
+UPLOAD_COPY_CONCURRENCY = 2
+
+_copy_semaphore = None
+
+
+def _get_copy_semaphore() -> asyncio.Semaphore:
+    global _copy_semaphore
+    if _copy_semaphore is None:
+        _copy_semaphore = asyncio.Semaphore(UPLOAD_COPY_CONCURRENCY)
+    return _copy_semaphore
+
 
 def generate_upload_id() -> str:
     """Generate a unique upload ID for tracking."""
@@ -30,23 +54,21 @@ def generate_file_id_from_content(file_content: bytes) -> str:
 
 def check_existing_transcript(file_id: str) -> bool:
     """Check if a completed transcript already exists for this file ID."""
-    transcript_path = os.path.join(TRANSCRIPTIONS_DIR, f"{file_id}.json")
+    from .job_store import JobStore
+
+    store = JobStore(file_id)
     
-    # Check if file exists
-    if not os.path.exists(transcript_path):
+    # Check if job exists
+    if not store.exists():
         return False
     
     try:
-        # Read the transcript file
-        with open(transcript_path, 'r', encoding='utf-8') as f:
-            transcript_data = json.load(f)
-        
-        # Check if transcript is actually completed
-        status = transcript_data.get("status", "")
-        data = transcript_data.get("data", {})
+        # Only the status field and the text key are read, not the whole document
+        status = store.read_field("status", "")
+        text = store.read_data_key("text")
         
         # Only consider it "existing" if status is "Completed" and we have actual transcript text
-        if status == "Completed" and data.get("text"):
+        if status == "Completed" and text:
             print(f"✅ Found completed transcript for {file_id}")
             return True
         else:
@@ -58,12 +80,157 @@ def check_existing_transcript(file_id: str) -> bool:
         return False
 
 
+def copy_and_hash(
+    source: BinaryIO, destination_path: str, max_bytes: int = UPLOAD_MAX_BYTES
+) -> Tuple[int, str]:
+    """
+    Copy `source` to `destination_path` while computing its SHA-256.
+
+    Blocking; run it in a worker thread. This thread reads and hashes, a
+    second thread writes, with a bounded queue of reusable buffers between
+    them so hashing and disk writes overlap (both release the GIL).
+
+    Returns (total_bytes, hex digest). Raises ValueError past `max_bytes`.
+    """
+    hasher = hashlib.sha256()
+    pending: queue.Queue = queue.Queue(maxsize=WRITE_QUEUE_DEPTH)
+    free_buffers: queue.Queue = queue.Queue()
+    write_errors = []
+
+    def write_buffers():
+        out = None
+        try:
+            out = open(destination_path, "wb")
+        except OSError as e:
+            write_errors.append(e)
+        while True:
+            item = pending.get()
+            if item is None:
+                break
+            buffer, length = item
+            if not write_errors:
+                try:
+                    out.write(memoryview(buffer)[:length])
+                except OSError as e:
+                    write_errors.append(e)
+            free_buffers.put(buffer)
+        if out is not None:
+            out.close()
+
+    writer = threading.Thread(target=write_buffers, daemon=True)
+    writer.start()
+
+    readinto = getattr(source, "readinto", None)
+    buffer_size = MIN_COPY_BUFFER
+    total_bytes = 0
+    try:
+        while not write_errors:
+            try:
+                buffer = free_buffers.get_nowait()
+            except queue.Empty:
+                buffer = None
+            if buffer is None or len(buffer) < buffer_size:
+                buffer = bytearray(buffer_size)
+
+            view = memoryview(buffer)[:buffer_size]
+            if readinto is not None:
+                length = readinto(view)
+            else:
+                chunk = source.read(buffer_size)
+                length = len(chunk)
+                view[:length] = chunk
+            if not length:
+                break
+
+            total_bytes += length
+            if total_bytes > max_bytes:
+                raise ValueError(f"File too large: more than {max_bytes} bytes (max 500MB)")
+
+            hasher.update(view[:length])
+            pending.put((buffer, length))
+
+            if length == buffer_size and buffer_size < MAX_COPY_BUFFER:
+                buffer_size *= 2
+    finally:
+        pending.put(None)
+        writer.join()
+
+    if write_errors:
+        raise write_errors[0]
+    return total_bytes, hasher.hexdigest()
+
+
+async def store_uploaded_file(
+    temp_file_path: str,
+    fileName: str,
+    total_bytes: int,
+    content_hash: str,
+    claims: dict = None,
+) -> Tuple[bool, str, bool]:
+    """
+    Move a fully received and hashed upload to its content-addressed
+    location, or drop it if a completed transcript already exists.
+    Shared by the single-request and the resumable upload paths.
+    """
+    # Validate file size
+    if total_bytes == 0:
+        raise ValueError("File is empty (0 bytes)")
+    
+    from .upload_negotiation import check_upload_claims, file_fingerprint, record_fingerprint
+
+    if claims is not None:
+        await asyncio.to_thread(check_upload_claims, claims, temp_file_path, total_bytes, content_hash)
+
+    # Generate deterministic file ID from content hash
+    file_id = generate_file_id_from_hash(content_hash)
+    print(f"🔑 Generated file ID: {file_id} (from hash: {content_hash[:16]})")
+
+    # Index the partial fingerprint so later uploads can be negotiated
+    # without hashing the whole file
+    fingerprint = await asyncio.to_thread(file_fingerprint, temp_file_path)
+    await asyncio.to_thread(record_fingerprint, fingerprint, content_hash, total_bytes, file_id)
+    
+    # Check if transcript already exists before moving file
+    if check_existing_transcript(file_id):
+        print(f"🎯 Completed transcript found for {file_id}! Redirecting to existing transcript.")
+        # Clean up temporary file
+        if os.path.exists(temp_file_path):
+            os.remove(temp_file_path)
+        return [True, file_id, True]  # Third parameter indicates existing transcript
+    
+    # Extract file extension from original filename
+    file_extension = os.path.splitext(fileName)[1].lower()
+
+    
+    # Move to final location with atomic operation (preserve original extension)
+    final_path = os.path.join(RAW_AUDIO_DIR, f"{file_id}{file_extension}")
+    
+    # Check if final file already exists (edge case protection)
+    if os.path.exists(final_path):
+        print(f"⚠️ File already exists at {final_path}, removing temporary file")
+        os.remove(temp_file_path)
+        return [True, file_id, False]
+    
+    # Atomic move operation
+    os.rename(temp_file_path, final_path)
+    
+    # Commit volume changes
+    await audio_storage_vol.commit.aio()
+    
+    print(f"🎉 File successfully uploaded and stored as: {file_id}{file_extension}")
+    return [True, file_id, False]
+
+
 async def stream_upload(
     file: UploadFile,
     fileName: str,
+    upload_token: str = None,
 ) -> Tuple[bool, str, bool]:
     """
     Stream upload handler that replaces chunked upload system.
+
+    With an `upload_token` from /upload/negotiate, the received bytes must
+    match the hash (or fingerprint) and size the token was issued for.
     
     Returns:
         Tuple[bool, str, bool]: (success, file_id, is_existing_transcript)
@@ -87,83 +254,36 @@ async def stream_upload(
         print(f"📋 File info - name: {fileName}, content_type: {getattr(file, 'content_type', 'unknown')}")
         
         # Validate file type (basic check)
-        if not fileName.lower().endswith(('.mp3', '.wav', '.m4a', '.mp4', '.mov', '.avi')):
+        if not fileName.lower().endswith(SUPPORTED_EXTENSIONS):
             raise ValueError(f"Unsupported file type: {fileName}")
         
+        claims = None
+        if upload_token:
+            from .upload_negotiation import verify_upload_token
+            claims = verify_upload_token(upload_token)
+
         # Generate temporary file path
         temp_file_path = os.path.join(RAW_AUDIO_DIR, f"{upload_id}.uploading")
         
-        # Stream the file and calculate hash simultaneously
-        hasher = hashlib.sha256()
-        total_bytes = 0
-        
         print(f"📥 Streaming to temporary file: {temp_file_path}")
         
-        # Stream upload with simultaneous hashing
-        with open(temp_file_path, "wb") as temp_file:
-            try:
-                while True:
-                    # Read in 64KB chunks for optimal performance
-                    chunk = await file.read(65536)  # 64KB
-                    if not chunk:
-                        break
-                        
-                    # Write chunk to disk
-                    temp_file.write(chunk)
-                    
-                    # Update hash
-                    hasher.update(chunk)
-                    
-                    # Track progress
-                    total_bytes += len(chunk)
-                    
-            except Exception as read_error:
-                raise ValueError(f"Error reading file data: {read_error}")
+        # FastAPI has already spooled the upload; copy and hash straight
+        # from its file object on worker threads, off the event loop
+        try:
+            await file.seek(0)
+            async with _get_copy_semaphore():
+                total_bytes, content_hash = await asyncio.to_thread(
+                    copy_and_hash, file.file, temp_file_path
+                )
+        except ValueError:
+            raise
+        except Exception as read_error:
+            raise ValueError(f"Error reading file data: {read_error}")
         
         print(f"✅ Upload completed: {total_bytes} bytes in {time.time() - start_time:.2f} seconds")
         
-        # Validate file size
-        if total_bytes == 0:
-            raise ValueError("File is empty (0 bytes)")
-        
-        if total_bytes > 524_288_000:  # 500MB
-            raise ValueError(f"File too large: {total_bytes} bytes (max 500MB)")
-        
-        # Generate deterministic file ID from content hash
-        content_hash = hasher.hexdigest()
-        file_id = generate_file_id_from_hash(content_hash)
-        print(f"🔑 Generated file ID: {file_id} (from hash: {content_hash[:16]})")
-        
-        # Check if transcript already exists before moving file
-        if check_existing_transcript(file_id):
-            print(f"🎯 Completed transcript found for {file_id}! Redirecting to existing transcript.")
-            # Clean up temporary file
-            if os.path.exists(temp_file_path):
-                os.remove(temp_file_path)
-            return [True, file_id, True]  # Third parameter indicates existing transcript
-        
-        # Extract file extension from original filename
-        file_extension = os.path.splitext(fileName)[1].lower()
+        return await store_uploaded_file(temp_file_path, fileName, total_bytes, content_hash, claims)
 
-        
-        # Move to final location with atomic operation (preserve original extension)
-        final_path = os.path.join(RAW_AUDIO_DIR, f"{file_id}{file_extension}")
-        
-        # Check if final file already exists (edge case protection)
-        if os.path.exists(final_path):
-            print(f"⚠️ File already exists at {final_path}, removing temporary file")
-            os.remove(temp_file_path)
-            return [True, file_id, False]
-        
-        # Atomic move operation
-        os.rename(temp_file_path, final_path)
-        
-        # Commit volume changes
-        audio_storage_vol.commit()
-        
-        print(f"🎉 File successfully uploaded and stored as: {file_id}{file_extension}")
-        return [True, file_id, False]
-        
     except (ValueError, TypeError) as validation_error:
         print(f"❌ Validation error: {validation_error}")
         # Clean up temporary file on error
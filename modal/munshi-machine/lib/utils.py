@@ -3,6 +3,7 @@ import pathlib
 import json
 
 from .. import config
+from .job_store import JobStore
 
 logger = config.get_logger("UTILS")
 
@@ -40,55 +41,166 @@ MUNSHI_TRANSCRIPTION_STATUS = {
 }
 
 
+class TrackedDict(dict):
+    """dict that remembers which keys were assigned or deleted since the last write"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.dirty_keys = set()
+        self.deleted_keys = set()
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.dirty_keys.add(key)
+        self.deleted_keys.discard(key)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.deleted_keys.add(key)
+        self.dirty_keys.discard(key)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key, *default):
+        if key in self:
+            self.deleted_keys.add(key)
+            self.dirty_keys.discard(key)
+        return super().pop(key, *default)
+
+    def mark_clean(self):
+        self.dirty_keys.clear()
+        self.deleted_keys.clear()
+
+
 class output_handler:
+    """
+    Facade over the per-job JobStore with the original single-document API.
+    Small fields are read on demand, the `data` payload is loaded lazily, and
+    write_transcription_data() writes only the fields and data keys that
+    changed.
+    """
+
     def __init__(self, vid):
         self.vid = vid
-        self.out_path = f"{TRANSCRIPTIONS_DIR}/{vid}.json"
+        self.store = JobStore(vid)
+        self.out_path = str(self.store.job_dir)
         self.audio_path = str(audio_path(vid))
-        # Initialize status to None, will be set by get_output()
-        self.status = None
-        self.data = None
-        self.output = {}
         self.get_output()
 
+    def exists(self) -> bool:
+        return self.store.exists()
+
+    @property
+    def data(self):
+        if not self._data_loaded:
+            data = self.store.read_data()
+            self._data = TrackedDict(data) if data is not None else None
+            self._data_loaded = True
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = TrackedDict(value) if value is not None else None
+        self._data_loaded = True
+        self._data_replaced = True
+
+    @property
+    def output(self):
+        """The full document as a dict (loads every field and the data payload)"""
+        output = dict(self._get_fields())
+        output.update(self._field_updates)
+        output["status"] = self.status
+        output["data"] = self.data
+        return output
+
+    def _get_fields(self) -> dict:
+        if self._fields is None:
+            self._fields = self.store.read_fields()
+        return self._fields
+
+    def get_field(self, fieldname, default=None):
+        if fieldname == "status":
+            return self.status
+        if fieldname == "data":
+            return self.data
+        if fieldname in self._field_updates:
+            return self._field_updates[fieldname]
+        if self._fields is not None:
+            return self._fields.get(fieldname, default)
+        return self.store.read_field(fieldname, default)
+
     def write_output_data(self, data):
         self.data = data
         self.write_transcription_data()
 
     def update_field(self, fieldname, value):
-        self.output[fieldname] = value
+        if fieldname == "data":
+            self.data = value
+            return
+        if fieldname == "status":
+            self.status = value
+        self._field_updates[fieldname] = value
 
     def get_metadata(self):
-        return {"title": self.output.get("title"), "author": self.output.get("author")}
+        return {"title": self.get_field("title"), "author": self.get_field("author")}
+
+    def is_dirty(self) -> bool:
+        """Whether there are changes not yet written to the store"""
+        return bool(
+            self._field_updates
+            or self._data_replaced
+            or (self._data is not None and (self._data.dirty_keys or self._data.deleted_keys))
+        )
 
     def write_transcription_data(self):
-        with open(self.out_path, "w+", encoding="utf-8") as output_file:
-            json.dump(
-                self.output,
-                output_file,
-                ensure_ascii=False,
-                indent=4,
-            )
+        for fieldname, value in self._field_updates.items():
+            self.store.write_field(fieldname, value)
+            if self._fields is not None:
+                self._fields[fieldname] = value
+        self._field_updates = {}
+
+        if self._data_replaced:
+            self.store.replace_data(self._data)
+        elif self._data is not None:
+            for key in self._data.dirty_keys:
+                self.store.write_data_key(key, self._data[key])
+            for key in self._data.deleted_keys:
+                self.store.delete_data_key(key)
+
+        if self._data is not None:
+            self._data.mark_clean()
+        self._data_replaced = False
 
     def get_output(self):
-        if not pathlib.Path(self.out_path).exists():
-            self.output = {}
+        self._fields = None
+        self._data = None
+        self._data_loaded = False
+        self._data_replaced = False
+        self._field_updates = {}
+        # False for a missing or unreadable document, like the -1 return
+        self.loaded = False
+
+        if not self.store.exists():
             self.status = "Not Found"  # Set status for missing files
-            self.data = None
+            self._data_loaded = True
             return -1
 
         try:
-            with open(self.out_path, "r", encoding="utf-8") as output_file:
-                _output = json.load(output_file)
-                self.status = _output.get("status", "Unknown")
-                self.data = _output.get("data", None)
-                self.output = _output
+            self.status = self.store.read_field("status", "Unknown")
+            self.loaded = True
             return 0
         except (json.JSONDecodeError, FileNotFoundError, Exception) as e:
             logger.error(f"Error reading transcript file for {self.vid}: {e}")
-            self.output = {}
             self.status = "Failed"  # Set status for corrupted/invalid files
-            self.data = None
+            self._fields = {}
+            self._data_loaded = True
             return -1
 
 
@@ -104,10 +216,10 @@ def store_speaker_settings(vid: str, enable_speakers: bool, num_speakers: int):
     logger.info(f"Stored speaker settings for {vid}: {speaker_settings}")
 
 
-def get_speaker_settings(vid: str):
+def get_speaker_settings(vid: str, outputHandler: "output_handler" = None):
     """Retrieve speaker settings for a given video ID."""
-    outputHandler = output_handler(vid)
-    speaker_settings = outputHandler.output.get("speaker_settings", {})
+    outputHandler = outputHandler or output_handler(vid)
+    speaker_settings = outputHandler.get_field("speaker_settings", {}) or {}
     
     # Default values if not found
     enable_speakers = speaker_settings.get("enable_speakers", True)
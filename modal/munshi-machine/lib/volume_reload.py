@@ -0,0 +1,54 @@
+"""
+Rate-limited volume reloads for the web containers
+"""
+
+import asyncio
+import time
+
+from .. import config
+
+logger = config.get_logger("VOLUME_RELOAD")
+
+
+class ThrottledReloader:
+    """
+    Reloads a modal Volume at most once per `interval` seconds.
+
+    Concurrent callers share one in-flight reload: the first caller past the
+    interval reloads while the rest wait on the lock and then find the
+    volume fresh.
+    """
+
+    def __init__(self, volume, interval: float = config.VOLUME_RELOAD_INTERVAL):
+        self.volume = volume
+        self.interval = interval
+        self.last_reload = 0.0
+        self.reloads = 0
+        self.skipped = 0
+        self._lock = None
+
+    def _get_lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    def is_fresh(self) -> bool:
+        return time.monotonic() - self.last_reload < self.interval
+
+    async def reload(self, force: bool = False):
+        if not force and self.is_fresh():
+            self.skipped += 1
+            return
+        async with self._get_lock():
+            # Another caller may have reloaded while we waited
+            if not force and self.is_fresh():
+                self.skipped += 1
+                return
+            try:
+                await self.volume.reload.aio()
+            except RuntimeError as e:
+                # reload fails while files are open on the volume; serve the
+                # current view and try again next interval
+                logger.warning(f"Volume reload failed: {e}")
+            self.last_reload = time.monotonic()
+            self.reloads += 1
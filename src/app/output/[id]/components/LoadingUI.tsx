@@ -22,6 +22,12 @@ const LOADING_MESSAGES = {
         icon: WaveformIcon,
         progress: 35
     },
+    [TRANSCRIPTION_STATUS.NORMALIZING_AUDIO]: {
+        title: "Tuning the audio",
+        subtitle: "Converting your file into the format our models listen to",
+        icon: WaveformIcon,
+        progress: 50
+    },
     [TRANSCRIPTION_STATUS.TRANSCRIBING]: {
         title: "AI transcribing audio",
         subtitle: "Converting speech to text with speaker identification",
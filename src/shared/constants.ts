@@ -2,6 +2,7 @@ export const enum TRANSCRIPTION_STATUS {
     HOLD = "Loading",
     INIT = "Init", 
     FETCHING_AUDIO = "FetchingAudio",
+    NORMALIZING_AUDIO = "NormalizingAudio",
     TRANSCRIBING = "Transcribing",
     SUMMARIZING = "Summarizing",
     COMPLETED = "Completed",